@@ -0,0 +1,39 @@
+# encoding: utf-8
+
+"""Compare generated Document constructors against the generic implementation and a plain dictionary literal.
+
+Run directly; no database connection is required:
+
+	python example/benchmark/construction.py
+"""
+
+from __future__ import print_function
+
+from timeit import repeat
+
+from marrow.mongo import Document
+from marrow.mongo.field import Integer, String
+
+
+class Record(Document):
+	name = String()
+	title = String()
+	email = String()
+	age = Integer()
+	score = Integer(default=0, assign=True)
+
+
+def main(number=20000):
+	candidates = (
+			('dict', lambda: {'name': "Alice", 'title': "Dr.", 'email': "alice@example.com", 'age': 27, 'score': 0}),
+			('generic', lambda: Document.__init__(Record.__new__(Record), "Alice", "Dr.", email="alice@example.com", age=27)),
+			('generated', lambda: Record("Alice", "Dr.", email="alice@example.com", age=27)),
+		)
+	
+	for label, fn in candidates:
+		best = min(repeat(fn, number=number, repeat=3))
+		print("{:>12}: {:8.2f} µs per document".format(label, best / number * 1e6))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,56 @@
+# encoding: utf-8
+
+"""Compare `Document.from_mongo` against the generic construct-then-walk-all-fields approach it replaces.
+
+Run directly; no database connection is required:
+
+	python example/benchmark/hydration.py
+"""
+
+from __future__ import print_function
+
+from timeit import repeat
+
+from bson import ObjectId
+
+from marrow.mongo import Document
+from marrow.mongo.field import Array, Integer, String
+from marrow.mongo.trait import Identified
+
+
+class Record(Identified, Document):
+	name = String()
+	title = String()
+	email = String()
+	age = Integer()
+	score = Integer(default=0)
+	rank = Integer(default=0)
+	tags = Array(String(), assign=True)
+	notes = String(default=None)
+
+
+RAW = [{'_id': ObjectId(), 'name': "Alice", 'title': "Dr.", 'email': "alice@example.com", 'age': i, 'tags': []}
+		for i in range(1000)]
+
+
+def generic(cls, doc):
+	"""The original approach: full constructor, then walk every field looking for assignable ones."""
+	
+	instance = cls(_prepare_defaults=False)
+	instance.__data__ = doc
+	
+	for name, field in instance.__fields__.items():
+		if field.assign:
+			getattr(instance, name)
+	
+	return instance
+
+
+def main(number=20):
+	for label, fn in (('generic', generic), ('from_mongo', lambda cls, doc: cls.from_mongo(doc))):
+		best = min(repeat(lambda: [fn(Record, dict(doc)) for doc in RAW], number=number, repeat=3))
+		print("{:>12}: {:8.2f} µs per document".format(label, best / number / len(RAW) * 1e6))
+
+
+if __name__ == '__main__':
+	main()
@@ -5,7 +5,7 @@ from __future__ import unicode_literals
 import sys
 
 from .core import Document, Field, Index, __version__  # noqa
-from .query import Q, Ops, Filter, Update
+from .query import Q, Ops, Filter, Update, Param
 from .param import F, P, S, U
 from .util import Registry, utcnow
 
@@ -22,6 +22,7 @@ __all__ = [
 	'Index',
 	'Ops',
 	'P',
+	'Param',
 	'Q',
 	'S',
 	'U',
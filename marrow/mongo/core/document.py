@@ -1,13 +1,20 @@
 from collections import OrderedDict as odict
+from itertools import islice
 from typing import MutableMapping
 
 from bson import ObjectId
 from bson.json_util import dumps, loads
+from bson.raw_bson import RawBSONDocument
 
 from ...package.loader import load
 from ...package.canonical import name as named
 from ...schema import Attributes, Container
+from ...schema.exc import Concern
+from ..query import Update
 from ..util import SENTINEL
+from ..util.json_ import compile_encoder, iterencode
+from ..util.lazy import LazyStore
+from ..util.validation import compile_validator
 from .field import Field
 from .field.alias import Alias
 from .index import Index
@@ -15,6 +22,118 @@ from .index import Index
 __all__ = ['Document']
 
 
+_plugins = {}  # A cache of resolved plugin names; scanning the entry point registry on every load is expensive.
+
+
+def _load_document(reference):
+	"""Resolve the Document subclass referenced by a stored type identifier.
+	
+	Plugin name lookups are cached for the life of the process. Explicit (colon-separated) object references are not,
+	as they may be redefined, and are inexpensive to resolve once imported.
+	"""
+	
+	if ':' in reference:
+		return load(reference, 'marrow.mongo.document')
+	
+	try:
+		return _plugins[reference]
+	except KeyError:
+		pass
+	
+	cls = _plugins[reference] = load(reference, 'marrow.mongo.document')
+	
+	return cls
+
+
+def _generate_init(cls):
+	"""Generate a constructor specialized to the fields of the given Document subclass, akin to dataclasses.
+	
+	Behaves as `Document.__init__` does, without repeated introspection of the class' fields: values are assigned in
+	field definition order, positionally for fields permitting it, by keyword otherwise. Remaining keyword arguments
+	are handled as marrow.schema would. If reached through `super()` from a subclass whose construction has been
+	specialized, defers to the generic implementation.
+	"""
+	
+	lines = []
+	positional = 0
+	
+	for name, field in cls.__fields__.items():
+		if not name.startswith('__') and field.positional:
+			lines.extend((
+					"	if __count > {}:".format(positional),
+					"		if {!r} in __kw: __duplicate({!r})".format(name, name),
+					"		self.{} = __args[{}]".format(name, positional),
+					"	elif {!r} in __kw: self.{} = __kw.pop({!r})".format(name, name, name),
+				))
+			positional += 1
+		else:
+			lines.append("	if {!r} in __kw: self.{} = __kw.pop({!r})".format(name, name, name))
+	
+	source = "\n".join([
+			"def __init__(self, *__args, _prepare_defaults=True, **__kw):",
+			"	if self.__class__ is not __cls:",
+			"		return __generic(self, *__args, _prepare_defaults=_prepare_defaults, **__kw)",
+			"	__count = len(__args)",
+			"	if __count > {}: __excessive(self, __count)".format(positional),
+			"	self.__data__ = self.__store__()",
+		] + lines + [
+			"	if __kw: __remainder(self, __kw)",
+			"	if _prepare_defaults: self._prepare_defaults()",
+		])
+	
+	namespace = {
+			'__cls': cls,
+			'__generic': Document.__init__,
+			'__duplicate': _duplicate,
+			'__excessive': _excessive,
+			'__remainder': _assign_remainder,
+		}
+	
+	exec(compile(source, '<generated ' + cls.__name__ + '.__init__>', 'exec'), namespace)  # nosec
+	
+	init = namespace['__init__']
+	init.__qualname__ = cls.__qualname__ + '.__init__'
+	init.__doc__ = Document.__init__.__doc__
+	init.__generated__ = True
+	
+	return init
+
+
+def _duplicate(name):
+	raise TypeError("Positional value overridden by keyword argument: " + name)
+
+
+def _excessive(instance, count):
+	raise TypeError("{0} received too many positional arguments ({1} given)".format(instance.__class__.__name__, count))
+
+
+def _assign_remainder(instance, kw):
+	"""Assign keyword arguments to non-field attributes, or explode as marrow.schema's `Container` would."""
+	
+	for name in instance.__attributes__:
+		if name in kw:
+			setattr(instance, name, kw.pop(name))
+	
+	if kw:
+		raise TypeError('{0} got unexpected keyword argument{1}: {2}'.format(
+				instance.__class__.__name__,
+				'' if len(kw) == 1 else 's',
+				', '.join(kw)
+			))
+
+
+def _resolve(data, path):
+	"""Retrieve the stored value at the given dot-separated path, or SENTINEL if not present."""
+	
+	for part in path.split('.'):
+		try:
+			data = data[int(part)] if isinstance(data, list) else data[part]
+		except (LookupError, ValueError):
+			return SENTINEL
+	
+	return data
+
+
 class Document(Container):
 	"""A MongoDB document definition.
 	
@@ -31,12 +150,54 @@ class Document(Container):
 	__foreign__ = {'object'}  # The representation for the database side of things, ref: $type
 	__type_store__ = None  # The pseudo-field to store embedded document class references as.
 	__pk__ = None  # The primary key of the document, to make searchable if embedded, or the name of the '_id' field.
+	__memoize__ = False  # Cache native field values per-instance, stored as `__native__`, to avoid repeated casting.
+	__track__ = False  # Record changes made to loaded instances, stored as `__changes__`; see `as_update`.
+	__check_assignment__ = True  # Validate values as assigned; if disabled, rely upon `validate` or `validate_many`.
 	
 	__fields__ = Attributes(only=Field)  # An ordered mapping of field names to their respective Field instance.
 	__fields__.__sequence__ = 10000  # TODO: project=False
 	__indexes__ = Attributes(only=Index)  # An ordered mapping of index names to their respective Index instance.
 	__indexes__.__sequence__ = 10000
 	
+	# Construction plan; calculated for each subclass by `__attributed__` to avoid repeated introspection.
+	__assigned__ = ()  # The (name, field) pairs of fields whose default values are assigned on access.
+	__hydrate__ = True  # May `from_mongo` construct instances without invoking `__init__`?
+	__checks__ = None  # The compiled whole-document validator, prepared on first use; see `validate`.
+	__encoder__ = None  # The compiled JSON encoder, prepared on first use; see `to_json`.
+	__resolved__ = None  # Parametric (F, U, P, S) argument names resolved to fields; see `marrow.mongo.param`.
+	
+	@classmethod
+	def __attributed__(cls):
+		"""Executed after each new subclass is constructed; prepare the construction and hydration plan.
+		
+		Unless construction has been specialized by a subclass (or mix-in) overriding `__init__`, a constructor
+		specific to the fields of the new class is generated, and `from_mongo` permitted to bypass it entirely.
+		"""
+		
+		cls.__assigned__ = tuple((name, field) for name, field in cls.__fields__.items() if field.assign)
+		cls.__checks__ = None
+		cls.__encoder__ = None
+		cls.__resolved__ = None
+		
+		if 'Document' not in globals():  # We are being constructed ourselves; our own __init__ is the generic one.
+			return
+		
+		for base in cls.__mro__:
+			init = base.__dict__.get('__init__')
+			
+			if init is None or base in (Document, Container, object) or getattr(init, '__generated__', False):
+				continue
+			
+			cls.__hydrate__ = False  # Specialized construction may do additional work we must not skip.
+			
+			if getattr(cls.__init__, '__generated__', False):  # Don't let one generated for a parent shadow it.
+				cls.__init__ = init
+			
+			return
+		
+		cls.__hydrate__ = True
+		cls.__init__ = _generate_init(cls)
+	
 	def __init__(self, *args, **kw):
 		"""Construct a new MongoDB Document instance.
 		
@@ -67,15 +228,208 @@ class Document(Container):
 	def _prepare_defaults(self):
 		"""Trigger assignment of default values."""
 		
-		for name, field in self.__fields__.items():
-			if field.assign:
+		data = self.__data__
+		unloaded = self.__dict__.get('__unloaded__', ())  # Omitted by projection; see `Siblings`.
+		
+		for name, field in self.__assigned__:
+			if field.__name__ not in data and field.__name__ not in unloaded:
 				getattr(self, name)  # An attempt to retrieve the value of an assignable field will assign it.
 	
+	def _load(self, name):
+		"""Retrieve a field omitted by projection, if not yet loaded; see `marrow.mongo.util.projection`."""
+		
+		unloaded = self.__dict__.get('__unloaded__')
+		
+		if unloaded and name in unloaded:
+			self.__dict__['__siblings__'].load(name)
+	
+	def _loaded(self, name):
+		"""Consider a field omitted by projection loaded, e.g. once assigned to, so as to not overwrite it later."""
+		
+		unloaded = self.__dict__.get('__unloaded__')
+		
+		if unloaded:
+			unloaded.discard(name)
+	
+	def _invalidate(self, name=None):
+		"""Discard memoized native values, either for a specific stored field name, or entirely."""
+		
+		cache = self.__dict__.get('__native__')
+		
+		if not cache:
+			return
+		
+		if name is None:
+			cache.clear()
+		else:
+			cache.pop(name, None)
+	
+	# Change Tracking
+	
+	@property
+	def _tracking(self):
+		"""Are changes to this instance being recorded, either directly or on behalf of a containing document?"""
+		
+		state = self.__dict__
+		return '__changes__' in state or '__parent__' in state
+	
+	def _track(self, operation, path, values=()):
+		"""Record a change to the value at the given dot-separated stored path, if tracking changes.
+		
+		The operation is one of `$set`, `$unset`, or `$push`, the latter accumulating the given values. Changes to
+		embedded documents are recorded by the containing document: as a change to the nested path, or, for those
+		contained within arrays, as replacement of the array as a whole.
+		"""
+		
+		state = self.__dict__
+		parent = state.get('__parent__')
+		
+		if parent is not None:
+			document, prefix, whole = parent
+			
+			if whole:
+				return document._track('$set', prefix)  # pylint:disable=protected-access
+			
+			return document._track(operation, prefix + '.' + path, values)  # pylint:disable=protected-access
+		
+		changes = state.get('__changes__')
+		
+		if changes is None:
+			return
+		
+		for existing in list(changes):
+			if path.startswith(existing + '.') and changes[existing][0] != '$push':
+				return  # The containing value is already being replaced or removed in its entirety.
+			
+			if existing.startswith(path + '.'):
+				del changes[existing]  # We supersede changes to nested values.
+		
+		current = changes.get(path)
+		
+		if operation == '$push':
+			if current is None:
+				changes[path] = ('$push', list(values))
+			elif current[0] == '$push':
+				current[1].extend(values)
+			
+			return  # Otherwise the array is already being replaced or removed.
+		
+		changes.pop(path, None)
+		changes[path] = (operation, None)
+	
+	def _attach(self, value, path, whole=False):
+		"""Associate an embedded document or array with this document, so that changes to it are tracked here."""
+		
+		if not self._tracking:
+			return value
+		
+		if isinstance(value, Document):
+			value.__dict__['__parent__'] = (self, path, whole)
+		
+		elif hasattr(value, '__owner__'):  # An Array.List instance.
+			if value.__owner__ and value.__owner__[0] is self:
+				return value  # Already attached.
+			
+			value.__owner__ = (self, path)
+			
+			for item in value:
+				if isinstance(item, Document):
+					item.__dict__['__parent__'] = (self, path, True)
+		
+		return value
+	
+	def _begin_tracking(self):
+		"""Discard any recorded changes, treating the current state as persisted, and track changes from here on."""
+		
+		self.__dict__['__changes__'] = odict()
+		
+		for name, value in self.__data__.items():
+			self._attach(value, name)
+	
+	@property
+	def as_update(self):
+		"""Prepare the minimal update operation persisting changes recorded since loading or last saving.
+		
+		Requires change tracking to be enabled by setting `__track__` on the Document subclass. Assigned values are
+		`$set`, deleted ones `$unset`, and values only appended to arrays `$push`ed. The result is empty if unchanged.
+		"""
+		
+		update = Update()
+		
+		for path, (operation, values) in self.__dict__.get('__changes__', {}).items():
+			if operation == '$push':
+				value = values[0] if len(values) == 1 else {'$each': values}
+			
+			elif operation == '$set':
+				value = _resolve(self.__data__, path)
+				
+				if value is SENTINEL:  # Removed through means other than deletion, e.g. on a now detached parent.
+					operation, value = '$unset', ''
+			
+			else:
+				value = ''
+			
+			update.setdefault(operation, odict())[path] = value
+		
+		return update
+	
+	# Validation
+	
+	@classmethod
+	def _get_validator(cls):
+		"""Retrieve the compiled whole-document validator for this class, compiling it if needed."""
+		
+		checks = cls.__dict__.get('__checks__')
+		
+		if checks is None:
+			checks = cls.__checks__ = compile_validator(cls)
+		
+		return checks
+	
+	def validate(self):
+		"""Validate the stored data of this document as a whole, in a single pass.
+		
+		Raises a `Concern` whose `concerns` list every failure if invalid. Returns the document otherwise.
+		"""
+		
+		failures = self._get_validator()(self.__data__, '', self)
+		
+		if failures:
+			raise Concern("Document failed validation: {0}", "; ".join(str(i) for i in failures), concerns=failures)
+		
+		return self
+	
+	@classmethod
+	def validate_many(cls, docs):
+		"""Validate an iterable of Document instances or raw mappings, such as those about to be bulk inserted.
+		
+		Instances are validated against their own class; raw mappings against this one. Returns a list of
+		`(index, concerns)` tuples identifying each invalid document and all of its failures; empty if all are valid.
+		"""
+		
+		validator = cls._get_validator()
+		invalid = []
+		
+		for i, doc in enumerate(docs):
+			if isinstance(doc, Document):
+				failures = doc._get_validator()(doc.__data__, '', doc)  # pylint:disable=protected-access
+			else:
+				failures = validator(doc)
+			
+			if failures:
+				invalid.append((i, failures))
+		
+		return invalid
+	
 	# Data Conversion and Casting
 	
 	@classmethod
-	def from_mongo(cls, doc):
-		"""Convert data coming in from the MongoDB wire driver into a Document instance."""
+	def from_mongo(cls, doc, siblings=None):
+		"""Convert data coming in from the MongoDB wire driver into a Document instance.
+		
+		If the data was retrieved using a projection, a `Siblings` group recording it may be given, to permit loading
+		of omitted fields on access; see `marrow.mongo.util.projection`.
+		"""
 		
 		if doc is None:  # To support simplified iterative use, None should return None.
 			return None
@@ -83,14 +437,108 @@ class Document(Container):
 		if isinstance(doc, Document):  # No need to perform processing on existing Document instances.
 			return doc
 		
+		if isinstance(doc, RawBSONDocument):  # Defer decoding; see Collection.__lazy__.
+			doc = LazyStore(doc, cls.__store__)
+		
 		if cls.__type_store__ and cls.__type_store__ in doc:  # Instantiate specific class mentioned in the data.
-			cls = load(doc[cls.__type_store__], 'marrow.mongo.document')
+			cls = _load_document(doc[cls.__type_store__])
+		
+		return cls._hydrate(doc, siblings)
+	
+	@classmethod
+	def from_mongo_many(cls, docs, batch_size=100, siblings=None):
+		"""Lazily convert an iterable of data from the MongoDB wire driver, such as a cursor, into Document instances.
+		
+		Data is consumed in batches of up to `batch_size` records, and at most one batch is held at a time. Class
+		references stored in the `__type_store__` are resolved once per distinct value per batch. Classes overriding
+		`from_mongo` are deferred to, so their additional processing is preserved; if given `siblings`, they must
+		accept, and pass along, a `siblings` keyword argument. The instances produced will share the loading of fields
+		omitted by projection if a `Siblings` group is given, as for `from_mongo`.
+		"""
+		
+		docs = iter(docs)
+		store = cls.__type_store__
+		generic = Document.from_mongo.__func__
+		
+		while True:
+			batch = list(islice(docs, batch_size))
+			
+			if not batch:
+				return
+			
+			kinds = {SENTINEL: (cls, cls.from_mongo.__func__ is generic)}  # Class, and if directly hydratable.
+			
+			for doc in batch:
+				if doc is None or isinstance(doc, Document):
+					yield doc
+					continue
+				
+				reference = doc[store] if store and store in doc else SENTINEL
+				
+				try:
+					kind, direct = kinds[reference]
+				except KeyError:
+					kind = _load_document(reference)
+					kind, direct = kinds[reference] = (kind, kind.from_mongo.__func__ is generic)
+				
+				if not direct:  # Overrides must forward the siblings on, if projecting.
+					yield kind.from_mongo(doc, siblings=siblings) if siblings is not None else kind.from_mongo(doc)
+					continue
+				
+				if isinstance(doc, RawBSONDocument):
+					doc = LazyStore(doc, kind.__store__)
+				
+				yield kind._hydrate(doc, siblings)  # pylint:disable=protected-access
+			
+			del batch  # Release our reference to the raw data prior to gathering the next batch.
+	
+	@classmethod
+	def _hydrate(cls, doc, siblings=None):
+		"""Construct an instance of this specific class adopting the given data as its backing store."""
 		
 		# Prepare a new instance in such a way that changes to the instance will be reflected in the originating doc.
-		instance = cls(_prepare_defaults=False)  # Construct an instance, but delay default value processing.
+		if cls.__hydrate__:  # Nothing to do in the constructor that the data we are adopting won't replace.
+			instance = cls.__new__(cls)
+		else:
+			instance = cls(_prepare_defaults=False)  # Construct an instance, but delay default value processing.
+		
 		instance.__data__ = doc  # I am Popeye of Borg (pattern); you will be askimilgrated.
+		
+		if siblings is not None:  # Identify the fields omitted by projection prior to assigning defaults to them.
+			siblings.adopt(instance)
+		
 		instance._prepare_defaults()  # pylint:disable=protected-access -- deferred default value processing.
 		
+		if cls.__track__:  # Begin tracking after defaults are assigned; those are not changes worth persisting.
+			instance.__dict__['__changes__'] = odict()
+		
+		return instance
+	
+	def clone(self, **kw):
+		"""Produce a copy of this document, sharing data with it, copying only what is written to, when written.
+		
+		Embedded documents and arrays are shared between this document and the clone until either modifies them, so
+		many variants may be derived from one template without deep copying it for each. Any keyword arguments are
+		assigned to the clone as field values, e.g. a new identifier: `template.clone(id=ObjectId(), name="Bob")`.
+		
+		The current state of this document is preserved for sharing by being wrapped as the clone's is. Embedded
+		documents or arrays retrieved from this document prior to cloning are not; avoid modifying them afterwards.
+		"""
+		
+		data = self.__data__
+		
+		if isinstance(data, LazyStore) and data.pristine:  # Already sharing unaltered data; share it further.
+			data = data._raw  # pylint:disable=protected-access
+		else:
+			self.__data__ = LazyStore(data, self.__store__)
+			self._invalidate()  # Any memoized values belong to the now shared data.
+		
+		instance = self._hydrate(LazyStore(data, self.__store__))
+		instance.__dict__.pop('__changes__', None)  # Not loaded from the database; see `__track__`.
+		
+		for name, value in kw.items():
+			setattr(instance, name, value)
+		
 		return instance
 	
 	@classmethod
@@ -100,10 +548,38 @@ class Document(Container):
 		deserialized = loads(json)
 		return cls.from_mongo(deserialized)
 	
+	@classmethod
+	def _get_encoder(cls):
+		"""Retrieve the compiled JSON encoder for this class, compiling it if needed."""
+		
+		encoder = cls.__dict__.get('__encoder__')
+		
+		if encoder is None:
+			encoder = cls.__encoder__ = compile_encoder(cls)
+		
+		return encoder
+	
 	def to_json(self, *args, **kw):
-		"""Convert our Document instance back into JSON data. Additional arguments are passed through."""
+		"""Convert our Document instance back into JSON data. Additional arguments are passed through.
+		
+		Without additional arguments a schema-aware encoder is used, producing output identical to that of
+		`bson.json_util.dumps`, which is otherwise used.
+		"""
+		
+		if args or kw:
+			return dumps(self, *args, **kw)
 		
-		return dumps(self, *args, **kw)
+		return self._get_encoder()(self.__data__)
+	
+	@classmethod
+	def to_json_many(cls, docs, chunk=100):
+		"""Encode an iterable of Document instances or raw data, such as a cursor, as a JSON array, piecewise.
+		
+		Returns a generator yielding the array as strings representing up to `chunk` documents each, suitable for
+		use as a streaming response body. Raw data is encoded directly, without being loaded into instances.
+		"""
+		
+		return iterencode(cls, docs, chunk)
 	
 	@property
 	def as_rest(self):
@@ -175,17 +651,24 @@ class Document(Container):
 	def __getitem__(self, name):
 		"""Retrieve data from the backing store."""
 		
+		self._load(name)
+		
 		return self.__data__[name]
 	
 	def __setitem__(self, name, value):
 		"""Assign data directly to the backing store."""
 		
+		self._loaded(name)
 		self.__data__[name] = value
+		self._invalidate(name)
+		self._track('$set', name)
 	
 	def __delitem__(self, name):
 		"""Unset a value from the backing store."""
 		
 		del self.__data__[name]
+		self._invalidate(name)
+		self._track('$unset', name)
 	
 	def __iter__(self):
 		"""Iterate the names of the values assigned to our backing store."""
@@ -217,6 +700,8 @@ class Document(Container):
 	def __contains__(self, key):
 		"""Determine if the given key is present in the backing store."""
 		
+		self._load(key)
+		
 		return key in self.__data__
 	
 	def __eq__(self, other):
@@ -232,16 +717,29 @@ class Document(Container):
 	def get(self, key, default=None):
 		"""Retrieve a value from the backing store with a default value."""
 		
+		self._load(key)
+		
 		return self.__data__.get(key, default)
 	
 	def clear(self):
 		"""Empty the backing store of data."""
 		
+		names = list(self.__data__)
+		
 		self.__data__.clear()
+		self._invalidate()
+		
+		for name in names:
+			self._track('$unset', name)
 	
 	def pop(self, name, default=SENTINEL):
 		"""Retrieve and remove a value from the backing store, optionally with a default."""
 		
+		self._invalidate(name)
+		
+		if name in self.__data__:
+			self._track('$unset', name)
+		
 		if default is SENTINEL:
 			return self.__data__.pop(name)
 		
@@ -250,16 +748,29 @@ class Document(Container):
 	def popitem(self):
 		"""Pop an item 2-tuple off the backing store."""
 		
-		return self.__data__.popitem()
+		self._invalidate()
+		item = self.__data__.popitem()
+		self._track('$unset', item[0])
+		
+		return item
 	
 	def update(self, *args, **kw):
 		"""Update the backing store directly."""
 		
-		self.__data__.update(*args, **kw)
+		values = dict(*args, **kw)
+		
+		self.__data__.update(values)
+		self._invalidate()
+		
+		for name in values:
+			self._track('$set', name)
 	
 	def setdefault(self, key, value=None):
 		"""Set a value in the backing store if no value is currently present."""
 		
+		if key not in self.__data__:
+			self._track('$set', key)
+		
 		return self.__data__.setdefault(key, value)
 
 
@@ -1,6 +1,7 @@
 from typing import Iterable, Mapping
 
 from ... import Field
+from ...util.lazy import LazyStore
 from .base import _HasKind, _CastingKind
 
 
@@ -9,11 +10,73 @@ class Array(_HasKind, _CastingKind, Field):
 	__allowed_operators__ = {'#array', '$elemMatch', '#rel', '$eq'}
 	
 	class List(list):
-		"""Placeholder list shadow class to identify already-cast arrays."""
+		"""Placeholder list shadow class to identify already-cast arrays.
+		
+		When attached to a document tracking changes, modifications are reported to it: values appended are recorded
+		as pushed, while any other modification results in replacement of the array as a whole.
+		"""
+		
+		__owner__ = None  # The (document, path) to report changes to, if tracking.
 		
 		@classmethod
 		def new(cls):
 			return cls()
+		
+		def _changed(self, operation='$set', values=()):
+			if self.__owner__:
+				document, path = self.__owner__
+				document._track(operation, path, values)  # pylint:disable=protected-access
+		
+		def append(self, value):
+			super(Array.List, self).append(value)
+			self._changed('$push', (value, ))
+		
+		def extend(self, values):
+			values = list(values)
+			super(Array.List, self).extend(values)
+			self._changed('$push', values)
+		
+		def __iadd__(self, values):
+			self.extend(values)
+			return self
+		
+		def __setitem__(self, index, value):
+			super(Array.List, self).__setitem__(index, value)
+			self._changed()
+		
+		def __delitem__(self, index):
+			super(Array.List, self).__delitem__(index)
+			self._changed()
+		
+		def __imul__(self, count):
+			result = super(Array.List, self).__imul__(count)
+			self._changed()
+			return result
+		
+		def insert(self, index, value):
+			super(Array.List, self).insert(index, value)
+			self._changed()
+		
+		def pop(self, index=-1):
+			result = super(Array.List, self).pop(index)
+			self._changed()
+			return result
+		
+		def remove(self, value):
+			super(Array.List, self).remove(value)
+			self._changed()
+		
+		def clear(self):
+			super(Array.List, self).clear()
+			self._changed()
+		
+		def reverse(self):
+			super(Array.List, self).reverse()
+			self._changed()
+		
+		def sort(self, *args, **kw):
+			super(Array.List, self).sort(*args, **kw)
+			self._changed()
 	
 	def __init__(self, *args, **kw):
 		if kw.get('assign', False):
@@ -25,12 +88,17 @@ class Array(_HasKind, _CastingKind, Field):
 		"""Transform the MongoDB value into a Marrow Mongo value."""
 		
 		if isinstance(value, self.List):
-			return value
+			return obj._attach(value, self.__name__)  # pylint:disable=protected-access
 		
 		result = self.List(super(Array, self).to_native(obj, name, i) for i in value)
-		obj.__data__[self.__name__] = result
+		data = obj.__data__
+		
+		if isinstance(data, LazyStore):  # Retain it without promotion, leaving the remainder shared; see `clone`.
+			data.retain(self.__name__, result)
+		else:
+			data[self.__name__] = result
 		
-		return result
+		return obj._attach(result, self.__name__)  # pylint:disable=protected-access
 	
 	def to_foreign(self, obj, name, value):
 		"""Transform to a MongoDB-safe value."""
@@ -132,7 +132,7 @@ class Field(Attribute):
 	
 	def is_sortable(self, context=None):
 		return self._predicate(self.sort, context)
-
+	
 	# Marrow Schema Interfaces
 	
 	def __init__(self, *args, **kw):
@@ -157,6 +157,11 @@ class Field(Attribute):
 		if obj is None:
 			return Q(cls, self)
 		
+		obj._load(self.__name__)  # pylint:disable=protected-access
+		
+		if obj.__memoize__:
+			return self._get_memoized(obj, cls)
+		
 		result = super(Field, self).__get__(obj, cls)
 		
 		if result is None:  # Discussion: pass through to the transformer?
@@ -164,6 +169,37 @@ class Field(Attribute):
 		
 		return self.transformer.native(result, FieldContext(self, obj))
 	
+	def _get_memoized(self, obj, cls):
+		"""Retrieve the native value from the per-instance cache, populating it if the stored value has changed.
+		
+		Cached values are tied to the identity of the stored value they were produced from, so replacement of the
+		stored value through any means, including direct manipulation of `__data__`, results in a fresh conversion.
+		"""
+		
+		name = self.__name__
+		data = obj.__data__
+		cache = obj.__dict__.get('__native__')
+		
+		if cache is None:
+			cache = obj.__dict__['__native__'] = {}
+		
+		source, result = cache.get(name, (SENTINEL, None))
+		
+		if source is not SENTINEL and data.get(name, SENTINEL) is source:
+			return result
+		
+		result = super(Field, self).__get__(obj, cls)
+		
+		if result is not None:
+			result = self.transformer.native(result, FieldContext(self, obj))
+		
+		source = data.get(name, SENTINEL)  # Conversion may write back to the warehouse, e.g. Array.
+		
+		if source is not SENTINEL:  # Unstored (default) values are not cached; they may be freshly generated.
+			cache[name] = (source, result)
+		
+		return result
+	
 	def __set__(self, obj, value):
 		"""Executed when assigning a value to a Field instance attribute."""
 		
@@ -178,16 +214,24 @@ class Field(Attribute):
 					raise AttributeError("Can not assign to " + self.__name__ + " if " + other + " has a value.")
 		
 		if value is not None:
-			self.validator.validate(value, FieldContext(self, obj))
+			if obj.__check_assignment__:
+				self.validator.validate(value, FieldContext(self, obj))
+			
 			value = self.transformer.foreign(value, FieldContext(self, obj))
 		
 		super(Field, self).__set__(obj, value)
+		obj._loaded(self.__name__)  # pylint:disable=protected-access
+		obj._invalidate(self.__name__)  # pylint:disable=protected-access
+		obj._track('$set', self.__name__)  # pylint:disable=protected-access
 	
 	def __delete__(self, obj):
 		"""Executed via the `del` statement with a Field instance attribute as the argument."""
 		
 		# Delete the data completely from the warehouse.
 		del obj.__data__[self.__name__]
+		obj._loaded(self.__name__)  # pylint:disable=protected-access
+		obj._invalidate(self.__name__)  # pylint:disable=protected-access
+		obj._track('$unset', self.__name__)  # pylint:disable=protected-access
 	
 	# Other Python Protocols
 	
@@ -11,3 +11,10 @@ class Embed(_HasKind, _CastingKind, Field):
 			kw.setdefault('default', lambda: self._kind()())
 		
 		super(Embed, self).__init__(*args, **kw)
+	
+	def to_native(self, obj, name, value):
+		"""Transform the MongoDB value into a Marrow Mongo value, associating it with the containing document."""
+		
+		result = super(Embed, self).to_native(obj, name, value)
+		
+		return obj._attach(result, self.__name__)  # pylint:disable=protected-access
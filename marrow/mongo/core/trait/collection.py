@@ -1,5 +1,6 @@
 from bson.binary import STANDARD
 from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from bson.tz_util import utc
 from pymongo.collection import Collection as PyMongoCollection
 from pymongo.database import Database
@@ -9,6 +10,8 @@ from pymongo.write_concern import WriteConcern
 
 from ... import U, Update
 from ...trait import Identified
+from ...util.bulk import COUNT, SIZE, Bulk, active, insert
+from ...util.identity import current
 
 
 __all__ = ['Collection']
@@ -37,6 +40,7 @@ class Collection(Identified):
 	__bound__ = None  # Has this class been "attached" to a live MongoDB connection? If so, this is the collection.
 	__collection__ = None  # The name of the collection to "attach to" using a call to `bind()`.
 	__projection__ = None  # The set of fields used during projection, to identify fields which are not loaded.
+	__lazy__ = False  # Retrieve raw BSON, decoding values only as accessed; see `marrow.mongo.util.lazy`.
 	
 	# Data Access Options
 	# TODO: Attribute declaration and name allowance.
@@ -58,6 +62,8 @@ class Collection(Identified):
 	def __attributed__(cls):
 		"""Executed after each new subclass is constructed."""
 		
+		super().__attributed__()  # The explicit form is unavailable; we are not yet bound to our name.
+		
 		cls.__projection__ = cls._get_default_projection()
 	
 	# Data Access Binding
@@ -102,6 +108,18 @@ class Collection(Identified):
 		
 		raise TypeError("Can not retrieve collection from: " + repr(target))
 	
+	@classmethod
+	def bulk(cls, target=None, ordered=True, count=COUNT, size=SIZE, interval=None):
+		"""Buffer the insertions, updates, and deletions made within a `with` block, sending them in batches.
+		
+		Calls to `insert_one`, `update_one`, and `delete_one` on instances stored in the same collection are
+		collected, then sent using `bulk_write` upon reaching `count` requests, `size` bytes, or, if given, an age of
+		`interval` seconds. The accumulated results are available as the `result` of the `Bulk` returned. See
+		`marrow.mongo.util.bulk` for details, including error handling.
+		"""
+		
+		return Bulk(cls, cls.get_collection(target), ordered, count, size, interval)
+	
 	@classmethod
 	def create_collection(cls, target=None, drop=False, indexes=True):
 		"""Ensure the collection identified by this document class exists, creating it if not, also creating indexes.
@@ -163,7 +181,7 @@ class Collection(Identified):
 	def _collection_configuration(cls, creation=False):
 		config = {
 				'codec_options': CodecOptions(
-						document_class = cls.__store__,
+						document_class = RawBSONDocument if cls.__lazy__ else cls.__store__,
 						tz_aware = True,
 						uuid_representation = STANDARD,
 						tzinfo = utc,
@@ -214,17 +232,41 @@ class Collection(Identified):
 		if not projected and not omitted:
 			# No preferences specified.
 			return None
-			
+		
 		elif not projected and omitted:
 			# No positive inclusions given, but negative ones were.
 			projected = neutral
 		
 		return {field: True for field in projected}
 	
+	@classmethod
+	def insert_many(cls, documents, ordered=True, validate=True, source=None, parallel=False):
+		"""Insert the given Document instances, an iterable consumed lazily, in batches within the server's limits.
+		
+		Unlike PyMongo's, the documents, possibly produced by a generator, are never all held in memory at once. With
+		`parallel`, each batch is encoded on a background thread while the previous is in flight. Returns an
+		`InsertManyResult`, or raises `BulkFailure` identifying the documents which failed; within a `bulk` block
+		the insertions are buffered, and None returned. See `marrow.mongo.util.bulk` for details.
+		
+		https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.insert_many
+		"""
+		
+		collection = cls.get_collection(source)
+		bulk = active(collection)
+		
+		if bulk is not None:
+			for document in documents:
+				bulk.insert_one(document, validate)
+			
+			return None
+		
+		return insert(collection, documents, ordered, validate, parallel)
+	
 	def insert_one(self, validate=True):
 		"""Insert this document, passing any additional arguments to PyMongo.
 		
-		The `validate` argument translates to the inverse of the `bypass_document_validation` PyMongo option.
+		The `validate` argument translates to the inverse of the `bypass_document_validation` PyMongo option. Within
+		a `bulk` block the insertion is buffered, and None returned.
 		
 		https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.insert_one
 		"""
@@ -233,13 +275,19 @@ class Collection(Identified):
 		kw['bypass_document_validation'] = not validate
 		
 		collection = self.get_collection(kw.pop('source', None))
+		bulk = active(collection)
+		
+		if bulk is not None:
+			return bulk.insert_one(self, validate)
+		
 		return collection.insert_one(self, **kw)
 	
 	def update_one(self, update=None, validate=True, **kw):
 		"""Update this document in the database. Local representations will not be affected.
 		
 		A single positional parameter, `update`, may be provided as a mapping. Keyword arguments (other than those
-		identified in UPDATE_MAPPING) are interpreted as parametric updates, added to any `update` passed in.
+		identified in UPDATE_MAPPING) are interpreted as parametric updates, added to any `update` passed in. Within a
+		`bulk` block the update is buffered, and None returned.
 		
 		https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.update_one
 		"""
@@ -255,13 +303,77 @@ class Collection(Identified):
 		if not update:
 			raise TypeError("Must provide an update operation.")
 		
+		bulk = active(collection)
+		
+		if bulk is not None:
+			return bulk.update_one(self, update, validate)
+		
 		return collection.update_one(D.id == self, update, bypass_document_validation=not validate)
 	
+	def save(self, validate=True):
+		"""Persist this document, sending only the changes made since it was loaded, if tracking changes.
+		
+		Instances of Document classes declaring `__track__` are inserted if they were not loaded from the database,
+		updated using the minimal update (see `Document.as_update`) if they were, and left alone if unchanged, in which
+		case `None` is returned. Without change tracking the stored document is replaced in its entirety, or inserted
+		if not present; unless loaded using a projection and with fields not yet loaded, in which case only the fields
+		loaded are assigned (or unset, if deleted since), preserving those not loaded.
+		
+		The `validate` argument translates to the inverse of the `bypass_document_validation` PyMongo option.
+		"""
+		
+		D = self.__class__
+		collection = self.get_collection()
+		
+		if not D.__track__:
+			unloaded = self.__dict__.get('__unloaded__')
+			
+			if unloaded:  # Replacement would delete the stored values of fields not loaded.
+				data = self.__data__
+				loaded = {name: value for name, value in data.items() if name not in unloaded}
+				loaded.pop('_id', None)
+				update = {'$set': loaded}
+				removed = {field.__name__ for field in D.__fields__.values()} - unloaded - set(data) - {'_id'}
+				
+				if removed:  # Loaded, then deleted.
+					update['$unset'] = dict.fromkeys(sorted(removed), '')
+				
+				return collection.update_one(D.id == self, update, upsert=True, bypass_document_validation=not validate)
+			
+			return collection.replace_one(D.id == self, self, upsert=True, bypass_document_validation=not validate)
+		
+		if '__changes__' not in self.__dict__:  # Neither loaded nor previously saved.
+			result = collection.insert_one(self, bypass_document_validation=not validate)
+		
+		else:
+			update = self.as_update
+			
+			if not update:
+				return None
+			
+			result = collection.update_one(D.id == self, update, bypass_document_validation=not validate)
+		
+		self._begin_tracking()  # pylint:disable=protected-access
+		
+		return result
+	
 	def delete_one(self, source=None, **kw):
 		"""Remove this document from the database, passing additional arguments through to PyMongo.
 		
+		Within a `bulk` block the deletion is buffered, and None returned.
+		
 		https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.delete_one
 		"""
 		
 		collection = self.get_collection(source)
+		identity = current()
+		
+		if identity is not None:  # Whether sent now or buffered, this instance no longer represents a stored document.
+			identity.discard(collection, self.__data__.get('_id'))
+		
+		bulk = active(collection)
+		
+		if bulk is not None:
+			return bulk.delete_one(self, **kw)
+		
 		return collection.delete_one(self.__class__.id == self, **kw)
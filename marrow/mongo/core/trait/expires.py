@@ -32,7 +32,10 @@ class Expires(Document):
 	
 	@classmethod
 	def from_mongo(cls, data, expired=False, **kw):
-		"""In the event a value that has technically already expired is loaded, swap it for None."""
+		"""In the event a value that has technically already expired is loaded, swap it for None.
+		
+		Additional keyword arguments, such as the `siblings` of a projected load, are passed along.
+		"""
 		
 		value = super(Expires, cls).from_mongo(data, **kw)
 		
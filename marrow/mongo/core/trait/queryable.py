@@ -1,18 +1,30 @@
 from collections import OrderedDict as odict
-from functools import reduce
-from operator import and_
+from time import perf_counter
 from typing import Mapping
+from warnings import warn
 
 from pymongo.cursor import CursorType
 
 from ... import F, Filter, P, S
+from ...query import QuerySet
+from ...query.keyset import Page, decode, encode, position, seek, tiebreak
+from ...query.partition import SPLIT, ranges, scan
 from ...trait import Collection
+from ...util.coverage import CoverageWarning, advise
+from ...util.identity import current
+from ...util.lazy import adopt
+from ...util.projection import Siblings
+from ...util.shape import Recorder, fingerprint, shape
 from ....package.loader import traverse
 
 
 class Queryable(Collection):
 	"""EXPERIMENTAL: Extend active collection behaviours to include querying."""
 	
+	__optimize__ = True  # Normalize the combined filter prior to use; see `Filter.optimize`.
+	__statistics__ = None  # A Registry, e.g. `marrow.mongo.util.shape.registry`, to record per-shape statistics in.
+	__advise__ = __debug__  # Warn of queries declared indexes can not serve, in development; see `util.coverage`.
+	
 	UNIVERSAL_OPTIONS = {
 			'collation',
 			'limit',
@@ -26,6 +38,7 @@ class Queryable(Collection):
 			'await',
 			'batch_size',
 			'cursor_type',
+			'hint',
 			'max_time_ms',  # translated -> modifiers['$maxTimeMS']
 			'modifiers',
 			'no_cursor_timeout',
@@ -82,7 +95,7 @@ class Queryable(Collection):
 		options = {}
 		
 		if args:
-			query &= reduce(and_, args)
+			query = query.combine(*args)
 		
 		# Gather any valid options.
 		for key in tuple(kw):
@@ -103,6 +116,9 @@ class Queryable(Collection):
 		if kw:  # Remainder are parametric query fragments.
 			query &= F(cls, **kw)
 		
+		if cls.__optimize__:
+			query = query.optimize()
+		
 		return cls, collection, query, options
 	
 	@classmethod
@@ -187,19 +203,71 @@ class Queryable(Collection):
 		
 		return cls, collection, stages, options
 	
+	@classmethod
+	def _fingerprint(cls, operation, collection, query, options):
+		"""Identify the shape of a query, for the purpose of recording statistics. For internal use only."""
+		
+		sort, projection = options.get('sort'), options.get('projection')
+		
+		return fingerprint(operation, collection.full_name, shape(query, sort, projection))
+	
+	@classmethod
+	def _record(cls, operation, collection, cursor, query, options):
+		"""Wrap a cursor to record statistics about the query it represents, if enabled. For internal use only."""
+		
+		if cls.__statistics__ is None:
+			return cursor
+		
+		return Recorder(cursor, cls.__statistics__, *cls._fingerprint(operation, collection, query, options))
+	
+	@classmethod
+	def _advise(cls, query, options):
+		"""Warn if the declared indexes are not expected to serve a query, if enabled. For internal use only."""
+		
+		if not cls.__advise__:
+			return
+		
+		advice = advise(cls.__indexes__, query, options.get('sort'), options.get('projection'), cls)
+		
+		for problem in advice.problems:
+			message = "{}: {} for query shaped {!r}".format(cls.__name__, problem, shape(query)['query'])
+			warn(message, CoverageWarning, stacklevel=3)  # Per shape, not value, so as to be issued once each.
+	
+	@classmethod
+	def advise(cls, *args, **kw):
+		"""Determine how well the declared indexes serve a query, without executing it.
+		
+		Accepts the same arguments as `find`. Returns an `Advice` instance identifying the index expected to be used, if
+		the sort order is provided by it, and if the query is covered by it. See `marrow.mongo.util.coverage`.
+		"""
+		
+		Doc, collection, query, options = cls._prepare_find(*args, **kw)
+		
+		return advise(cls.__indexes__, query, options.get('sort'), options.get('projection'), cls)
+	
+	@classmethod
+	def _siblings(cls, collection, options):
+		"""Prepare the group sharing the loading of fields omitted by projection, if any were. For internal use only."""
+		
+		siblings = Siblings(cls, collection, options.get('projection'))
+		
+		return siblings if siblings.omitted else None
+	
 	@classmethod
 	def find(cls, *args, **kw):
-		"""Query the collection this class is bound to.
+		"""Query the collection this class is bound to, returning a lazy QuerySet producing instances of this class.
 		
 		Additional arguments are processed according to `_prepare_find` prior to passing to PyMongo, where positional
 		parameters are interpreted as query fragments, parametric keyword arguments combined, and other keyword
-		arguments passed along with minor transformation.
+		arguments passed along with minor transformation. Nothing is executed until the QuerySet is iterated or
+		otherwise consulted; it may be further refined prior. See `marrow.mongo.query.queryset` for details.
 		
 		https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.find
 		"""
 		
 		Doc, collection, query, options = cls._prepare_find(*args, **kw)
-		return collection.find(query, **options)
+		
+		return QuerySet(Doc, collection, query, options)
 	
 	@classmethod
 	def find_one(cls, *args, **kw):
@@ -216,6 +284,9 @@ class Queryable(Collection):
 		
 			Model[identifier]
 		
+		Within an `IdentityMap` scope, lookups by primary key alone return the instance already loaded, if any,
+		without a round trip; see `marrow.mongo.util.identity`.
+		
 		https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.find_one
 		https://www.python.org/dev/peps/pep-0560/#class-getitem
 		"""
@@ -224,9 +295,118 @@ class Queryable(Collection):
 			args = (getattr(cls, cls.__pk__) == args[0], )
 		
 		Doc, collection, query, options = cls._prepare_find(*args, **kw)
-		result = Doc.from_mongo(collection.find_one(query, **options))
+		identity = current()
+		identifier = query.get('_id') if identity is not None and len(query) == 1 and 'skip' not in options else None
+		
+		if identifier is not None and not isinstance(identifier, Mapping):  # A lookup by primary key alone.
+			document = identity.get(collection, identifier, Doc)
+			
+			if document is not None:
+				return document
+		
+		return Doc._find_one(collection, query, options)
+	
+	@classmethod
+	def _find_one(cls, collection, query, options):
+		"""Retrieve and hydrate a single document, recording statistics if enabled. For internal use only."""
+		
+		cls._advise(query, options)
+		start = perf_counter()
+		result = collection.find_one(query, **options)
 		
-		return result
+		if cls.__statistics__ is not None:
+			duration = perf_counter() - start
+			size = len(result.raw) if hasattr(result, 'raw') else 0  # Only measured if `__lazy__`; not re-encoded.
+			cls.__statistics__.record(*cls._fingerprint('find_one', collection, query, options),
+					duration=duration, documents=0 if result is None else 1, size=size)
+		
+		if result is None:
+			return None
+		
+		document = cls.from_mongo(result, siblings=cls._siblings(collection, options))
+		identity = current()
+		
+		return document if identity is None else identity.add(collection, document)
+	
+	@classmethod
+	def lookup(cls, identifiers, **kw):
+		"""Retrieve the documents with the given primary keys, returning an ordered mapping of identifier to instance.
+		
+		Identifiers not found are omitted. Other arguments are interpreted as for `find`. Within an `IdentityMap` scope,
+		only those not already loaded are retrieved, using a single query; see `marrow.mongo.util.identity`.
+		"""
+		
+		identifiers = list(odict.fromkeys(identifiers))  # Unique, in order.
+		identity = current()
+		loaded = {}
+		
+		if identity is not None:
+			collection = cls.get_collection(kw.get('source'))
+			
+			for identifier in identifiers:
+				document = identity.get(collection, identifier, cls)
+				
+				if document is not None:
+					loaded[identifier] = document
+		
+		missing = [identifier for identifier in identifiers if identifier not in loaded]
+		
+		if missing:
+			for document in cls.find(getattr(cls, cls.__pk__).any(missing), **kw):
+				loaded[document.__data__['_id']] = document
+		
+		return odict((identifier, loaded[identifier]) for identifier in identifiers if identifier in loaded)
+	
+	@classmethod
+	def paginate(cls, *args, sort=(), size=20, after=None, **kw):
+		"""Retrieve a page of results using keyset pagination, returning a `Page` of documents.
+		
+		Other arguments are interpreted as for `find`. The sort is given as for `S`, to which `_id` is appended as a
+		tie-breaker. To retrieve the following page, pass the `after` token of the previous one, with the same filter
+		and sort. Rather than skipping preceding results, each page continues from the sort key values of the last
+		result of the previous, so every page costs the same to retrieve regardless of depth, given an index on the
+		sort keys. See `marrow.mongo.query.keyset` for details.
+		"""
+		
+		if 'skip' in kw or 'limit' in kw:
+			raise TypeError("Keyset pagination is controlled by size and continuation token, not skip and limit.")
+		
+		order = tiebreak(S(cls, *sort))
+		results = cls.find(*args, **kw).sort(*order).limit(size + 1)  # One more than needed, to know if there are more.
+		projection = results.options.get('projection')
+		
+		if projection and any(projection.values()):  # Ensure the sort keys are retrieved to continue from.
+			results = results.project(dict(projection, **{name: True for name, direction in order}))
+		
+		if after is not None:
+			results = results.filter(seek(order, decode(order, after)))
+		
+		documents = list(results)
+		
+		if len(documents) <= size:
+			return Page(documents)
+		
+		del documents[size:]
+		
+		return Page(documents, encode(order, position(documents[-1], order)))
+	
+	@classmethod
+	def scan_partitioned(cls, n, *args, split='sample', process=None, workers=None, **kw):
+		"""Retrieve the results of a query as up to n partitions, ranges of `_id`, concurrently on a pool of threads.
+		
+		Other arguments are interpreted as for `find`. The split points dividing the keyspace are selected by `sample`
+		(the default) or `time`, or may be given explicitly as an ordered sequence. Without a `process` callable,
+		Document instances are produced in no particular order, as retrieved; with one, it is called with the QuerySet
+		of each partition, and its results produced as each completes. See `marrow.mongo.query.partition` for details.
+		"""
+		
+		if {'skip', 'limit', 'sort'} & set(kw):
+			raise TypeError("Partitioned scans retrieve every result, in no particular order.")
+		
+		results = cls.find(*args, **kw)
+		points = SPLIT[split](results.collection, results.query, n) if isinstance(split, str) else split
+		
+		return scan([results.filter(bound) if bound else results for bound in ranges(points)], process, workers)
 	
 	# Alias this to conform to Python-native "Collection" API: https://www.python.org/dev/peps/pep-0560/#class-getitem
 	__class_getitem__ = find_one  # Useful on Python 3.7 or above.
@@ -262,14 +442,13 @@ class Queryable(Collection):
 			if tuple(collection.database.client.server_info()['versionArray'][:2]) < (3, 4):  # pragma: no cover
 				raise RuntimeError("Queryable.find_in_sequence only works against MongoDB server versions 3.4 or newer.")
 		
-		return collection.aggregate(stages, **options)
+		return cls._record('aggregate', collection, collection.aggregate(stages, **options), stages, options)
 	
 	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.count
 	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.distinct
 	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.group
 	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.map_reduce
 	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.inline_map_reduce
-	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.parallel_scan
 	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.initialize_unordered_bulk_op
 	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.initialize_ordered_bulk_op
 	
@@ -282,15 +461,20 @@ class Queryable(Collection):
 		if fields:  # Refresh only the requested data.
 			for k in result:  # TODO: Better merge algorithm.
 				if k == ~Doc.id: continue
-				self.__data__[k] = result[k]
+				self.__data__[k] = adopt(result[k], Doc.__store__)
+			
+			unloaded = self.__dict__.get('__unloaded__')
+			
+			if unloaded:  # Those requested, and not returned, are now known to be absent.
+				unloaded.difference_update(options['projection'])
 		else:
-			self.__data__ = result
+			self.__data__ = adopt(result, Doc.__store__)  # Wraps raw BSON if lazily loaded.
+			self.__dict__.pop('__unloaded__', None)
+		
+		self._invalidate()
 		
 		return self
 	
-	
-	# https://api.mongodb.com/python/current/api/pymongo/collection.html#pymongo.collection.Collection.insert_many
-	
 	#def replace(self, *args, **kw):
 	#	"""Replace a single document matching the filter with this document, passing additional arguments to PyMongo.
 	#	
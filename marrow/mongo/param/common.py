@@ -29,17 +29,66 @@ def _operator_choice(conversion, lookup, **kw):
 	return _operator_choice_inner
 
 
+RESOLUTION_LIMIT = 256  # The maximum number of resolved argument names retained per Document subclass.
+
+
+def _resolution_cache(Document):
+	"""Retrieve the cache of resolved argument names for the given Document subclass, or None if not cacheable.
+	
+	The cache is stored on the class itself and discarded when it is redefined or its attributes adjusted; see
+	`Document.__attributed__`. It is bounded, discarding the oldest entries beyond `RESOLUTION_LIMIT`.
+	"""
+	
+	if not isinstance(Document, type) or not hasattr(Document, '__resolved__'):
+		return None
+	
+	cache = Document.__dict__.get('__resolved__')
+	
+	if cache is None:
+		cache = Document.__resolved__ = odict()
+	
+	return cache
+
+
+def _remember(cache, key, value):
+	"""Record a resolution, if there is a cache to record it in, evicting the oldest if full. Returns the value."""
+	
+	if cache is not None:
+		cache[key] = value
+		
+		if len(cache) > RESOLUTION_LIMIT:
+			cache.popitem(last=False)
+	
+	return value
+
+
+def _resolve_argument(Document, prefixes, suffixes, name):
+	"""Split an argument name into its prefix, suffix, and the field it references."""
+	
+	prefix, _, nname = name.partition('__')
+	if prefix in prefixes:
+		name = nname
+	
+	nname, _, suffix = name.rpartition('__')
+	if suffix in suffixes:
+		name = nname
+	
+	field = traverse(Document, name.replace('__', '.'))  # Find the target field.
+	
+	return prefix, suffix, field
+
+
 def _process_arguments(Document, prefixes, suffixes, arguments, passthrough=None):
+	cache = _resolution_cache(Document)
+	recognized = (frozenset(prefixes), frozenset(suffixes))  # Resolution depends only upon the names recognized.
+	
 	for name, value in arguments.items():
-		prefix, _, nname = name.partition('__')
-		if prefix in prefixes:
-			name = nname
-		
-		nname, _, suffix = name.rpartition('__')
-		if suffix in suffixes:
-			name = nname
+		key = recognized + (name, )
 		
-		field = traverse(Document, name.replace('__', '.'))  # Find the target field.
+		try:
+			prefix, suffix, field = cache[key]
+		except (KeyError, TypeError):
+			prefix, suffix, field = _remember(cache, key, _resolve_argument(Document, prefixes, suffixes, name))
 		
 		if passthrough and not passthrough & {prefix, suffix}:  # Typecast the value to MongoDB-safe as needed.
 			value = field._field.transformer.foreign(value, (field, Document))  # pylint:disable=protected-access
@@ -69,7 +69,7 @@ def F(Document, __raw__=None, **filters):
 	Because this utility is likely going to be used frequently it has been given a single-character name.
 	"""
 	
-	ops = Filter(__raw__)
+	ops = []
 	args = _process_arguments(Document, FILTER_PREFIX_MAP, FILTER_OPERATION_MAP, filters)
 	
 	for prefix, suffix, field, value in args:
@@ -81,6 +81,6 @@ def F(Document, __raw__=None, **filters):
 		if prefix:
 			op = prefix(op)
 		
-		ops &= op
+		ops.append(op)
 	
-	return ops
+	return Filter(__raw__).combine(*ops)
@@ -1,6 +1,7 @@
 """Parameterized support akin to Django's ORM or MongoEngine."""
 
 from ...package.loader import traverse
+from .common import _remember, _resolution_cache
 
 
 def P(Document, *fields, **kw):
@@ -27,4 +28,17 @@ def P(Document, *fields, **kw):
 	if not projected:
 		projected = {'_id'}
 	
-	return {str(traverse(Document, name, name)): True for name in projected}
+	cache = _resolution_cache(Document)
+	result = {}
+	
+	for name in projected:
+		key = ('project', name)
+		
+		try:
+			name = cache[key]
+		except (KeyError, TypeError):
+			name = _remember(cache, key, str(traverse(Document, name, name)))
+		
+		result[name] = True
+	
+	return result
@@ -3,11 +3,13 @@
 from pymongo import ASCENDING, DESCENDING
 
 from ...package.loader import traverse
+from .common import _remember, _resolution_cache
 
 
 def S(Document, *fields):
 	"""Generate a MongoDB sort order list using the Django ORM style."""
 	
+	cache = _resolution_cache(Document)
 	result = []
 	
 	for field in fields:
@@ -16,6 +18,14 @@ def S(Document, *fields):
 			result.append((field, direction))
 			continue
 		
+		key = ('sort', field)
+		
+		try:
+			result.append(cache[key])
+			continue
+		except (KeyError, TypeError):
+			pass
+		
 		direction = ASCENDING
 		
 		if not field.startswith('__'):
@@ -29,6 +39,6 @@ def S(Document, *fields):
 		
 		_field = traverse(Document, field, default=None)
 		
-		result.append(((~_field) if _field else field, direction))
+		result.append(_remember(cache, key, ((~_field) if _field else field, direction)))
 	
 	return result
@@ -1,5 +1,6 @@
 """Parameterized support akin to Django's ORM or MongoEngine."""
 
+from collections import OrderedDict as odict
 from operator import __neg__
 from typing import Mapping
 
@@ -115,7 +116,7 @@ def U(Document, __raw__=None, **update):
 				value = cast(value)
 			
 			if operation in ops and ~field in ops[operation] and isinstance(value, Mapping):
-				ops[operation][~field].update(value)
+				ops[operation][~field] = odict(ops[operation][~field], **value)  # Values may be shared; don't modify.
 				continue
 		
 		else:
@@ -9,6 +9,8 @@ from __future__ import unicode_literals
 
 from .ops import Ops, Filter, Update
 from .query import Q  # noqa
+from .template import Param, Template
+from .queryset import QuerySet  # Utilizes parametric helpers, themselves utilizing the above.
 
 
-__all__ = ['Ops', 'Filter', 'Update', 'Q']
+__all__ = ['Ops', 'Filter', 'Update', 'Q', 'Param', 'Template', 'QuerySet']
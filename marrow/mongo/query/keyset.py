@@ -0,0 +1,128 @@
+"""Keyset (seek) pagination: continuing from the last result seen, rather than skipping those preceding it.
+
+Skipping requires the server to walk, then discard, every preceding result; the cost of retrieving a page grows with
+its depth. Instead, the values of the sort keys of the last result of one page become range predicates for the next:
+for a sort of `(a, b)`, results after `(x, y)` are those where `a > x`, or `a == x and b > y`. Served by an index on
+the sort keys, every page costs the same. The `_id` is appended to every sort as a final tie-breaker, so that the
+order is total and no result is repeated or skipped between pages.
+
+The position is conveyed between requests as an opaque (URL-safe) continuation token encoding the sort and those
+values. Tokens are not signed; tampering can only alter the position continued from, and a token produced for a
+different sort is rejected. Sort keys should not be arrays.
+
+	page = Person.paginate(Person.active == True, sort=('-joined', ), size=20)
+	page = Person.paginate(Person.active == True, sort=('-joined', ), size=20, after=page.after)
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as EncodingError
+
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+
+
+__all__ = ['Page', 'tiebreak', 'position', 'seek', 'encode', 'decode']
+
+
+class Page(object):
+	"""A single page of results, and the token to continue from to retrieve the next, if there are more."""
+	
+	__slots__ = ('documents', 'after')
+	
+	def __init__(self, documents, after=None):
+		self.documents = documents  # The Document instances of this page, in order.
+		self.after = after  # The continuation token for the following page, or None if this is the last.
+	
+	def __repr__(self):
+		return "Page({} documents, after={!r})".format(len(self.documents), self.after)
+	
+	def __iter__(self):
+		return iter(self.documents)
+	
+	def __len__(self):
+		return len(self.documents)
+	
+	def __getitem__(self, index):
+		return self.documents[index]
+	
+	@property
+	def more(self):
+		"""Are there further results?"""
+		return self.after is not None
+
+
+def tiebreak(sort):
+	"""Return the given sort, a list of `(field, direction)` pairs, with `_id` appended if not already present."""
+	
+	sort = list(sort)
+	
+	if not any(name == '_id' for name, direction in sort):
+		sort.append(('_id', sort[-1][1] if sort else 1))
+	
+	return sort
+
+
+def _value(data, path):
+	for part in path.split('.'):
+		try:
+			data = data[part]
+		except (LookupError, TypeError):
+			return None  # Absent values sort as null does.
+	
+	return data
+
+
+def position(document, sort):
+	"""Retrieve the stored values of the given sort keys from a Document instance or raw mapping."""
+	
+	data = getattr(document, '__data__', document)
+	
+	return [_value(data, name) for name, direction in sort]
+
+
+def seek(sort, values):
+	"""Construct the filter selecting results following those with the given values of the given sort keys."""
+	
+	clauses = []
+	
+	for i, (name, direction) in enumerate(sort):
+		value = values[i]
+		
+		if value is None and direction != 1:  # Nothing follows null (or absence) in descending order.
+			continue
+		
+		clause = {k: v for (k, d), v in zip(sort[:i], values[:i])}  # Equal in all preceding keys...
+		clause[name] = {'$ne': None} if value is None else {'$gt' if direction == 1 else '$lt': value}  # ...not this.
+		clauses.append(clause)
+		
+		if value is not None and direction != 1:  # Null (or absence) follows every value in descending order.
+			clauses.append(dict(clause, **{name: None}))
+	
+	if len(clauses) == 1:
+		return clauses[0]
+	
+	return {'$or': clauses}
+
+
+def encode(sort, values):
+	"""Produce an opaque continuation token from a sort specification and the values of the last result seen."""
+	
+	sort = [[name, direction] for name, direction in sort]
+	text = json_util.dumps([sort, values], json_options=CANONICAL_JSON_OPTIONS)
+	
+	return urlsafe_b64encode(text.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decode(sort, token):
+	"""Recover the values encoded within a continuation token, ensuring it was produced for the given sort."""
+	
+	try:
+		text = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+		encoded, values = json_util.loads(text, json_options=CANONICAL_JSON_OPTIONS)
+	except (EncodingError, UnicodeDecodeError, ValueError, TypeError):
+		raise ValueError("Invalid continuation token.")
+	
+	if [tuple(i) for i in encoded] != [(name, direction) for name, direction in sort] or len(values) != len(sort):
+		raise ValueError("Continuation token was produced for a different sort order.")
+	
+	return values
@@ -0,0 +1,662 @@
+"""Client-side evaluation of filter documents against documents held in memory.
+
+A filter is compiled once, by `compile_filter` (or `Filter.matcher`), into a chain of closures: a predicate accepting a
+Document instance or plain mapping of stored values, returning True if the document would be matched by MongoDB.
+
+	active = (Account.active == True).matcher()
+	accounts = [account for account in accounts if active(account)]
+
+Supported are the comparison, logical, element (excepting `$jsonSchema`), evaluation (`$regex` and `$mod`) and array
+operators, as well as basic geospatial operators against point locations, stored as GeoJSON Points or legacy
+coordinate pairs. Paths traverse embedded documents and arrays as MongoDB does: a path component may index an
+array, and arrays of embedded documents are searched for any element satisfying the remainder of the path.
+
+Comparison between values of differing BSON type brackets never matches. Naive `datetime` values are treated as UTC.
+Geospatial containment within GeoJSON polygons is approximated using planar geometry, and proximity queries (`$near`,
+`$nearSphere`) filter on distance but do not order results. Collation is not supported. Unsupported operators
+(such as `$where`, `$expr`, and `$text`) raise a `ValueError` when compiled.
+"""
+
+from collections.abc import Mapping  # Not the typing alias; far cheaper to test against.
+from datetime import datetime
+from math import asin, cos, fmod, hypot, radians, sin, sqrt
+from numbers import Number
+from re import Pattern, compile as regex
+
+from bson import Binary, Code, Decimal128, DBRef, Int64, MaxKey, MinKey, ObjectId, Regex, Timestamp
+from bson.tz_util import utc
+
+
+__all__ = ['compile_filter']
+
+
+EARTH_RADIUS = 6378100  # In meters, as used by MongoDB for spherical distance calculation.
+
+COMPOUND = {'$and', '$or', '$nor', '$where', '$expr', '$text'}  # Operators distinguishing queries from expressions.
+
+BRACKETS = {  # The BSON type comparison ordering bracket of common value types, by exact class.
+		MinKey: 0,
+		type(None): 1,
+		int: 2,
+		Int64: 2,
+		float: 2,
+		Decimal128: 2,
+		str: 3,
+		dict: 4,
+		list: 5,
+		bytes: 6,
+		Binary: 6,
+		ObjectId: 7,
+		bool: 8,
+		datetime: 9,
+		Timestamp: 10,
+		Regex: 11,
+		Pattern: 11,
+		MaxKey: 12,
+	}
+
+TYPES = {  # The `$type` aliases and numeric codes, mapped to the bracket they select and a test of the value.
+		'double': (1, lambda v: v.__class__ is float),
+		'string': (2, lambda v: isinstance(v, str)),
+		'object': (3, lambda v: isinstance(v, Mapping)),
+		'array': (4, lambda v: isinstance(v, list)),
+		'binData': (5, lambda v: isinstance(v, bytes)),
+		'objectId': (7, lambda v: isinstance(v, ObjectId)),
+		'bool': (8, lambda v: v.__class__ is bool),
+		'date': (9, lambda v: isinstance(v, datetime)),
+		'null': (10, lambda v: v is None),
+		'regex': (11, lambda v: isinstance(v, (Pattern, Regex))),
+		'dbPointer': (12, lambda v: isinstance(v, DBRef)),
+		'javascript': (13, lambda v: isinstance(v, Code)),
+		'int': (16, lambda v: v.__class__ is int and -2 ** 31 <= v < 2 ** 31),
+		'timestamp': (17, lambda v: isinstance(v, Timestamp)),
+		'long': (18, lambda v: isinstance(v, Int64) or (v.__class__ is int and not -2 ** 31 <= v < 2 ** 31)),
+		'decimal': (19, lambda v: isinstance(v, Decimal128)),
+		'minKey': (-1, lambda v: isinstance(v, MinKey)),
+		'maxKey': (127, lambda v: isinstance(v, MaxKey)),
+	}
+
+TYPES['number'] = (None, lambda v: _bracket(v) == 2)
+TYPES.update({code: (code, test) for code, test in list(TYPES.values()) if code is not None})
+
+FLAGS = {'i': 2, 'm': 8, 's': 16, 'x': 64}  # The `re` module flags for each `$options` character.
+
+
+# Value Comparison
+
+def _bracket(value):
+	"""Determine the BSON type comparison bracket of the given value; values in differing brackets never match."""
+	
+	try:
+		return BRACKETS[value.__class__]
+	except KeyError:
+		pass
+	
+	for kind, bracket in BRACKETS.items():
+		if isinstance(value, kind) and kind is not bool:
+			return bracket
+	
+	if isinstance(value, Mapping):
+		return 4
+	
+	if isinstance(value, Number):
+		return 2
+	
+	return 13
+
+
+def _normalize(value):
+	"""Prepare a scalar value for comparison by Python operators."""
+	
+	cls = value.__class__
+	
+	if cls is Decimal128:
+		return value.to_decimal()
+	
+	if cls is datetime and value.tzinfo is None:
+		return value.replace(tzinfo=utc)
+	
+	return value
+
+
+def _equal(a, b):
+	"""Compare two values for equality as MongoDB would: type bracket sensitive, and key order sensitive."""
+	
+	if a is b:
+		return True
+	
+	bracket = _bracket(a)
+	
+	if bracket != _bracket(b):
+		return False
+	
+	if bracket == 4:
+		return list(a.keys()) == list(b.keys()) and all(_equal(a[k], b[k]) for k in a)
+	
+	if bracket == 5:
+		return len(a) == len(b) and all(_equal(i, j) for i, j in zip(a, b))
+	
+	return _normalize(a) == _normalize(b)
+
+
+def _candidates(values):
+	"""Iterate the values to compare against: each value resolved, and the elements of any which are arrays."""
+	
+	for value in values:
+		yield value
+		
+		if isinstance(value, list):
+			yield from value
+
+
+# Path Resolution
+
+class _Found(list):
+	"""The values found at a path, noting if any array element traversed lacked the remainder of the path."""
+	
+	__slots__ = ('missing', )
+	
+	def __init__(self):
+		super().__init__()
+		self.missing = False  # Such elements are considered null when comparing against null, as by MongoDB.
+
+
+def _resolve(value, parts, index, found, element=False):
+	"""Collect the values at the given path within a document into the `found` list, traversing arrays."""
+	
+	if index == len(parts):
+		found.append(value)
+		return
+	
+	part = parts[index]
+	
+	if isinstance(value, Mapping):
+		if part in value:
+			_resolve(value[part], parts, index + 1, found, element)
+		elif element:
+			found.missing = True
+		
+		return
+	
+	if not isinstance(value, list):
+		if element:
+			found.missing = True
+		
+		return
+	
+	if part.isdigit() and int(part) < len(value):
+		_resolve(value[int(part)], parts, index + 1, found, element)
+	
+	for item in value:
+		if isinstance(item, Mapping):
+			_resolve(item, parts, index, found, True)
+
+
+def _resolver(path):
+	"""Prepare a function returning the list of values found at the given path within a document."""
+	
+	if '.' not in path:
+		def resolve(document):
+			try:
+				return [document[path]]
+			except (KeyError, TypeError, IndexError):
+				return []
+		
+		return resolve
+	
+	parts = path.split('.')
+	
+	def resolve(document):
+		found = _Found()
+		_resolve(document, parts, 0, found)
+		return found
+	
+	return resolve
+
+
+# Operators
+# Each accepts the operand given in the filter and returns a test of the list of values resolved for a field.
+
+def _eq(operand):
+	if operand is None:  # Matches explicit null values, or the field being absent, including from array elements.
+		return lambda values: not values or getattr(values, 'missing', False) or \
+				any(i is None for i in _candidates(values))
+	
+	if isinstance(operand, (Pattern, Regex)):
+		return _regex(operand)
+	
+	bracket = _bracket(operand)
+	
+	if bracket in (2, 3, 7, 9):  # Simple scalars; numbers, strings, ObjectIds, and dates.
+		target = _normalize(operand)
+		
+		def eq(values):
+			for value in _candidates(values):
+				if _bracket(value) == bracket and _normalize(value) == target:
+					return True
+			
+			return False
+		
+		return eq
+	
+	return lambda values: any(_equal(value, operand) for value in _candidates(values))
+
+
+def _ne(operand):
+	eq = _eq(operand)
+	return lambda values: not eq(values)
+
+
+def _comparison(compare, inclusive):
+	def operator(operand):
+		if operand is None:  # Only inclusive comparison against null can match, and only null or absent values.
+			return _eq(None) if inclusive else (lambda values: False)
+		
+		bracket = _bracket(operand)
+		target = _normalize(operand)
+		
+		def test(values):
+			for value in _candidates(values):
+				if _bracket(value) != bracket:
+					continue
+				
+				try:
+					if compare(_normalize(value), target):
+						return True
+				except TypeError:
+					pass
+			
+			return False
+		
+		return test
+	
+	return operator
+
+
+def _in(operand):
+	simple = {}  # Hashable scalars to test for by set membership, by bracket.
+	tests = []  # Tests for any other values.
+	
+	for i in operand:
+		bracket = _bracket(i)
+		
+		if bracket in (2, 3, 7, 9):
+			simple.setdefault(bracket, set()).add(_normalize(i))
+		else:
+			tests.append(_eq(i))
+	
+	def test(values):
+		if simple:
+			for value in _candidates(values):
+				members = simple.get(_bracket(value))
+				
+				if members is not None and _normalize(value) in members:
+					return True
+		
+		return any(other(values) for other in tests)
+	
+	return test
+
+
+def _nin(operand):
+	test = _in(operand)
+	return lambda values: not test(values)
+
+
+def _all(operand):
+	if not operand:
+		return lambda values: False
+	
+	tests = []
+	
+	for i in operand:
+		if isinstance(i, Mapping) and len(i) == 1 and '$elemMatch' in i:
+			tests.append(_elem_match(i['$elemMatch']))
+		else:
+			tests.append(_eq(i))
+	
+	return lambda values: all(test(values) for test in tests)
+
+
+def _size(operand):
+	return lambda values: any(isinstance(i, list) and len(i) == operand for i in values)
+
+
+def _exists(operand):
+	operand = bool(operand)
+	return lambda values: bool(values) is operand
+
+
+def _type(operand):
+	kinds = operand if isinstance(operand, (list, tuple)) else [operand]
+	tests = [TYPES[kind][1] for kind in kinds]
+	
+	def test(values):
+		for value in _candidates(values):
+			if any(kind(value) for kind in tests):
+				return True
+		
+		return False
+	
+	return test
+
+
+def _regex(operand, options=''):
+	if isinstance(operand, Regex):
+		operand = operand.try_compile()
+	
+	flags = 0
+	
+	for option in options or '':
+		flags |= FLAGS.get(option, 0)
+	
+	if isinstance(operand, Pattern):
+		pattern = regex(operand.pattern, operand.flags | flags) if flags else operand
+	else:
+		pattern = regex(operand, flags)
+	
+	search = pattern.search
+	
+	return lambda values: any(isinstance(i, str) and search(i) is not None for i in _candidates(values))
+
+
+def _mod(operand):
+	divisor, remainder = operand
+	
+	def test(values):
+		for value in _candidates(values):
+			if _bracket(value) == 2 and fmod(int(_normalize(value)), divisor) == remainder:
+				return True
+		
+		return False
+	
+	return test
+
+
+def _not(operand):
+	test = _expression(operand)
+	return lambda values: not test(values)
+
+
+def _elem_match(operand):
+	if _operators(operand) and not COMPOUND & set(operand):  # Conditions upon the elements themselves.
+		inner = _expression(operand)
+		test = lambda element: inner([element])  # noqa
+	
+	else:  # A query against embedded documents.
+		query = _query(operand)
+		test = lambda element: isinstance(element, Mapping) and query(element)  # noqa
+	
+	return lambda values: any(isinstance(i, list) and any(test(j) for j in i) for i in values)
+
+
+# Geospatial Operators
+
+def _point(value):
+	"""Interpret a value as a point location, either a GeoJSON Point or legacy coordinate pair, or return None."""
+	
+	if isinstance(value, Mapping):
+		if value.get('type') == 'Point':
+			value = value.get('coordinates')
+		else:
+			value = list(value.values())
+	
+	if isinstance(value, (list, tuple)) and len(value) == 2 and all(_bracket(i) == 2 for i in value):
+		return float(value[0]), float(value[1])
+	
+	return None
+
+
+def _points(values):
+	for value in values:
+		point = _point(value)
+		
+		if point is not None:
+			yield point
+		
+		elif isinstance(value, list):  # An array of locations.
+			for element in value:
+				point = _point(element)
+				
+				if point is not None:
+					yield point
+
+
+def _inside(point, ring):
+	"""Determine if a point is contained within a ring (polygon) of coordinates, using planar ray casting."""
+	
+	x, y = point
+	inside = False
+	j = len(ring) - 1
+	
+	for i in range(len(ring)):
+		xi, yi = ring[i][0], ring[i][1]
+		xj, yj = ring[j][0], ring[j][1]
+		
+		if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+			inside = not inside
+		
+		j = i
+	
+	return inside
+
+
+def _polygons(geometry):
+	"""Return the polygons, each a list of rings, within a GeoJSON Polygon or MultiPolygon."""
+	
+	kind = geometry.get('type')
+	
+	if kind == 'Polygon':
+		return [geometry.get('coordinates')]
+	
+	if kind == 'MultiPolygon':
+		return list(geometry.get('coordinates'))
+	
+	raise ValueError("Unsupported geometry for local evaluation: " + repr(kind))
+
+
+def _in_polygons(point, polygons):
+	for rings in polygons:
+		if _inside(point, rings[0]) and not any(_inside(point, hole) for hole in rings[1:]):
+			return True
+	
+	return False
+
+
+def _arc(a, b):
+	"""The angular distance, in radians, between two (longitude, latitude) points, using the haversine formula."""
+	
+	lng1, lat1, lng2, lat2 = radians(a[0]), radians(a[1]), radians(b[0]), radians(b[1])
+	h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+	
+	return 2 * asin(min(1.0, sqrt(h)))
+
+
+def _geo_within(operand):
+	if '$box' in operand:
+		(x1, y1), (x2, y2) = operand['$box']
+		contains = lambda p: min(x1, x2) <= p[0] <= max(x1, x2) and min(y1, y2) <= p[1] <= max(y1, y2)  # noqa
+	
+	elif '$polygon' in operand:
+		ring = [_point(i) for i in operand['$polygon']]
+		contains = lambda p: _inside(p, ring)  # noqa
+	
+	elif '$center' in operand:
+		center, radius = operand['$center']
+		center = _point(center)
+		contains = lambda p: hypot(p[0] - center[0], p[1] - center[1]) <= radius  # noqa
+	
+	elif '$centerSphere' in operand:
+		center, radius = operand['$centerSphere']
+		center = _point(center)
+		contains = lambda p: _arc(p, center) <= radius  # noqa
+	
+	elif '$geometry' in operand:
+		polygons = _polygons(operand['$geometry'])
+		contains = lambda p: _in_polygons(p, polygons)  # noqa
+	
+	else:
+		raise ValueError("Unsupported $geoWithin for local evaluation: " + repr(operand))
+	
+	return lambda values: any(contains(point) for point in _points(values))
+
+
+def _geo_intersects(operand):
+	geometry = operand['$geometry']
+	
+	if geometry.get('type') == 'Point':
+		target = _point(geometry)
+		return lambda values: any(point == target for point in _points(values))
+	
+	polygons = _polygons(geometry)
+	
+	return lambda values: any(_in_polygons(point, polygons) for point in _points(values))
+
+
+def _near(sphere):
+	def operator(operand, siblings):
+		if isinstance(operand, Mapping) and '$geometry' in operand:  # GeoJSON; spherical distances in meters.
+			center = _point(operand['$geometry'])
+			minimum, maximum = operand.get('$minDistance'), operand.get('$maxDistance')
+			distance = lambda p: _arc(p, center) * EARTH_RADIUS  # noqa
+		
+		else:  # Legacy coordinates; radians if spherical, otherwise in coordinate units.
+			center = _point(operand)
+			minimum, maximum = siblings.get('$minDistance'), siblings.get('$maxDistance')
+			distance = (lambda p: _arc(p, center)) if sphere else (lambda p: hypot(p[0] - center[0], p[1] - center[1]))
+		
+		def test(values):
+			for point in _points(values):
+				d = distance(point)
+				
+				if (minimum is None or d >= minimum) and (maximum is None or d <= maximum):
+					return True
+			
+			return False
+		
+		return test
+	
+	return operator
+
+
+OPERATORS = {
+		'$eq': _eq,
+		'$ne': _ne,
+		'$gt': _comparison(lambda a, b: a > b, False),
+		'$gte': _comparison(lambda a, b: a >= b, True),
+		'$lt': _comparison(lambda a, b: a < b, False),
+		'$lte': _comparison(lambda a, b: a <= b, True),
+		'$in': _in,
+		'$nin': _nin,
+		'$all': _all,
+		'$size': _size,
+		'$exists': _exists,
+		'$type': _type,
+		'$mod': _mod,
+		'$not': _not,
+		'$elemMatch': _elem_match,
+		'$geoWithin': _geo_within,
+		'$within': _geo_within,  # Deprecated alias.
+		'$geoIntersects': _geo_intersects,
+	}
+
+PROXIMITY = {'$near': _near(False), '$nearSphere': _near(True)}  # Operators also accepting sibling options.
+IGNORED = {'$options', '$minDistance', '$maxDistance', '$comment'}  # Consumed by other operators, or meaningless.
+
+
+# Compilation
+
+def _operators(value):
+	return isinstance(value, Mapping) and bool(value) and all(str(k)[:1] == '$' for k in value)
+
+
+def _expression(value):
+	"""Compile the condition applied to a single field: a document of operators, regular expression, or value."""
+	
+	if not _operators(value):
+		return _eq(value)
+	
+	tests = []
+	
+	for op, operand in value.items():
+		if op in IGNORED:
+			continue
+		
+		if op == '$regex':
+			tests.append(_regex(operand, value.get('$options')))
+		
+		elif op in PROXIMITY:
+			tests.append(PROXIMITY[op](operand, value))
+		
+		elif op in OPERATORS:
+			tests.append(OPERATORS[op](operand))
+		
+		else:
+			raise ValueError("Unsupported operator for local evaluation: " + op)
+	
+	if len(tests) == 1:
+		return tests[0]
+	
+	return lambda values: all(test(values) for test in tests)
+
+
+def _clause(field, value):
+	"""Compile a single top-level (or nested query) entry of a filter document."""
+	
+	if field in ('$and', '$or', '$nor'):
+		tests = [_query(i) for i in value]
+		
+		if field == '$and':
+			return lambda document: all(test(document) for test in tests)
+		
+		if field == '$or':
+			return lambda document: any(test(document) for test in tests)
+		
+		return lambda document: not any(test(document) for test in tests)
+	
+	if field == '$comment':
+		return None
+	
+	if field[:1] == '$':
+		raise ValueError("Unsupported operator for local evaluation: " + field)
+	
+	resolve = _resolver(field)
+	test = _expression(value)
+	
+	return lambda document: test(resolve(document))
+
+
+def _query(query):
+	"""Compile a filter document into a predicate accepting a mapping of stored values."""
+	
+	tests = [test for test in (_clause(field, value) for field, value in query.items()) if test is not None]
+	
+	if not tests:
+		return lambda document: True
+	
+	if len(tests) == 1:
+		return tests[0]
+	
+	def conjunction(document):
+		for test in tests:
+			if not test(document):
+				return False
+		
+		return True
+	
+	return conjunction
+
+
+def compile_filter(query):
+	"""Compile a filter document, or Filter instance, into a predicate testing a document for a match.
+	
+	The resulting function accepts a Document instance, or any mapping of stored (foreign) values, such as a raw
+	PyMongo result, returning True if the document is matched by the filter.
+	"""
+	
+	test = _query(query.as_query if hasattr(query, 'as_query') else query)
+	
+	def match(document):
+		return test(getattr(document, '__data__', document))
+	
+	return match
@@ -5,9 +5,10 @@ These encapsulate the functionality of creating combinable mappings
 
 from typing import Mapping, MutableMapping
 from collections import OrderedDict as odict
-from copy import deepcopy
+from numbers import Number
 
 from ..util import SENTINEL
+from .optimize import _comparable, optimize
 
 
 class Ops(MutableMapping):
@@ -94,52 +95,69 @@ class Ops(MutableMapping):
 
 
 class Filter(Ops):
+	"""A combinable MongoDB filter document.
+	
+	Combination never modifies the filters being combined, nor deeply copies them; only the containers which must
+	change as a result of combination are copied, with the remainder shared between the original filters and the
+	result. Consequently nested values of filters which have been combined should be treated as immutable.
+	"""
+	
 	__slots__ = ('operations', 'collection', 'document')
 	
+	def combine(self, *others):
+		"""Boolean AND joining of this filter with any number of others, without modifying any of them.
+		
+		Each container within the resulting filter is copied at most once, regardless of the number of filters
+		combined, making this preferable to repeated application of the `&` operator.
+		"""
+		
+		operations = self.operations.copy()
+		owned = {id(operations)}  # The containers we have copied, and thus are free to modify.
+		
+		for other in others:
+			_conjoin(operations, other.as_query if hasattr(other, 'as_query') else other, owned)
+		
+		return self.__class__(operations=operations, collection=self.collection, document=self.document)
+	
+	def optimize(self):
+		"""Return an equivalent, normalized filter, simplifying the structure left behind by combination.
+		
+		See `marrow.mongo.query.optimize` for the transformations applied.
+		"""
+		
+		return self.__class__(operations=optimize(self.operations), collection=self.collection, document=self.document)
+	
+	def matcher(self):
+		"""Compile this filter into a predicate testing Document instances, or mappings, for a match, client-side.
+		
+		See `marrow.mongo.query.match` for details.
+		"""
+		
+		from .match import compile_filter
+		
+		return compile_filter(self)
+	
+	def prepare(self):
+		"""Prepare this filter, containing `Param` placeholders, for repeated binding of values. Returns a Template."""
+		
+		from .template import Template
+		
+		return Template(self)
+	
 	# Binary Operator Protocols
 	
 	def __and__(self, other):
 		"""Boolean AND joining of filter operations."""
-		operations = deepcopy(self.operations)
-		other = other.as_query if hasattr(other, 'as_query') else other
-		
-		for k, v in other.items():
-			if k not in operations:
-				operations[k] = v
-				continue
-			
-			if k == '$and':
-				operations.setdefault('$and', [])
-				operations['$and'].extend(v)
-				continue
-			
-			elif k == '$or':
-				operations.setdefault('$and', [])
-				operations['$and'].append(odict(((k, v), )))
-				
-				if '$or' in operations:
-					operations['$and'].append(odict((('$or', operations.pop('$or')), )))
-				
-				continue
-			
-			if not isinstance(operations[k], Mapping):
-				operations[k] = odict((('$eq', operations[k]), ))
-			
-			if not isinstance(v, Mapping):
-				v = odict((('$eq', v), ))
-			
-			operations[k].update(v)
-		
-		return self.__class__(operations=operations, collection=self.collection, document=self.document)
+		return self.combine(other)
 	
 	def __or__(self, other):
-		operations = deepcopy(self.operations)
+		operations = self.operations.copy()
 		
 		other = other.as_query if hasattr(other, 'as_query') else other
 		
 		if len(operations) == 1 and '$or' in operations:
-			# Update existing $or.
-			operations['$or'].append(other)
+			# Extend a copy of the existing $or.
+			operations['$or'] = operations['$or'] + [other]
 			return self.__class__(
 					operations = operations,
 					collection = self.collection,
@@ -157,7 +175,7 @@ class Filter(Ops):
 		
 		Equivalent to the MongoDB `$not` operator.
 		"""
-		operations = deepcopy(self.operations)
+		operations = self.operations.copy()
 		
 		return self.__class__(
 				operations = {'$not': operations},
@@ -166,7 +184,70 @@ class Filter(Ops):
 			)
 
 
+def _owned(value, owned, kind):
+	"""Return the given container if it is ours to modify, otherwise a copy of it which will be."""
+	
+	if id(value) not in owned:
+		value = kind(value)
+		owned.add(id(value))
+	
+	return value
+
+
+def _conjoin(operations, other, owned):
+	"""Merge the operations of another filter into ours, in place, copying any other container prior to modifying it.
+	
+	The `owned` set contains the identities of the containers we are free to modify, and is updated with any copies.
+	"""
+	
+	for k, v in other.items():
+		if k not in operations:
+			operations[k] = v
+			continue
+		
+		if k == '$and':
+			operations['$and'] = _owned(operations['$and'], owned, list)
+			operations['$and'].extend(v)
+			continue
+		
+		elif k == '$or':
+			clauses = operations['$and'] = _owned(operations.get('$and', ()), owned, list)
+			clauses.append(odict(((k, v), )))
+			
+			if '$or' in operations:
+				clauses.append(odict((('$or', operations.pop('$or')), )))
+			
+			continue
+		
+		current = operations[k]
+		
+		if not isinstance(current, Mapping):
+			current = odict((('$eq', current), ))
+			owned.add(id(current))
+		else:
+			current = _owned(current, owned, odict)
+		
+		if not isinstance(v, Mapping):
+			v = odict((('$eq', v), ))
+		
+		operations[k] = current
+		current.update(v)
+
+
 class Update(Ops):
+	"""A combinable MongoDB update document.
+	
+	Combination using `&` produces a single update equivalent to applying the left-hand update followed by the right.
+	Repeated operations on the same field are coalesced: `$push` and `$addToSet` values are merged using `$each`,
+	`$inc` and `$mul` amounts are summed or multiplied, and the more restrictive of `$min` or `$max` selected. A later
+	`$set`, `$unset`, or `$currentDate` supersedes any earlier operation on the same field, or fields nested within it;
+	an earlier `$set` or `$unset` is instead updated by later operations where the result can be calculated, e.g. a
+	`$set` followed by an `$inc` becomes a single `$set` of the sum, as are operations on fields nested within a
+	document assigned or unset earlier. Repeated pulls of values, not conditions, are merged using `$in`. Combinations
+	which can not be expressed as a single update, such as pushes utilizing `$position`, repeated `$rename`, or those
+	which would leave operations on the same field, or on a field and one nested within it, raise a `ValueError`.
+	"""
+	
 	__slots__ = ('operations', 'collection', 'document')
 	
 	EACH_COMBINING = {'$addToSet', '$push'}
@@ -179,12 +260,317 @@ class Update(Ops):
 	# Binary Operator Protocols
 	
 	def __and__(self, other):
-		operations = deepcopy(odict(other.operations if hasattr(other, 'operations') else other))
+		operations = odict((op, odict(fields)) for op, fields in self.operations.items())
+		
+		for op, fields in (other.operations if hasattr(other, 'operations') else other).items():
+			for path, value in fields.items():
+				_coalesce(operations, op, path, value)
 		
-		for op in self:
-			for field in self[op]:
-				operations.setdefault(op, odict())
-				# TODO: Handle EACH_COMBINING updates to auto-transform multiple instances.
-				operations[op][field] = self[op][field]
+		operations = odict((op, fields) for op, fields in operations.items() if fields)
+		conflict = _conflict(operations)
+		
+		if conflict:
+			raise ValueError("Can not combine updates of conflicting fields: {} and {}".format(*conflict))
 		
 		return self.__class__(operations=operations, collection=self.collection, document=self.document)
+
+
+SUPERSEDING = {'$set', '$unset', '$currentDate'}  # Update operations replacing the value of a field outright.
+
+
+def _number(value):
+	return isinstance(value, Number) and value.__class__ is not bool
+
+
+def _pushed(value):
+	"""Return the list of values pushed (or added to a set) by the given operation, and any modifiers, e.g. `$sort`."""
+	
+	if isinstance(value, Mapping) and '$each' in value:
+		return list(value['$each']), odict((k, v) for k, v in value.items() if k != '$each')
+	
+	return [value], odict()
+
+
+def _each(op, path, existing, value):
+	"""Merge repeated `$push` or `$addToSet` operations on the same field into one utilizing `$each`."""
+	
+	values, modifiers = _pushed(existing)
+	later, options = _pushed(value)
+	
+	if modifiers or '$position' in options:  # Sorting, slicing, or positioning between pushes can not be merged.
+		raise ValueError("Can not combine {} of {} using modifiers: {!r}, {!r}".format(op, path, existing, value))
+	
+	result = odict((('$each', values + later), ))
+	result.update(options)  # Sorting and slicing apply equally after the combined values are pushed.
+	
+	return result
+
+
+def _arithmetic(combine):
+	def merge(op, path, existing, value):
+		if not _number(existing) or not _number(value):
+			raise ValueError("Can not combine {} of {}: {!r}, {!r}".format(op, path, existing, value))
+		
+		return combine(existing, value)
+	
+	return merge
+
+
+def _bound(select):
+	def merge(op, path, existing, value):
+		if not _comparable(existing, value):
+			raise ValueError("Can not combine {} of {}: {!r}, {!r}".format(op, path, existing, value))
+		
+		return select(existing, value)
+	
+	return merge
+
+
+def _supersede(op, path, existing, value):
+	return value
+
+
+def _pull(op, path, existing, value):
+	"""Merge repeated `$pull` operations of values, not conditions, on the same field into one utilizing `$in`."""
+	
+	values = []
+	
+	for pulled in (existing, value):
+		if isinstance(pulled, Mapping) and list(pulled) == ['$in']:
+			pulled = list(pulled['$in'])
+		elif isinstance(pulled, (Mapping, list)):  # A condition, or a document or array to match exactly.
+			raise ValueError("Can not combine {} of {}: {!r}, {!r}".format(op, path, existing, value))
+		else:
+			pulled = [pulled]
+		
+		values.extend(pulled)
+	
+	return odict((('$in', values), ))
+
+
+def _pull_all(op, path, existing, value):
+	return list(existing) + [i for i in value if i not in existing]
+
+
+MERGING = {  # How to coalesce repeated operations on the same field.
+		'$addToSet': _each,
+		'$currentDate': _supersede,
+		'$inc': _arithmetic(lambda a, b: a + b),
+		'$max': _bound(max),
+		'$min': _bound(min),
+		'$mul': _arithmetic(lambda a, b: a * b),
+		'$pull': _pull,
+		'$pullAll': _pull_all,
+		'$push': _each,
+		'$set': _supersede,
+		'$setOnInsert': _supersede,
+		'$unset': _supersede,
+	}
+
+
+def _fold(op, path, current, value):
+	"""Calculate the value of a field, `current` (or SENTINEL if unset), after the given operation, if possible.
+	
+	Returns SENTINEL if the result can not be determined.
+	"""
+	
+	missing = current is SENTINEL
+	
+	if op in ('$inc', '$mul') and _number(value) and (missing or _number(current)):
+		if op == '$inc':
+			return value if missing else current + value
+		
+		return 0 if missing else current * value  # Multiplying a missing field sets it to zero.
+	
+	if op in ('$min', '$max') and (missing or _comparable(current, value)):
+		return value if missing else (min if op == '$min' else max)(current, value)
+	
+	if op in ('$push', '$addToSet') and (missing or isinstance(current, list)):
+		values, modifiers = _pushed(value)
+		
+		if modifiers:
+			return SENTINEL
+		
+		result = [] if missing else list(current)
+		
+		for item in values:
+			if op == '$push' or item not in result:
+				result.append(item)
+		
+		return result
+	
+	return SENTINEL
+
+
+def _nest(container, parts, value):
+	"""Return a copy of the given nested mapping with the value at the given path assigned, or SENTINEL if not able.
+	
+	A value of SENTINEL removes the path instead.
+	"""
+	
+	if not isinstance(container, Mapping):
+		return SENTINEL
+	
+	result = odict(container)
+	
+	if len(parts) == 1:
+		if value is SENTINEL:
+			result.pop(parts[0], None)
+		else:
+			result[parts[0]] = value
+		
+		return result
+	
+	if value is SENTINEL and parts[0] not in container:  # Nothing to remove.
+		return result
+	
+	nested = _nest(container.get(parts[0], odict()), parts[1:], value)
+	
+	if nested is SENTINEL:
+		return SENTINEL
+	
+	result[parts[0]] = nested
+	
+	return result
+
+
+def _dig(container, parts):
+	"""Return the value at the given path within a nested mapping, SENTINEL if absent, or None if not a mapping."""
+	
+	for part in parts:
+		if not isinstance(container, Mapping):
+			return None
+		
+		container = container.get(part, SENTINEL)
+		
+		if container is SENTINEL:
+			break
+	
+	return container
+
+
+def _enclosing(operations, path):
+	"""Find the nearest field containing the given path which is assigned by `$set`, or removed by `$unset`.
+	
+	Returns the name of the operation and field, or `(None, None)` if there is none.
+	"""
+	
+	parts = path.split('.')
+	
+	for i in range(len(parts) - 1, 0, -1):
+		parent = '.'.join(parts[:i])
+		
+		for op in ('$set', '$unset'):
+			if parent in operations.get(op, ()):
+				return op, parent
+	
+	return None, None
+
+
+def _fold_nested(operations, op, path, value):
+	"""Apply an operation to a field nested within a document assigned or unset earlier, if calculable.
+	
+	Returns True if folded into the `$set` of the enclosing document.
+	"""
+	
+	kind, parent = _enclosing(operations, path)
+	
+	if kind is None:
+		return False
+	
+	if kind == '$unset' and op == '$unset':  # Already removed.
+		return True
+	
+	parts = path.split('.')[parent.count('.') + 1:]
+	container = operations['$set'][parent] if kind == '$set' else odict()
+	
+	if op not in ('$set', '$unset'):
+		current = _dig(container, parts)
+		value = SENTINEL if current is None else _fold(op, path, current, value)
+		
+		if value is SENTINEL:
+			return False
+	
+	result = _nest(container, parts, SENTINEL if op == '$unset' else value)
+	
+	if result is SENTINEL:
+		return False
+	
+	operations.get('$unset', {}).pop(parent, None)
+	operations.setdefault('$set', odict())[parent] = result
+	
+	return True
+
+
+def _conflict(operations):
+	"""Identify two fields updated by the given operations which MongoDB would reject together, if any.
+	
+	Fields conflict if the same, or if one is nested within the other. The destinations of `$rename` are included.
+	"""
+	
+	seen = set()
+	
+	for op, fields in operations.items():
+		for path, value in fields.items():
+			for name in ((path, value) if op == '$rename' else (path, )):
+				if name in seen:
+					return name, name
+				
+				seen.add(name)
+	
+	for name in seen:
+		parts = name.split('.')
+		
+		for i in range(1, len(parts)):
+			parent = '.'.join(parts[:i])
+			
+			if parent in seen:
+				return parent, name
+	
+	return None
+
+
+def _coalesce(operations, op, path, value):
+	"""Apply a single field operation, `op` of `value` to `path`, to the update operations given, in place.
+	
+	The mapping of fields for each operation must be ours to modify, but the values within are not modified.
+	Conflicting operations which can not be combined are left in place, to be identified by `_conflict`.
+	"""
+	
+	if op in SUPERSEDING:  # Discard earlier operations on this field, or fields nested within it.
+		prefix = path + '.'
+		
+		for fields in operations.values():
+			for existing in [i for i in fields if i == path or i.startswith(prefix)]:
+				del fields[existing]
+		
+		if op in ('$set', '$unset') and _fold_nested(operations, op, path, value):
+			return
+		
+		operations.setdefault(op, odict())[path] = value
+		return
+	
+	# Update the result of an earlier $set or $unset, if present and calculable.
+	current = operations.get('$set', {}).get(path, SENTINEL)
+	
+	if current is not SENTINEL or path in operations.get('$unset', {}):
+		folded = _fold(op, path, current, value)
+		
+		if folded is not SENTINEL:
+			operations.get('$unset', {}).pop(path, None)
+			operations.setdefault('$set', odict())[path] = folded
+			return
+	
+	elif _fold_nested(operations, op, path, value):
+		return
+	
+	fields = operations.setdefault(op, odict())
+	
+	if path not in fields:
+		fields[path] = value
+		return
+	
+	if op not in MERGING:
+		raise ValueError("Can not combine repeated {} of {}: {!r}, {!r}".format(op, path, fields[path], value))
+	
+	fields[path] = MERGING[op](op, path, fields[path], value)
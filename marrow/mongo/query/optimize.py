@@ -0,0 +1,240 @@
+"""Normalization of filter documents into smaller, canonical, yet equivalent forms.
+
+Combination of filter fragments using `&` and `|` is purely structural, and can produce nested `$and` and `$or`
+lists, redundant predicates, and `$eq` wrappers. The `optimize` function here rewrites a filter document without
+altering the set of documents it matches:
+
+* Nested `$and` clauses are hoisted into the containing document where no field would be compared twice.
+* Nested `$or` clauses are flattened into their parent, and single-clause `$or` hoisted into the containing document.
+* `$or` branches comparing the same field for equality (or `$in`) are merged into a single `$in` branch.
+* Range bounds (`$gt`, `$gte`, `$lt`, `$lte`) on the same field are merged, retaining only the most restrictive.
+* Duplicate predicates, and `$eq` operators wrapping a plain value, are removed.
+
+The documents given are never modified; unaltered values are shared with the result.
+"""
+
+from collections import OrderedDict as odict
+from numbers import Number
+from re import Pattern
+from typing import Mapping
+
+from bson import Regex
+
+from .template import Param
+
+
+__all__ = ['optimize']
+
+
+LOWER = {'$gt': max, '$gte': max}  # Lower bounds, and how to select the most restrictive of two.
+UPPER = {'$lt': min, '$lte': min}  # Upper bounds, likewise.
+BOUNDS = dict(LOWER, **UPPER)
+OPAQUE = {'$regex', '$options'}  # Operators which must not be combined piecemeal with those of another document.
+
+
+def _operators(value):
+	"""Determine if the given value is a document of query operators, e.g. `{'$gt': 27}`."""
+	
+	return isinstance(value, Mapping) and bool(value) and all(k[:1] == '$' for k in value)
+
+
+def _plain(value):
+	"""Determine if the given value may be compared against without the `$eq` operator, or as a member of `$in`."""
+	
+	return not isinstance(value, (Mapping, Pattern, Regex))
+
+
+def _comparable(a, b):
+	"""Determine if two values are of the same BSON type bracket, and may be ordered relative to each other.
+	
+	Placeholders for values supplied later, when binding a prepared filter, are never comparable.
+	"""
+	
+	if a.__class__ is bool or b.__class__ is bool or isinstance(a, Param) or isinstance(b, Param):
+		return False
+	
+	if isinstance(a, Number) and isinstance(b, Number):
+		return True
+	
+	return a.__class__ is b.__class__ and not isinstance(a, (Mapping, list, Pattern, Regex))
+
+
+def _tighten(value):
+	"""Eliminate redundant bounds within a document of query operators, and unwrap a lone `$eq` of a plain value."""
+	
+	if not _operators(value):
+		return value
+	
+	if len(value) == 1 and '$eq' in value and _plain(value['$eq']):
+		return value['$eq']
+	
+	for inclusive, exclusive, tighter in (('$gte', '$gt', lambda a, b: a > b), ('$lte', '$lt', lambda a, b: a < b)):
+		if inclusive not in value or exclusive not in value:
+			continue
+		
+		if not _comparable(value[inclusive], value[exclusive]):
+			continue
+		
+		value = odict(value)
+		del value[exclusive if tighter(value[inclusive], value[exclusive]) else inclusive]
+	
+	return value
+
+
+def _merge(current, other):
+	"""Attempt to combine two documents of query operators applied to the same field, returning None if not possible.
+	
+	Operators present in only one of the documents are retained, identical operators deduplicated, and differing
+	bounds reduced to the most restrictive.
+	"""
+	
+	if not _operators(current) or not _operators(other) or OPAQUE & (set(current) | set(other)):
+		return None
+	
+	result = odict(current)
+	
+	for op, value in other.items():
+		if op not in result:
+			result[op] = value
+			continue
+		
+		existing = result[op]
+		
+		if existing == value:
+			continue
+		
+		if op not in BOUNDS or not _comparable(existing, value):
+			return None
+		
+		result[op] = BOUNDS[op](existing, value)
+	
+	return _tighten(result)
+
+
+def _equality(clause):
+	"""If the given clause is a single equality (or `$in`) comparison, return the field name and the values compared."""
+	
+	if len(clause) != 1:
+		return None, None
+	
+	field, value = next(iter(clause.items()))
+	
+	if field[:1] == '$':
+		return None, None
+	
+	if _plain(value):
+		return field, [value]
+	
+	if isinstance(value, Mapping) and len(value) == 1 and isinstance(value.get('$in'), list):
+		if all(_plain(i) for i in value['$in']):
+			return field, value['$in']
+	
+	return None, None
+
+
+def _unique(values):
+	"""Return the given values, in order, without duplicates. Values need not be hashable."""
+	
+	result = []
+	
+	for value in values:
+		if value not in result:
+			result.append(value)
+	
+	return result
+
+
+def _disjunction(clauses):
+	"""Optimize the clauses of an `$or`, returning the new list of clauses."""
+	
+	result = []
+	
+	for clause in clauses:
+		clause = _conjunction(clause)
+		
+		if len(clause) == 1 and isinstance(clause.get('$or'), list):
+			result.extend(clause['$or'])  # Already optimized.
+		else:
+			result.append(clause)
+	
+	result = _unique(result)
+	
+	if odict() in result:  # One branch matches everything, so the whole does.
+		return [odict()]
+	
+	groups = odict()  # The clauses to merge, and values compared, for each field compared for equality.
+	
+	for clause in result:
+		field, values = _equality(clause)
+		
+		if field is not None:
+			groups.setdefault(field, ([], []))
+			groups[field][0].append(clause)
+			groups[field][1].extend(values)
+	
+	for field, (merged, values) in groups.items():
+		if len(merged) < 2:
+			continue
+		
+		first = result.index(merged[0])
+		result = [clause for clause in result if not any(clause is i for i in merged)]
+		result.insert(first, odict(((field, odict((('$in', _unique(values)), ))), )))
+	
+	return result
+
+
+def _conjunction(operations):
+	"""Optimize a filter document, the implicit conjunction of its fields, returning the new document."""
+	
+	result = odict()
+	residue = []  # Clauses which could not be hoisted into the result, to remain within `$and`.
+	
+	def absorb(document):
+		document = document.as_query if hasattr(document, 'as_query') else document
+		
+		for field, value in document.items():
+			if field == '$and' and isinstance(value, list):
+				for clause in value:
+					absorb(clause)
+				
+				continue
+			
+			if field == '$or' and isinstance(value, list) and value:
+				value = _disjunction(value)
+				
+				if len(value) == 1:
+					absorb(value[0])
+					continue
+			
+			elif field == '$nor' and isinstance(value, list):
+				value = [_conjunction(clause) for clause in value]
+			
+			elif field[:1] != '$':
+				value = _tighten(value)
+			
+			if field not in result:
+				result[field] = value
+				continue
+			
+			if result[field] == value:
+				continue
+			
+			merged = _merge(result[field], value) if field[:1] != '$' else None
+			
+			if merged is None:
+				residue.append(odict(((field, value), )))
+			else:
+				result[field] = merged
+	
+	absorb(operations)
+	
+	if residue:
+		result['$and'] = _unique(residue)
+	
+	return result
+
+
+def optimize(operations):
+	"""Return an optimized, equivalent form of the given filter document. See the module documentation for details."""
+	
+	return _conjunction(operations)
@@ -0,0 +1,201 @@
+"""Partitioned scanning: dividing a query by ranges of `_id`, the partitions of which are retrieved concurrently.
+
+A single cursor retrieves results one batch at a time, each awaiting the last, leaving both the server and client
+largely idle. Dividing the keyspace of `_id`, always indexed, into contiguous ranges permits each to be retrieved by
+its own cursor, on its own thread, with network transfer, BSON decoding, and hydration overlapping.
+
+Split points dividing the keyspace are selected by one of:
+
+* `sampled`: the quantiles of a random sample of the matching identifiers, via `$sample`, suitable for any type of
+  identifier and for keyspaces unevenly populated over time.
+* `chronological`: evenly dividing the span of time between the generation of the first and last ObjectId, requiring
+  no aggregation; suitable where documents are created at a steady rate.
+
+The first range is open-ended, `$not` following the first split point, so that no identifier, of any type, is
+omitted; every matching document is produced exactly once.
+
+	for person in Person.scan_partitioned(8, Person.active == True):
+		...
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from datetime import datetime, timezone
+from queue import Full, Queue
+from threading import Event
+
+from bson import ObjectId
+
+
+__all__ = ['SPLIT', 'chronological', 'ranges', 'sampled', 'scan']
+
+
+OVERSAMPLE = 20  # Identifiers sampled per partition, to select split points from.
+BUFFER = 1000  # Documents retrieved, but not yet consumed, permitted before workers pause.
+
+
+def _quantiles(identifiers, n):
+	"""Select the distinct values dividing the given ordered identifiers into n runs of roughly equal length."""
+	
+	if not identifiers:
+		return []
+	
+	points = {identifiers[len(identifiers) * i // n] for i in range(1, n)}
+	
+	return sorted(point for point in points if point != identifiers[0])
+
+
+def sampled(collection, query, n, oversample=OVERSAMPLE):
+	"""Select up to n - 1 split points, dividing the identifiers matching the query evenly, from a random sample."""
+	
+	if n < 2:
+		return []
+	
+	query = getattr(query, 'as_query', query)
+	pipeline = [{'$match': query}] if query else []
+	pipeline.extend(({'$sample': {'size': n * oversample}}, {'$project': {'_id': 1}}))
+	
+	return _quantiles(sorted({document['_id'] for document in collection.aggregate(pipeline)}), n)
+
+
+def chronological(collection, query, n):
+	"""Select up to n - 1 split points, evenly dividing the time between the first and last ObjectId matching."""
+	
+	if n < 2:
+		return []
+	
+	first = collection.find_one(query, {'_id': 1}, sort=[('_id', 1)])
+	last = collection.find_one(query, {'_id': 1}, sort=[('_id', -1)])
+	
+	if first is None or last is None:
+		return []
+	
+	first, last = first['_id'], last['_id']
+	
+	if not isinstance(first, ObjectId) or not isinstance(last, ObjectId):
+		raise TypeError("Chronological partitioning requires ObjectId identifiers; use sampled partitioning instead.")
+	
+	start = first.generation_time.timestamp()
+	span = last.generation_time.timestamp() - start
+	points = {ObjectId.from_datetime(datetime.fromtimestamp(start + span * i / n, timezone.utc)) for i in range(1, n)}
+	
+	return sorted(point for point in points if point > first)
+
+
+SPLIT = {'sample': sampled, 'time': chronological}
+
+
+def ranges(points):
+	"""Produce the `_id` filters, together covering the entire keyspace, delimited by the given ordered split points."""
+	
+	if not points:
+		return [{}]
+	
+	points = list(points)
+	result = [{'_id': {'$not': {'$gte': points[0]}}}]  # Including identifiers of other types.
+	
+	for lower, upper in zip(points, points[1:]):
+		result.append({'_id': {'$gte': lower, '$lt': upper}})
+	
+	result.append({'_id': {'$gte': points[-1]}})
+	
+	return result
+
+
+class _Finished(object):
+	"""Marks the exhaustion (or failure) of a partition within the queue of results."""
+	
+	__slots__ = ('index', )
+	
+	def __init__(self, index):
+		self.index = index
+
+
+def _submit(executor, function, *args):
+	"""Submit the call to the executor, run within a copy of the current context, e.g. so an IdentityMap applies."""
+	return executor.submit(copy_context().run, function, *args)
+
+
+def _put(queue, item, stopped):
+	"""Enqueue the given item, waiting for space unless the consumer has stopped; return if enqueued."""
+	
+	while not stopped.is_set():
+		try:
+			queue.put(item, timeout=0.1)
+		except Full:
+			continue
+		
+		return True
+	
+	return False
+
+
+def _drain(index, partition, results, stopped):
+	try:
+		with partition:  # Release the cursor if abandoned early.
+			for document in partition:
+				if not _put(results, document, stopped):
+					break
+	
+	finally:
+		_put(results, _Finished(index), stopped)
+
+
+def _interleave(executor, partitions, buffer):
+	results = Queue(buffer)
+	stopped = Event()
+	futures = [_submit(executor, _drain, i, partition, results, stopped) for i, partition in enumerate(partitions)]
+	remaining = len(futures)
+	
+	try:
+		while remaining:
+			item = results.get()
+			
+			if item.__class__ is _Finished:
+				remaining -= 1
+				futures[item.index].result()  # Re-raise any exception encountered by the worker.
+				continue
+			
+			yield item
+	
+	finally:
+		stopped.set()
+
+
+def scan(partitions, process=None, workers=None, buffer=BUFFER):
+	"""Iterate the given partitions, QuerySets, concurrently, on a pool of at most `workers` threads.
+	
+	Without a `process` callable, the documents of all partitions are produced, interleaved, as retrieved; at most
+	`buffer` retrieved documents will await consumption. With one, it is called with each partition QuerySet, and
+	each partition's result is produced as it completes. Abandoning iteration stops the workers and closes cursors;
+	with a `process` callable, calls not yet started are cancelled, while those in progress, which can not be
+	interrupted, are left to complete in the background. Workers run within a copy of the caller's context.
+	"""
+	
+	partitions = list(partitions)
+	
+	if not partitions:
+		return
+	
+	executor = ThreadPoolExecutor(max_workers=workers or len(partitions))
+	
+	if process is None:
+		try:
+			yield from _interleave(executor, partitions, buffer)
+		
+		finally:
+			executor.shutdown(wait=True)  # Prompt; the workers have been told to stop.
+		
+		return
+	
+	futures = [_submit(executor, process, partition) for partition in partitions]
+	
+	try:
+		for future in as_completed(futures):
+			yield future.result()
+	
+	finally:
+		for future in futures:
+			future.cancel()
+		
+		executor.shutdown(wait=False)
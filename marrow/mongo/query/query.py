@@ -11,6 +11,7 @@ from functools import reduce
 from operator import __and__, __or__, __xor__
 
 from .ops import Filter
+from .template import Param
 
 if __debug__:
 	_simple_safety_check = lambda s, o: (s.__allowed_operators__ and o not in s.__allowed_operators__) \
@@ -157,7 +158,10 @@ class Q(object):
 		if __debug__ and _complex_safety_check(f, {operation} | set(allowed)):  # pragma: no cover
 			raise NotImplementedError("{self!r} does not allow {op} comparison.".format(self=self, op=operation))
 		
-		if other is not None:
+		if isinstance(other, Param):  # Cast later, when bound; see Template.
+			other = other.for_field(f, self._document)
+		
+		elif other is not None:
 			other = f.transformer.foreign(other, (f, self._document))
 		
 		return Filter({self._name: {operation: other}})
@@ -181,10 +185,17 @@ class Q(object):
 		
 		def _t(o):
 			for value in o:
-				yield None if value is None else f.transformer.foreign(value, (f, self._document))
+				if isinstance(value, Param):
+					yield value.for_field(f, self._document)
+				else:
+					yield None if value is None else f.transformer.foreign(value, (f, self._document))
 		
 		other = other if len(other) > 1 else other[0]
-		values = list(_t(other))
+		
+		if isinstance(other, Param):  # The complete set of values will be supplied when bound.
+			values = other.for_field(f, self._document, many=True)
+		else:
+			values = list(_t(other))
 		
 		return Filter({self._name: {operation: values}})
 	
@@ -226,6 +237,9 @@ class Q(object):
 		if __debug__ and _simple_safety_check(self._field, '$eq'):  # pragma: no cover
 			raise NotImplementedError("{self!r} does not allow $eq comparison.".format(self=self))
 		
+		if isinstance(other, Param):  # Cast later, when bound; see Template.
+			return Filter({self._name: other.for_field(f, self._document)})
+		
 		return Filter({self._name: None if other is None else f.transformer.foreign(other, (f, self._document))})
 	
 	def __gt__(self, other):
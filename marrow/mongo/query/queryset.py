@@ -0,0 +1,223 @@
+"""A lazy, chainable description of a query against a Queryable collection, producing Document instances."""
+
+from ...package.loader import traverse
+from ..param import F, P, S
+from ..util.identity import current
+
+
+__all__ = ['QuerySet']
+
+
+class QuerySet(object):
+	"""The result of `Queryable.find`, accumulating the filter and options of a query until iterated.
+	
+	Refinement produces a new QuerySet, leaving the original untouched, so partial queries may be shared and reused:
+	
+		adults = Person.find(Person.age >= 18)
+		recent = adults.sort('-joined').limit(10)
+		
+		for person in recent.project('name', 'joined'):
+			...
+	
+	Iteration executes the query, once, streaming Document instances, hydrated in batches of `batch_size` (by
+	default, 100); as with a PyMongo cursor, results are not retained, and further iteration continues where it left
+	off. Documents retrieved using a projection load omitted fields on access; see `marrow.mongo.util.projection`.
+	Within an `IdentityMap` scope, results already loaded are produced as the existing instance.
+	
+	Counting, testing for existence, retrieval of the first result, and of the values of specific fields, each issue
+	their own query, retrieving no more than needed, without executing (or disturbing) the query as a whole. Slicing
+	produces a new QuerySet with an adjusted skip and limit; indexing retrieves a single result.
+	"""
+	
+	__slots__ = ('document', 'collection', 'query', 'options', 'empty', '_cursor', '_results')
+	
+	def __init__(self, document, collection, query, options=None, empty=False):
+		self.document = document  # The Queryable Document subclass results are instances of.
+		self.collection = collection  # The PyMongo collection to query.
+		self.query = query  # The Filter to apply.
+		self.options = options or {}  # Additional `find` arguments, e.g. `sort`, `projection`, `limit`, or `hint`.
+		self.empty = empty  # Has this been sliced such that no results are possible?
+		self._cursor = None
+		self._results = None
+	
+	def __repr__(self):
+		options = "".join(", {}={!r}".format(k, v) for k, v in sorted(self.options.items()))
+		return "QuerySet({}, {!r}{})".format(self.document.__name__, dict(self.query), options)
+	
+	def _refine(self, query=None, **options):
+		return self.__class__(self.document, self.collection, self.query if query is None else query,
+				dict(self.options, **options), self.empty)
+	
+	# Refinement
+	
+	def filter(self, *args, **kw):
+		"""Return a new QuerySet whose filter also requires the given filter fragments, parametric or otherwise."""
+		
+		Doc = self.document
+		query = self.query.combine(*args) if args else self.query
+		
+		if kw:
+			query &= F(Doc, **kw)
+		
+		return self._refine(query.optimize() if Doc.__optimize__ else query)
+	
+	def sort(self, *fields):
+		"""Return a new QuerySet sorted by the given fields, as for `S`, replacing any existing sort."""
+		return self._refine(sort=S(self.document, *fields))
+	
+	def project(self, *fields):
+		"""Return a new QuerySet retrieving only the given fields, as for `P`, replacing any existing projection."""
+		
+		projection = fields[0] if len(fields) == 1 and isinstance(fields[0], dict) else P(self.document, *fields)
+		
+		return self._refine(projection=projection)
+	
+	def skip(self, count):
+		"""Return a new QuerySet skipping the given number of results."""
+		return self._refine(skip=count)
+	
+	def limit(self, count):
+		"""Return a new QuerySet retrieving at most the given number of results; zero for no limit."""
+		return self._refine(limit=count)
+	
+	def batch_size(self, count):
+		"""Return a new QuerySet retrieving, and hydrating, results in batches of the given size."""
+		return self._refine(batch_size=count)
+	
+	def hint(self, index):
+		"""Return a new QuerySet utilizing the given index: an `Index` instance, name, or list of key pairs."""
+		return self._refine(hint=getattr(index, 'fields', index))
+	
+	# Slicing
+	
+	def __getitem__(self, index):
+		"""Return a new QuerySet narrowed to the given slice of results, or the single result at the given index."""
+		
+		if not isinstance(index, slice):
+			if index < 0:
+				raise IndexError("QuerySet indexes must not be negative.")
+			
+			result = self[index:index + 1].first()
+			
+			if result is None:
+				raise IndexError("QuerySet index out of range.")
+			
+			return result
+		
+		if index.step not in (None, 1) or (index.start or 0) < 0 or (index.stop or 0) < 0:
+			raise ValueError("QuerySets may only be sliced using non-negative bounds, without a step.")
+		
+		skip = self.options.get('skip', 0)
+		limit = self.options.get('limit', 0)
+		start = skip + (index.start or 0)
+		stop = skip + limit if limit else None  # The end of the current window of results, if bounded.
+		
+		if index.stop is not None:
+			stop = skip + index.stop if stop is None else min(stop, skip + index.stop)
+		
+		if stop is None:
+			return self._refine(skip=start)
+		
+		result = self._refine(skip=start, limit=max(stop - start, 0))
+		result.empty = result.empty or stop <= start  # A limit of zero means "no limit" to MongoDB.
+		
+		return result
+	
+	# Execution
+	
+	def __iter__(self):
+		return self
+	
+	def __next__(self):
+		if self._results is None:
+			self._results = self._execute()
+		
+		return next(self._results)
+	
+	next = __next__
+	
+	def _execute(self):
+		if self.empty:
+			return iter(())
+		
+		Doc, collection, query, options = self.document, self.collection, self.query, self.options
+		
+		Doc._advise(query, options)  # pylint:disable=protected-access
+		cursor = self._cursor = collection.find(query, **options)
+		cursor = Doc._record('find', collection, cursor, query, options)  # pylint:disable=protected-access
+		siblings = Doc._siblings(collection, options)  # pylint:disable=protected-access
+		results = Doc.from_mongo_many(cursor, options.get('batch_size') or 100, siblings)
+		identity = current()
+		
+		if identity is not None:  # Substitute the instances already loaded.
+			results = (identity.add(collection, document) for document in results)
+		
+		return results
+	
+	def close(self):
+		"""Release the server-side resources of an executed query prior to its exhaustion."""
+		
+		if self._cursor is not None:
+			self._cursor.close()
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, kind, value, traceback):
+		self.close()
+	
+	# Server-side Shortcuts
+	
+	def _options(self, *names):
+		return {name: self.options[name] for name in names if name in self.options}
+	
+	def count(self):
+		"""Count the results, respecting any skip or limit, without retrieving them."""
+		
+		if self.empty:
+			return 0
+		
+		options = self._options('skip', 'limit', 'hint')
+		
+		for name in ('skip', 'limit'):  # Zero means "none" here; as a `$limit` stage it is rejected.
+			if not options.get(name, True):
+				del options[name]
+		
+		if hasattr(self.collection, 'count_documents'):  # PyMongo 3.7 or later.
+			return self.collection.count_documents(self.query, **options)
+		
+		return self.collection.find(self.query, **options).count(True)  # pragma: no cover
+	
+	def exists(self):
+		"""Determine if there are any results, retrieving at most the identifier of one."""
+		
+		if self.empty:
+			return False
+		
+		return self.collection.find_one(self.query, {'_id': 1}, **self._options('skip', 'hint')) is not None
+	
+	def first(self):
+		"""Retrieve the first result, or None if there are none."""
+		
+		if self.empty:
+			return None
+		
+		options = self._options('sort', 'projection', 'skip', 'hint')
+		
+		return self.document._find_one(self.collection, self.query, options)  # pylint:disable=protected-access
+	
+	def values_list(self, *names):
+		"""Iterate the values of the given fields of each result, retrieving only those fields.
+		
+		Fields are named as for `P`, with dot-separated paths descending into embedded documents. With a single field
+		name, its values are produced; with several, tuples of their values. Absent values are produced as None.
+		"""
+		
+		if not names:
+			raise TypeError("values_list requires at least one field name.")
+		
+		paths = [name.replace('__', '.') for name in names]
+		
+		for document in self.project(*names):
+			values = tuple(traverse(document, path, None) for path in paths)
+			yield values[0] if len(values) == 1 else values
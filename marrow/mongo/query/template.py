@@ -0,0 +1,132 @@
+"""Prepared filter templates, compiled once, with named placeholders for values supplied later."""
+
+from typing import Mapping
+
+
+__all__ = ['Param', 'Template']
+
+
+class Param(object):
+	"""A named placeholder for a value supplied when binding a prepared filter.
+	
+	Used in place of a value when comparing against a field, e.g. `Post.author == Param('author')`, the placeholder
+	records the field being compared against so that values bound to it later are cast using the field's
+	`to_foreign`. See `Template` for details.
+	"""
+	
+	__slots__ = ('name', 'field', 'document', 'many')
+	
+	def __init__(self, name, field=None, document=None, many=False):
+		self.name = name
+		self.field = field  # The field values will be cast using, if any.
+		self.document = document  # The Document class the field was accessed through.
+		self.many = many  # Will the value be an iterable of values to cast individually, e.g. for `$in`?
+	
+	def __repr__(self):
+		return "Param({!r}{})".format(self.name, ", many=True" if self.many else "")
+	
+	def for_field(self, field, document, many=False):
+		"""Return a copy of this placeholder associated with the given field. For internal use by Q."""
+		return self.__class__(self.name, field, document, many)
+	
+	@property
+	def converter(self):
+		"""A callable casting a bound value to its MongoDB-safe form, with field options resolved in advance."""
+		
+		field = self.field
+		
+		if field is None:
+			return lambda value: value
+		
+		foreign = field.transformer.foreign
+		context = (field, self.document)
+		
+		if self.many:
+			return lambda values: [None if value is None else foreign(value, context) for value in values]
+		
+		return lambda value: None if value is None else foreign(value, context)
+
+
+def _dynamic(value):
+	"""Determine if the given filter component contains any placeholders."""
+	
+	if isinstance(value, Param):
+		return True
+	
+	if isinstance(value, Mapping):
+		return any(_dynamic(i) for i in value.values())
+	
+	if isinstance(value, list):
+		return any(_dynamic(i) for i in value)
+	
+	return False
+
+
+def _expression(value, namespace, names):
+	"""Produce the source of an expression reconstructing the given filter component with placeholders substituted.
+	
+	Static components are shared, not copied, being referenced from the namespace of the generated function.
+	"""
+	
+	if isinstance(value, Param):
+		reference = '__p' + str(len(namespace))
+		namespace[reference] = value.converter
+		names.add(value.name)
+		return reference + '(__values[' + repr(value.name) + '])'
+	
+	if not _dynamic(value):
+		reference = '__c' + str(len(namespace))
+		namespace[reference] = value
+		return reference
+	
+	if isinstance(value, Mapping):
+		return '{' + ', '.join(repr(k) + ': ' + _expression(v, namespace, names) for k, v in value.items()) + '}'
+	
+	return '[' + ', '.join(_expression(i, namespace, names) for i in value) + ']'
+
+
+class Template(object):
+	"""A filter prepared once for repeated use, binding values to its named placeholders when called.
+	
+	Construct a filter as usual, utilizing `Param` instances in place of values, then prepare it:
+	
+		latest = ((Post.author == Param('author')) & (Post.published <= Param('now'))).prepare()
+		
+		Post.find(latest(author=user, now=utcnow()))
+	
+	Field resolution, operator safety checks, and filter combination happen once, during preparation. Binding
+	populates a freshly constructed copy of only the portions of the filter containing placeholders, casting each value
+	using the `to_foreign` of the field it was compared against, sharing the remainder.
+	"""
+	
+	__slots__ = ('query', 'names', '_bind')
+	
+	def __init__(self, query):
+		self.query = query
+		self.names = set()  # The names of the placeholders requiring values.
+		
+		namespace = {'__Filter': query.__class__, '__collection': query.collection, '__document': query.document}
+		expression = _expression(query.operations, namespace, self.names)
+		
+		source = "def bind(__values):\n\treturn __Filter(" + expression + ", __collection, __document)\n"
+		exec(compile(source, '<prepared filter>', 'exec'), namespace)  # nosec -- all literal values are referenced
+		
+		self._bind = namespace['bind']
+	
+	def __repr__(self):
+		return "Template({!r})".format(self.query)
+	
+	def __call__(self, **values):
+		"""Bind the given values to their placeholders, by name, returning a new Filter."""
+		
+		names = self.names
+		
+		if len(values) != len(names) or not names.issuperset(values):
+			unknown = set(values) - names
+			
+			if unknown:
+				raise TypeError("Unknown placeholder: " + ", ".join(sorted(unknown)))
+			
+			raise TypeError("Missing value for placeholder: " + ", ".join(sorted(names - set(values))))
+		
+		return self._bind(values)
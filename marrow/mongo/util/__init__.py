@@ -45,6 +45,9 @@ def adjust_attribute_sequence(*fields):
 						key=lambda i: i[1].__sequence__)
 				)
 		
+		if hasattr(cls, '__attributed__'):  # Allow the class to recalculate anything derived from attribute order.
+			cls.__attributed__()
+		
 		return cls
 	
 	return adjust_inner
@@ -0,0 +1,327 @@
+"""Buffered bulk writes: collecting individual insertions, updates, and deletions into batched `bulk_write` calls.
+
+Each call to `insert_one`, `update_one`, or `delete_one` on a bound Document instance is a round trip. Within the scope
+of a `Bulk`, as returned by `Collection.bulk`, those made against the same collection are instead buffered as
+`InsertOne`, `UpdateOne`, and `DeleteOne` requests, sent together once the buffer reaches a number of requests
+(`count`), an estimated encoded size (`size`, in bytes), or, checked as each request is added, an age (`interval`, in
+seconds). Anything remaining is sent when the scope is exited without exception; if exited due to an exception,
+requests not yet sent are discarded.
+
+	with Person.bulk(ordered=False) as bulk:
+		for record in records:
+			Person(**record).insert_one()
+	
+	bulk.result.inserted  # The number of documents inserted.
+
+The counts of each batch are accumulated into a single `BulkResult`. Write errors are mapped back to the Document
+instance responsible. Ordered bulk operations stop at the first error, raising `BulkFailure` from the operation whose
+addition triggered the failing batch (or from the exit of the scope); unordered ones continue, raising `BulkFailure`
+describing every error on exit. Documents to insert are encoded once, when added, to measure them.
+
+Independently, `insert` inserts the Document instances of an iterable, possibly a generator, without materializing it:
+documents are encoded as consumed, grouped into batches within the limits of the server (`maxWriteBatchSize` and
+`maxMessageSizeBytes`), each sent before the next is encoded; optionally, the next is encoded while the previous is in
+flight, using a background thread.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from time import monotonic
+from weakref import WeakKeyDictionary
+
+from bson import ObjectId, encode
+from bson.raw_bson import RawBSONDocument
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo.results import InsertManyResult
+
+
+__all__ = ['Bulk', 'BulkFailure', 'BulkResult', 'active', 'batches', 'insert', 'limits']
+
+
+COUNT = 1000  # Requests buffered before sending.
+SIZE = 8 * 1024 * 1024  # Estimated encoded bytes buffered before sending; half the default maximum message size.
+HEADROOM = 16 * 1024  # Bytes of each message reserved for the command enclosing the documents inserted.
+
+_active = ContextVar('bulk', default=())  # The Bulk scopes entered, innermost last.
+_limits = WeakKeyDictionary()  # The limits reported by the server, per client.
+
+
+def active(collection):
+	"""Return the innermost active Bulk buffering writes to the given collection, or None if there is none."""
+	
+	for bulk in reversed(_active.get()):
+		if bulk.collection == collection:
+			return bulk
+	
+	return None
+
+
+class BulkResult(object):
+	"""The results of each batch sent by a Bulk, accumulated."""
+	
+	__slots__ = ('inserted', 'matched', 'modified', 'deleted', 'upserted', 'batches', 'errors', 'concerns')
+	
+	def __init__(self):
+		self.inserted = 0  # The number of documents inserted.
+		self.matched = 0  # The number of documents matched by updates.
+		self.modified = 0  # The number of documents actually modified by updates.
+		self.deleted = 0  # The number of documents deleted.
+		self.upserted = 0  # The number of documents inserted by upserting updates.
+		self.batches = 0  # The number of `bulk_write` calls made.
+		self.errors = []  # `(document, error)` pairs for each request which failed.
+		self.concerns = []  # Any write concern errors reported.
+	
+	def __repr__(self):
+		counts = ", ".join("{}={}".format(name, getattr(self, name)) for name in self.__slots__[:6])
+		return "BulkResult({}, errors={})".format(counts, len(self.errors))
+	
+	def as_dict(self):
+		return {name: getattr(self, name) for name in self.__slots__}
+	
+	def _accumulate(self, details, documents):
+		self.inserted += details.get('nInserted', 0)
+		self.matched += details.get('nMatched', 0)
+		self.modified += details.get('nModified', 0)
+		self.deleted += details.get('nRemoved', 0)
+		self.upserted += details.get('nUpserted', 0)
+		self.batches += 1
+		self.errors.extend((documents[error['index']], error) for error in details.get('writeErrors', ()))
+		self.concerns.extend(details.get('writeConcernErrors', ()))
+
+
+class BulkFailure(BulkWriteError):
+	"""Raised when requests sent by a Bulk fail; the `errors` identify the Document instance responsible for each."""
+	
+	def __init__(self, result):
+		self.result = result
+		
+		super().__init__({
+				'nInserted': result.inserted,
+				'nMatched': result.matched,
+				'nModified': result.modified,
+				'nRemoved': result.deleted,
+				'nUpserted': result.upserted,
+				'writeErrors': [error for document, error in result.errors],
+				'writeConcernErrors': result.concerns,
+			})
+	
+	@property
+	def errors(self):
+		return self.result.errors
+
+
+class Bulk(object):
+	"""A scope buffering the writes made against a collection, sending them in batches; see the module documentation.
+	
+	Requests may also be added directly, using the `insert_one`, `update_one`, and `delete_one` methods.
+	"""
+	
+	__slots__ = ('document', 'collection', 'ordered', 'count', 'size', 'interval', 'result',
+			'_requests', '_documents', '_bytes', '_started', '_validate', '_token')
+	
+	def __init__(self, document, collection, ordered=True, count=COUNT, size=SIZE, interval=None):
+		self.document = document  # The Document class this scope was created for.
+		self.collection = collection  # The PyMongo collection written to.
+		self.ordered = ordered  # Stop at the first error, executing requests strictly in the order given?
+		self.count = count  # The number of requests to buffer before sending.
+		self.size = size  # The estimated encoded size, in bytes, to buffer before sending.
+		self.interval = interval  # The age, in seconds, of the oldest buffered request to send at, if any.
+		self.result = BulkResult()
+		self._token = None
+		self.clear()
+	
+	def __repr__(self):
+		return "Bulk({}, ordered={}, pending={})".format(self.document.__name__, self.ordered, len(self._requests))
+	
+	def __len__(self):
+		return len(self._requests)
+	
+	def __enter__(self):
+		self._token = _active.set(_active.get() + (self, ))
+		return self
+	
+	def __exit__(self, kind, value, traceback):
+		_active.reset(self._token)
+		
+		if kind is not None:
+			self.clear()
+			return
+		
+		self.flush()
+		
+		if self.result.errors or self.result.concerns:
+			raise BulkFailure(self.result)
+	
+	def clear(self):
+		"""Discard any buffered requests, without sending them."""
+		
+		self._requests = []
+		self._documents = []  # The Document instance each request originated from.
+		self._bytes = 0
+		self._started = None
+		self._validate = True
+	
+	def _add(self, document, request, size, validate):
+		if self._requests and (validate != self._validate or self._bytes + size > self.size):
+			self.flush()  # Validation is controlled per batch; this request will not fit in the current one.
+		
+		if not self._requests:
+			self._started = monotonic()
+			self._validate = validate
+		
+		self._requests.append(request)
+		self._documents.append(document)
+		self._bytes += size
+		
+		if len(self._requests) >= self.count or (self.interval is not None and
+				monotonic() - self._started >= self.interval):
+			self.flush()
+	
+	def insert_one(self, document, validate=True):
+		"""Buffer the insertion of the given Document instance."""
+		
+		data = RawBSONDocument(encode(document, codec_options=self.collection.codec_options))
+		self._add(document, InsertOne(data), len(data.raw), validate)
+	
+	def update_one(self, document, update, validate=True):
+		"""Buffer an update, a mapping of update operations, to the stored copy of the given Document instance."""
+		
+		query = (document.__class__.id == document).as_query
+		update = getattr(update, 'as_query', update)
+		self._add(document, UpdateOne(query, update), len(encode({'q': query, 'u': update})), validate)
+	
+	def delete_one(self, document, **kw):
+		"""Buffer the deletion of the stored copy of the given Document instance; arguments pass to `DeleteOne`."""
+		
+		query = (document.__class__.id == document).as_query
+		self._add(document, DeleteOne(query, **kw), len(encode({'q': query})), self._validate)
+	
+	def flush(self):
+		"""Send any buffered requests, returning the accumulated result."""
+		
+		if not self._requests:
+			return self.result
+		
+		requests, documents, validate = self._requests, self._documents, self._validate
+		self.clear()
+		
+		try:
+			result = self.collection.bulk_write(requests, ordered=self.ordered, bypass_document_validation=not validate)
+		
+		except BulkWriteError as e:
+			self.result._accumulate(e.details, documents)  # pylint:disable=protected-access
+			
+			if self.ordered:
+				raise BulkFailure(self.result) from e
+		
+		else:
+			if result.acknowledged:
+				self.result._accumulate(result.bulk_api_result, documents)  # pylint:disable=protected-access
+			else:
+				self.result.batches += 1
+		
+		return self.result
+
+
+def limits(collection):
+	"""Retrieve the maximum number of writes per batch, and bytes per message, the server will accept.
+	
+	The server is asked once per client; the limits are remembered for as long as the client exists.
+	"""
+	
+	client = collection.database.client
+	
+	try:
+		return _limits[client]
+	except KeyError:
+		pass
+	
+	try:
+		reply = client.admin.command('hello')
+	except OperationFailure:  # MongoDB prior to 4.4.2.
+		reply = client.admin.command('ismaster')
+	
+	result = _limits[client] = reply.get('maxWriteBatchSize', 100000), reply.get('maxMessageSizeBytes', 48000000)
+	
+	return result
+
+
+def batches(documents, codec_options, count, size):
+	"""Encode the given Document instances as consumed, grouped into batches of at most count documents and size bytes.
+	
+	Each batch is a pair of lists: the Document instances, and their encoded `RawBSONDocument` forms. As PyMongo would,
+	an identifier is assigned to any document lacking one.
+	"""
+	
+	instances, encoded, total = [], [], 0
+	
+	for document in documents:
+		if '_id' not in document:
+			document['_id'] = ObjectId()
+		
+		data = RawBSONDocument(encode(document, codec_options=codec_options))
+		
+		if encoded and (len(encoded) >= count or total + len(data.raw) > size):
+			yield instances, encoded
+			instances, encoded, total = [], [], 0
+		
+		instances.append(document)
+		encoded.append(data)
+		total += len(data.raw)
+	
+	if encoded:
+		yield instances, encoded
+
+
+def insert(collection, documents, ordered=True, validate=True, parallel=False):
+	"""Insert the Document instances of the given iterable in batches within the server's limits; see the module.
+	
+	Returns an `InsertManyResult`. Should any insertion fail, `BulkFailure` is raised, immediately if ordered, or
+	after all batches are attempted otherwise.
+	"""
+	
+	count, size = limits(collection)
+	pending = batches(documents, collection.codec_options, count, size - HEADROOM)
+	executor = ThreadPoolExecutor(max_workers=1) if parallel else None
+	following = executor.submit(next, pending, None) if parallel else None
+	result = BulkResult()
+	identifiers = []
+	acknowledged = True
+	
+	try:
+		while True:
+			batch = following.result() if parallel else next(pending, None)
+			
+			if batch is None:
+				break
+			
+			if parallel:  # Encode the following batch while this one is in flight.
+				following = executor.submit(next, pending, None)
+			
+			instances, encoded = batch
+			
+			try:
+				outcome = collection.insert_many(encoded, ordered=ordered, bypass_document_validation=not validate)
+			
+			except BulkWriteError as e:
+				result._accumulate(e.details, instances)  # pylint:disable=protected-access
+				
+				if ordered:
+					raise BulkFailure(result) from e
+				
+				continue
+			
+			result.inserted += len(instances)
+			result.batches += 1
+			identifiers.extend(document['_id'] for document in instances)  # Not reported by PyMongo for raw BSON.
+			acknowledged = acknowledged and outcome.acknowledged
+	
+	finally:
+		if parallel:
+			executor.shutdown(wait=True)
+	
+	if result.errors or result.concerns:
+		raise BulkFailure(result)
+	
+	return InsertManyResult(identifiers, acknowledged)
@@ -0,0 +1,388 @@
+"""Columnar storage of query results, and vectorized evaluation of filters against them, using NumPy.
+
+Requires NumPy, which may be installed using the `columnar` extra: `pip install marrow.mongo[columnar]`
+
+For analytical use, where large result sets are filtered and sliced repeatedly, `Columns` collects the values of each
+scalar field into a NumPy array typed according to the declared field, and evaluates filters built using the usual
+`Q` (or parametric `F`) syntax as vectorized boolean masks, rather than testing each document individually.
+
+	people = Columns(Person, Person.find(projection=('age', 'joined')))
+	adults = people.filter(Person.age >= 18)
+	adults['age'].mean()
+
+Columns are prepared for fields whose stored type is an integer, long, double, number, date, boolean, ObjectId, or
+string. Integers, longs, and doubles are all numbers to MongoDB, compared numerically regardless of type; an integer
+column holding any floating point value is stored as doubles. Stored values of any other type bracket (such as a
+string within a numeric field, or an array) are treated as not comparable, as MongoDB does not compare values across
+brackets. Supported filter operators are the comparison operators, `$exists`, `$mod`, `$not`, and the logical
+operators. Semantics match `marrow.mongo.query.match`, including `None` matching absent fields. Dates are stored with
+millisecond precision in UTC, as MongoDB does.
+"""
+
+from collections.abc import Mapping  # Not the typing alias; far cheaper to test against.
+from datetime import datetime
+from numbers import Number
+
+import numpy
+from bson import ObjectId
+from bson.tz_util import utc
+
+from . import SENTINEL
+
+
+__all__ = ['Columns', 'compile_columnar']
+
+
+def _number(value):
+	return value if isinstance(value, Number) and value.__class__ is not bool else SENTINEL
+
+
+def _boolean(value):
+	return value if value.__class__ is bool else SENTINEL
+
+
+def _date(value):
+	if not isinstance(value, datetime):
+		return SENTINEL
+	
+	if value.tzinfo is not None:
+		value = value.astimezone(utc).replace(tzinfo=None)
+	
+	return numpy.datetime64(value, 'ms')
+
+
+def _identifier(value):
+	return value.binary if value.__class__ is ObjectId else SENTINEL
+
+
+def _string(value):
+	return value if isinstance(value, str) else SENTINEL
+
+
+KINDS = {  # The NumPy dtype, placeholder for invalid values, and conversion of stored values, by `__foreign__` type.
+		'integer': ('int64', 0, _number),
+		'long': ('int64', 0, _number),
+		'double': ('float64', 0.0, _number),
+		'number': ('float64', 0.0, _number),
+		'date': ('datetime64[ms]', numpy.datetime64(0, 'ms'), _date),
+		'bool': ('bool', False, _boolean),
+		'objectId': ('S12', b'', _identifier),
+		'string': ('U', '', _string),
+	}
+
+
+class Column(object):
+	"""The values of a single field, along with masks identifying which are present, null, and valid (comparable)."""
+	
+	__slots__ = ('kind', 'values', 'exists', 'null', 'valid')
+	
+	def __init__(self, kind, values, exists, null, valid):
+		self.kind = kind  # The `__foreign__` type name.
+		self.values = values
+		self.exists = exists
+		self.null = null
+		self.valid = valid
+	
+	def __getitem__(self, selection):
+		return self.__class__(self.kind, self.values[selection], self.exists[selection], self.null[selection],
+				self.valid[selection])
+	
+	def convert(self, value):
+		"""Convert a value compared against to the type of this column, or return SENTINEL if not comparable."""
+		
+		value = KINDS[self.kind][2](value)
+		
+		if value is SENTINEL or self.kind != 'objectId':
+			return value
+		
+		return numpy.bytes_(value)
+
+
+class Columns(object):
+	"""A columnar container of documents, with one NumPy array per scalar field of the given Document subclass.
+	
+	Accepts any iterable of Document instances or mappings of stored values, such as a PyMongo cursor. The values of a
+	field may be retrieved by attribute or stored name using subscripting; other subscripts, such as slices, integer
+	arrays, or boolean masks, select a subset of the documents, returning a new container.
+	"""
+	
+	__slots__ = ('document', 'columns', 'length')
+	
+	def __init__(self, document, documents=(), fields=None, columns=None, length=0):
+		self.document = document
+		self.columns = columns if columns is not None else {}
+		self.length = length
+		
+		if columns is None:
+			self._load(documents, fields)
+	
+	def _load(self, documents, fields):
+		declared = self.document.__fields__
+		plan = []  # The stored name and type of each field to collect.
+		
+		for name in (fields or declared):
+			field = declared[name] if name in declared else None
+			kind = getattr(field, '__foreign__', None)
+			
+			if isinstance(kind, str) and kind in KINDS:
+				plan.append((field.__name__, kind))
+			
+			elif fields:
+				raise ValueError("Field can not be stored in columnar form: " + name)
+		
+		collected = {name: [] for name, kind in plan}
+		length = 0
+		
+		for document in documents:
+			document = getattr(document, '__data__', document)
+			length += 1
+			
+			for name, kind in plan:
+				collected[name].append(document.get(name, SENTINEL))
+		
+		for name, kind in plan:
+			self.columns[name] = self._column(kind, collected[name])
+		
+		self.length = length
+	
+	@staticmethod
+	def _column(kind, values):
+		dtype, placeholder, convert = KINDS[kind]
+		exists = numpy.fromiter((value is not SENTINEL for value in values), bool, len(values))
+		null = numpy.fromiter((value is None for value in values), bool, len(values))
+		values = [convert(value) for value in values]
+		valid = numpy.fromiter((value is not SENTINEL for value in values), bool, len(values))
+		
+		if dtype == 'int64' and any(isinstance(value, float) for value in values):
+			dtype = 'float64'  # An integer field holding a double; truncation would alter comparisons.
+		
+		values = numpy.array([placeholder if value is SENTINEL else value for value in values] or [], dtype=dtype)
+		
+		return Column(kind, values, exists, null, valid)
+	
+	def __repr__(self):
+		return "Columns({}, {} documents, {})".format(self.document.__name__, self.length, ", ".join(self.columns))
+	
+	def __len__(self):
+		return self.length
+	
+	def __contains__(self, name):
+		return name in self.columns
+	
+	def column(self, name):
+		"""Retrieve the Column of the given field, by stored or attribute name."""
+		
+		if name not in self.columns and name in self.document.__fields__:
+			name = self.document.__fields__[name].__name__
+		
+		try:
+			return self.columns[name]
+		except KeyError:
+			raise KeyError("No column for field: " + name)
+	
+	def __getitem__(self, selection):
+		if isinstance(selection, str):
+			return self.column(selection).values
+		
+		if hasattr(selection, 'as_query') or isinstance(selection, Mapping):  # A filter.
+			selection = self.mask(selection)
+		
+		columns = {name: column[selection] for name, column in self.columns.items()}
+		length = len(next(iter(columns.values())).values) if columns else len(range(self.length)[selection])
+		
+		return self.__class__(self.document, columns=columns, length=length)
+	
+	def mask(self, query):
+		"""Evaluate the given filter, returning a boolean array identifying the matching documents."""
+		
+		return compile_columnar(query)(self)
+	
+	def filter(self, query):
+		"""Return a new container of only the documents matching the given filter."""
+		
+		return self[self.mask(query)]
+
+
+# Operators
+# Each accepts the operand given in the filter and returns a function calculating a mask from a Column.
+
+def _none(column):
+	return numpy.zeros(len(column.values), bool)
+
+
+def _eq(operand):
+	if operand is None:
+		return lambda column: ~column.exists | column.null
+	
+	def eq(column):
+		value = column.convert(operand)
+		
+		if value is SENTINEL:
+			return _none(column)
+		
+		return column.valid & (column.values == value)
+	
+	return eq
+
+
+def _ne(operand):
+	eq = _eq(operand)
+	return lambda column: ~eq(column)
+
+
+def _comparison(compare, inclusive):
+	def operator(operand):
+		if operand is None:
+			return _eq(None) if inclusive else _none
+		
+		def test(column):
+			value = column.convert(operand)
+			
+			if value is SENTINEL:
+				return _none(column)
+			
+			return column.valid & compare(column.values, value)
+		
+		return test
+	
+	return operator
+
+
+def _in(operand):
+	null = any(i is None for i in operand)
+	
+	def test(column):
+		values = [value for value in (column.convert(i) for i in operand if i is not None) if value is not SENTINEL]
+		dtype = column.values.dtype if column.kind == 'objectId' else None  # Others not truncated to the column's.
+		result = column.valid & numpy.isin(column.values, numpy.array(values, dtype=dtype)) if values else _none(column)
+		
+		if null:
+			result |= ~column.exists | column.null
+		
+		return result
+	
+	return test
+
+
+def _nin(operand):
+	test = _in(operand)
+	return lambda column: ~test(column)
+
+
+def _exists(operand):
+	if operand:
+		return lambda column: column.exists.copy()
+	
+	return lambda column: ~column.exists
+
+
+def _mod(operand):
+	divisor, remainder = operand
+	
+	def test(column):
+		if column.values.dtype.kind not in 'if':
+			return _none(column)
+		
+		return column.valid & (numpy.fmod(numpy.trunc(column.values), divisor) == remainder)
+	
+	return test
+
+
+def _not(operand):
+	test = _expression(operand)
+	return lambda column: ~test(column)
+
+
+OPERATORS = {
+		'$eq': _eq,
+		'$ne': _ne,
+		'$gt': _comparison(numpy.greater, False),
+		'$gte': _comparison(numpy.greater_equal, True),
+		'$lt': _comparison(numpy.less, False),
+		'$lte': _comparison(numpy.less_equal, True),
+		'$in': _in,
+		'$nin': _nin,
+		'$exists': _exists,
+		'$mod': _mod,
+		'$not': _not,
+	}
+
+
+# Compilation
+
+def _expression(value):
+	"""Compile the condition applied to a single field into a function of the Column."""
+	
+	if not (isinstance(value, Mapping) and value and all(str(k)[:1] == '$' for k in value)):
+		return _eq(value)
+	
+	tests = []
+	
+	for op, operand in value.items():
+		if op not in OPERATORS:
+			raise ValueError("Unsupported operator for columnar evaluation: " + op)
+		
+		tests.append(OPERATORS[op](operand))
+	
+	if len(tests) == 1:
+		return tests[0]
+	
+	def conjunction(column):
+		result = tests[0](column)
+		
+		for test in tests[1:]:
+			result &= test(column)
+		
+		return result
+	
+	return conjunction
+
+
+def _clause(field, value):
+	if field in ('$and', '$or', '$nor'):
+		tests = [_query(i) for i in value]
+		
+		def compound(columns):
+			results = [test(columns) for test in tests]
+			
+			if field == '$and':
+				return numpy.logical_and.reduce(results) if results else numpy.ones(len(columns), bool)
+			
+			result = numpy.logical_or.reduce(results) if results else numpy.zeros(len(columns), bool)
+			
+			return result if field == '$or' else ~result
+		
+		return compound
+	
+	if field == '$comment':
+		return None
+	
+	if field[:1] == '$':
+		raise ValueError("Unsupported operator for columnar evaluation: " + field)
+	
+	test = _expression(value)
+	
+	return lambda columns: test(columns.column(field))
+
+
+def _query(query):
+	tests = [test for test in (_clause(field, value) for field, value in query.items()) if test is not None]
+	
+	def conjunction(columns):
+		result = numpy.ones(len(columns), bool)
+		
+		for test in tests:
+			result &= test(columns)
+		
+		return result
+	
+	return conjunction
+
+
+def compile_columnar(query):
+	"""Compile a filter document, or Filter instance, into a function returning the mask of matching documents.
+	
+	The resulting function accepts a `Columns` instance. Fields compared against must have columns.
+	"""
+	
+	return _query(query.as_query if hasattr(query, 'as_query') else query)
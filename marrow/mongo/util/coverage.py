@@ -0,0 +1,332 @@
+"""Index coverage analysis of queries against the indexes declared by a Document class.
+
+The indexes declared using `Index` attributes describe those which should exist; this permits determining, prior to
+execution and without a round trip, whether a query's filter, sort, and projection can be served by one of them. The
+`advise` function approximates the choices made by the MongoDB query planner:
+
+* An index is usable if the first of its keys is compared against, and any partial filter is a subset of the query.
+* The sort is satisfied if, after keys compared for equality, the index keys match the sort (or its reverse) in order.
+* The query is covered if every field filtered and projected, excepting an excluded `_id`, is a key of the index, no
+  such field is an array, and nothing requires examination of the document itself, such as `$where` or `$elemMatch`.
+
+Each branch of a top-level `$or` requires its own index. Where several indexes are usable, the one covering the
+query, then satisfying the sort, then bounding the most leading keys, is preferred. This is advice, not a guarantee:
+the server may choose differently, e.g. based on the cardinality of the data, and the declared indexes may differ from
+those which actually exist.
+
+	advice = Person.advise(Person.age > 18, sort=('name', ))
+	
+	if not advice.sorted:
+		...
+"""
+
+from re import Pattern
+from typing import Mapping
+
+from bson import Regex
+
+
+__all__ = ['Advice', 'CoverageWarning', 'advise']
+
+
+EQUALITY, MEMBERSHIP, RANGE, OTHER, GEO = 'equality', 'membership', 'range', 'other', 'geo'
+RANK = {EQUALITY: 4, MEMBERSHIP: 3, RANGE: 2, GEO: 2, OTHER: 1}  # Preference when a field is compared repeatedly.
+
+BOUNDING = {'$gt', '$gte', '$lt', '$lte'}
+SPATIAL = {'$near', '$nearSphere', '$geoWithin', '$geoIntersects', '$within'}
+UNINDEXABLE = {'$size', '$where'}  # Operators which can not utilize an index at all.
+EXAMINING = {'$elemMatch', '$where', '$expr', '$text', '$size', '$all', '$type', '$mod'}  # Require the document.
+
+
+class _Implicit(object):
+	"""The index MongoDB maintains on `_id` in every collection, whether declared or not."""
+	
+	def __init__(self):
+		self.__name__ = '_id_'
+		self.fields = [('_id', 1)]
+		self.partial = None
+		self.sparse = False
+
+
+IMPLICIT = _Implicit()
+
+
+class CoverageWarning(RuntimeWarning):
+	"""Issued when a query is expected to scan the whole collection, or sort its results in memory."""
+
+
+class Advice(object):
+	"""The expected suitability of the declared indexes for a given query."""
+	
+	__slots__ = ('indexes', 'sorted', 'covered', 'problems')
+	
+	def __init__(self, indexes=(), sorted=True, covered=False, problems=()):
+		self.indexes = tuple(indexes)  # The names of the indexes expected to be used; one per `$or` branch.
+		self.sorted = sorted  # Is the sort order, if any, provided by the index, avoiding an in-memory sort?
+		self.covered = covered  # Can the query be answered from the index alone, without examining documents?
+		self.problems = list(problems)  # Descriptions of any expected inefficiencies.
+	
+	def __repr__(self):
+		return "Advice(indexes={!r}, sorted={}, covered={})".format(self.indexes, self.sorted, self.covered)
+	
+	@property
+	def scan(self):
+		"""Is a scan of the entire collection expected?"""
+		return not self.indexes
+	
+	def as_dict(self):
+		return {name: getattr(self, name) for name in self.__slots__ + ('scan', )}
+
+
+def _kind(value):
+	"""Classify the comparison made against a single field by how an index may bound it."""
+	
+	if isinstance(value, (Pattern, Regex)):
+		pattern = value.pattern
+		prefix = isinstance(pattern, str) and pattern[:1] == '^' and pattern[1:2].isalnum()
+		return RANGE if prefix else OTHER
+	
+	if not isinstance(value, Mapping) or not value or not all(str(k)[:1] == '$' for k in value):
+		return EQUALITY
+	
+	operators = set(value)
+	
+	if operators & UNINDEXABLE:
+		return None
+	
+	if operators & SPATIAL:
+		return GEO
+	
+	if '$eq' in operators:
+		return EQUALITY
+	
+	if '$in' in operators:
+		return EQUALITY if len(value['$in']) == 1 else MEMBERSHIP
+	
+	if operators & BOUNDING:
+		return RANGE
+	
+	if '$regex' in operators:
+		return _kind(Regex(value['$regex']))
+	
+	return OTHER
+
+
+def _predicates(query, fields=None):
+	"""Gather the kind of comparison made against each field, the `$or` branches, and if the document is examined."""
+	
+	fields = {} if fields is None else fields
+	branches = []
+	examined = False
+	
+	for name, value in query.items():
+		if name == '$and':
+			for clause in value:
+				_, nested, examining = _predicates(clause, fields)
+				branches.extend(nested)
+				examined = examined or examining
+			
+			continue
+		
+		if name == '$or':
+			branches.append(value)
+			continue
+		
+		if name[:1] == '$':
+			if name != '$comment':
+				fields.setdefault(name, None)  # E.g. `$text`, `$where`, or `$nor`.
+				examined = True
+			
+			continue
+		
+		kind = _kind(value)
+		existing = fields.get(name, OTHER)
+		fields[name] = kind if kind is None or existing is None or RANK[kind] >= RANK[existing] else existing
+		
+		if isinstance(value, Mapping) and EXAMINING & set(value):
+			examined = True
+	
+	return fields, branches, examined
+
+
+def _usable(index, fields, query):
+	"""Determine the number of leading keys of the index bounded by the query, zero if the index is not usable."""
+	
+	if index.partial and any(query.get(k) != v for k, v in index.partial.items()):
+		return 0
+	
+	if index.sparse and any(query.get(name) is None for name, direction in index.fields if name in fields):
+		return 0
+	
+	score = 0
+	
+	for name, direction in index.fields:
+		kind = fields.get(name, False)
+		
+		if direction == 'text':
+			return score + 4 if '$text' in fields else 0
+		
+		if not kind or (direction in ('2d', '2dsphere')) != (kind == GEO):
+			break
+		
+		if direction == 'hashed' and kind not in (EQUALITY, MEMBERSHIP):
+			break
+		
+		score += RANK[kind]
+		
+		if kind not in (EQUALITY, MEMBERSHIP):
+			break
+	
+	return score
+
+
+def _sorted(index, fields, sort):
+	"""Determine if walking the index in either direction produces results in the requested sort order."""
+	
+	if not sort:
+		return True
+	
+	sort = [(name, direction) for name, direction in sort if fields.get(name) != EQUALITY]
+	reverse = None
+	
+	for name, direction in index.fields:
+		if not sort:
+			break
+		
+		if direction not in (1, -1):
+			return False
+		
+		if name == sort[0][0]:
+			flipped = direction != sort[0][1]
+			
+			if reverse is not None and reverse != flipped:
+				return False
+			
+			reverse = flipped
+			sort.pop(0)
+			continue
+		
+		if fields.get(name) != EQUALITY:
+			return False
+	
+	return not sort
+
+
+def _covered(index, fields, projection, document):
+	"""Determine if the index contains every field compared against and projected, none of them arrays."""
+	
+	if not projection or not isinstance(projection, Mapping):
+		return False
+	
+	if any(isinstance(value, Mapping) for value in projection.values()):
+		return False  # Projection operators, such as `$slice`, require the document.
+	
+	included = {name for name, value in projection.items() if value}
+	
+	if not included or any(not value and name != '_id' for name, value in projection.items()):
+		return False  # Exclusion projections require the document.
+	
+	if '_id' not in projection:
+		included.add('_id')
+	
+	keys = {name for name, direction in index.fields if direction in (1, -1)}
+	required = included | set(fields)
+	
+	if not required <= keys:
+		return False
+	
+	if document is not None:  # Multikey (array) indexes can not cover queries.
+		stored = {field.__name__: field for field in document.__fields__.values()}
+		
+		for name in required:
+			if getattr(stored.get(name.partition('.')[0]), '__foreign__', None) == 'array':
+				return False
+	
+	return True
+
+
+def _normalize(sort):
+	if sort is None:
+		return []
+	
+	if isinstance(sort, Mapping):
+		return list(sort.items())
+	
+	return [(name, 1) if isinstance(name, str) else tuple(name) for name in sort]
+
+
+def _best(indexes, query, fields, sort, projection, document):
+	"""Select the preferred usable index, returning its name, if the sort is satisfied, and if the query is covered."""
+	
+	best = None
+	
+	for index in indexes:
+		score = _usable(index, fields, query)
+		
+		if not score:
+			continue
+		
+		candidate = (_covered(index, fields, projection, document), _sorted(index, fields, sort), score)
+		
+		if best is None or candidate > best[1]:
+			best = (index, candidate)
+	
+	if best is None:
+		return None, False, False
+	
+	index, (covered, ordered, score) = best
+	
+	return index.__name__, ordered, covered
+
+
+def advise(indexes, query=None, sort=None, projection=None, document=None):
+	"""Determine how well the given indexes, `Index` instances, serve a query; see the module documentation.
+	
+	The query is a filter document, the sort a list of `(field, direction)` pairs, and the projection a mapping, each
+	utilizing stored field names. If the Document class is given, fields which are arrays prevent coverage. The index
+	on `_id` present in every collection need not be given.
+	"""
+	
+	indexes = list(indexes.values() if isinstance(indexes, Mapping) else indexes) + [IMPLICIT]
+	query = query.as_query if hasattr(query, 'as_query') else (query or {})
+	sort = _normalize(sort)
+	fields, branches, examined = _predicates(query)
+	problems = []
+	
+	if branches:  # Every branch must be served by an index, lest the whole collection be scanned.
+		remainder = {k: v for k, v in query.items() if k != '$or'}
+		names = []
+		
+		for clauses in branches:
+			for clause in clauses:
+				merged = {'$and': [remainder, clause]} if set(remainder) & set(clause) else dict(remainder, **clause)
+				names.append(_best(indexes, merged, _predicates(merged)[0], [], None, document)[0])
+		
+		if None in names:
+			names = []
+			problems.append("collection scan: a branch of $or can not utilize an index")
+		
+		if sort:
+			problems.append("in-memory sort: sorting the results of $or")
+		
+		return Advice(names, not sort, False, problems)
+	
+	name, ordered, covered = _best(indexes, query, fields, sort, projection, document)
+	
+	if name is None and sort:  # Walking an index in order still avoids an in-memory sort, if nothing else.
+		for index in indexes:
+			if not index.partial and not index.sparse and _sorted(index, fields, sort):
+				name, ordered = index.__name__, True
+				
+				if fields:
+					problems.append("index scan: the filter does not bound the index walked to sort")
+				
+				break
+	
+	if name is None and (fields or sort):
+		problems.append("collection scan: no declared index can be utilized")
+	
+	if not ordered and sort:
+		problems.append("in-memory sort: no index utilized provides the requested order")
+	
+	return Advice([name] if name else [], ordered or not sort, covered and not examined, problems)
@@ -0,0 +1,108 @@
+"""An opt-in identity map: within its scope, each stored document is represented by at most one loaded instance.
+
+Within a single unit of work, such as the handling of a web request, the same record is often loaded repeatedly, via
+`find_one`, `Model[identifier]`, or as a result of `find`; each a round trip producing a separate instance. Within the
+scope of an `IdentityMap`, entered as a context manager, instances loaded by `Queryable` are remembered by collection
+and `_id`:
+
+* Lookups of a single document by primary key are answered from the map without a round trip, if already loaded.
+* `Queryable.lookup` retrieves only those of the requested identifiers not already loaded.
+* Results of other queries are replaced by the instance already loaded, if any, which is not refreshed.
+
+Only complete instances are remembered. Those loaded using a projection omitting fields are produced as loaded, unless
+a complete instance is already remembered, and never answer later lookups.
+
+	with IdentityMap():
+		author = Author[identifier]
+		assert Author.find_one(identifier) is author
+
+An instance of `IdentityMap` may also be created per request and entered for its duration. Scopes are tracked using
+a context variable, and are thus distinct per thread and asynchronous task. The map holds strong references to the
+instances loaded within it; deletion using `delete_one` removes the deleted instance.
+"""
+
+from contextvars import ContextVar
+
+
+__all__ = ['IdentityMap', 'current']
+
+
+_active = ContextVar('identity', default=None)  # The innermost IdentityMap entered, if any.
+
+
+def current():
+	"""Return the innermost active IdentityMap, or None if there is none."""
+	return _active.get()
+
+
+class IdentityMap(object):
+	"""The instances loaded within a scope, keyed by collection and identifier; see the module documentation."""
+	
+	__slots__ = ('documents', 'hits', '_tokens')
+	
+	def __init__(self):
+		self.documents = {}  # Loaded instances, keyed by `(collection name, identifier)`.
+		self.hits = 0  # The number of lookups answered without a round trip.
+		self._tokens = []
+	
+	def __repr__(self):
+		return "IdentityMap({} documents, hits={})".format(len(self.documents), self.hits)
+	
+	def __len__(self):
+		return len(self.documents)
+	
+	def __enter__(self):
+		self._tokens.append(_active.set(self))
+		return self
+	
+	def __exit__(self, kind, value, traceback):
+		_active.reset(self._tokens.pop())
+	
+	def get(self, collection, identifier, kind=None):
+		"""Return the loaded instance of the given class, if given, with the given identifier, or None."""
+		
+		try:
+			document = self.documents.get((collection.full_name, identifier))
+		except TypeError:  # Unhashable identifiers are never remembered.
+			return None
+		
+		if document is None or (kind is not None and not isinstance(document, kind)):
+			return None
+		
+		self.hits += 1
+		
+		return document
+	
+	def add(self, collection, document):
+		"""Remember the given instance, returning the instance already loaded in its place if there is one."""
+		
+		if document is None:  # E.g. an expired document; see `Expires`.
+			return None
+		
+		try:
+			key = (collection.full_name, document.__data__['_id'])
+			existing = self.documents.get(key)
+		except (KeyError, TypeError):
+			return document
+		
+		if isinstance(existing, document.__class__):
+			return existing
+		
+		if document.__dict__.get('__unloaded__'):  # Loaded using a projection; it can not stand in for the whole.
+			return document
+		
+		self.documents[key] = document  # Loaded as a different class, the most recent is preferred.
+		
+		return document
+	
+	def discard(self, collection, identifier):
+		"""Forget the instance with the given identifier, if loaded."""
+		
+		try:
+			self.documents.pop((collection.full_name, identifier), None)
+		except TypeError:
+			pass
+	
+	def clear(self):
+		"""Forget all loaded instances."""
+		self.documents.clear()
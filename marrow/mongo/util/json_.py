@@ -0,0 +1,189 @@
+"""Schema-aware MongoDB Extended JSON serialization of Document data.
+
+The encoders here produce output identical to `bson.json_util.dumps` using its default (relaxed) options, but select
+the encoding for each value from the declared type of the field it is stored in, once, rather than dispatching
+generically on every value. Values not matching their declared type are passed through to `bson.json_util`.
+"""
+
+from inspect import isclass
+from json.encoder import encode_basestring_ascii as string
+from math import isinf, isnan
+from typing import Mapping
+
+from bson import ObjectId
+from bson.json_util import dumps
+
+
+__all__ = ['compile_encoder', 'iterencode']
+
+
+def _string(value):
+	if value.__class__ is str:
+		return string(value)
+	
+	return dumps(value)
+
+
+def _integer(value):
+	if value.__class__ is int:
+		return int.__repr__(value)
+	
+	return dumps(value)
+
+
+def _double(value):
+	if value.__class__ is float and not (isnan(value) or isinf(value)):
+		return float.__repr__(value)
+	
+	return dumps(value)
+
+
+def _number(value):
+	if value.__class__ is int:
+		return int.__repr__(value)
+	
+	return _double(value)
+
+
+def _boolean(value):
+	if value is True:
+		return 'true'
+	
+	if value is False:
+		return 'false'
+	
+	return dumps(value)
+
+
+def _identifier(value):
+	if value.__class__ is ObjectId:
+		return '{"$oid": "' + str(value) + '"}'
+	
+	return dumps(value)
+
+
+ENCODERS = {  # Encoders for the stored value of each field `__foreign__` type name.
+		'bool': _boolean,
+		'double': _double,
+		'integer': _integer,
+		'long': _integer,
+		'number': _number,
+		'objectId': _identifier,
+		'regex': _string,
+		'string': _string,
+	}
+
+
+def _value(field):
+	"""Select the encoder for values stored in the given field."""
+	
+	from marrow.mongo import Document
+	
+	foreign = field.__foreign__
+	encoder = ENCODERS.get(foreign) if isinstance(foreign, str) else None
+	
+	if encoder:
+		return encoder
+	
+	kind = getattr(field, 'kind', None)
+	
+	if foreign not in ('object', 'array') or kind is None:
+		return dumps
+	
+	if isinstance(kind, str):  # A plugin or dynamic reference; not worth resolving here.
+		return dumps
+	
+	if isclass(kind) and issubclass(kind, Document):
+		item = _embedded(kind)
+	else:
+		item = _value(kind)
+	
+	if foreign == 'object':
+		return item
+	
+	def array(value):
+		if not isinstance(value, list):
+			return dumps(value)
+		
+		return '[' + ', '.join([item(i) for i in value]) + ']'
+	
+	return array
+
+
+def _embedded(kind):
+	"""Prepare an encoder for documents embedded within a field, deferring to the class of Document instances."""
+	
+	def embedded(value):
+		if isinstance(value, kind):
+			return value.__class__._get_encoder()(value.__data__)  # pylint:disable=protected-access
+		
+		if isinstance(value, Mapping):
+			return kind._get_encoder()(value)  # pylint:disable=protected-access
+		
+		return dumps(value)
+	
+	return embedded
+
+
+def compile_encoder(document):
+	"""Prepare a function encoding stored data as JSON, using the field declarations of the given Document subclass.
+	
+	The resulting function accepts a mapping of stored (foreign) values, such as the `__data__` of an instance, and
+	returns the JSON-encoded string. Values stored under names not belonging to a declared field are encoded using
+	`bson.json_util`.
+	"""
+	
+	fields = document.__fields__.values()
+	encoders = {field.__name__: (string(field.__name__) + ': ', _value(field)) for field in fields}
+	
+	def encode(data):
+		parts = []
+		
+		for name, value in data.items():
+			try:
+				key, encoder = encoders[name]
+			except KeyError:
+				parts.append(string(name) + ': ' + dumps(value))
+				continue
+			
+			parts.append(key + ('null' if value is None else encoder(value)))
+		
+		return '{' + ', '.join(parts) + '}'
+	
+	return encode
+
+
+def iterencode(document, docs, chunk=100):
+	"""Encode an iterable of documents, such as a cursor, as a JSON array, yielding it piecewise.
+	
+	Each string yielded contains the encoded representation of up to `chunk` documents. Raw mappings, such as those
+	from a cursor, are encoded using the encoder of the given Document subclass without being loaded as instances.
+	Document instances use that of their own class or, if they override `as_rest`, have the result encoded using
+	`bson.json_util`.
+	"""
+	
+	from marrow.mongo import Document
+	
+	encode = document._get_encoder()  # pylint:disable=protected-access
+	parts = []
+	prefix = '['
+	
+	for doc in docs:
+		if doc is None:
+			parts.append('null')
+		
+		elif isinstance(doc, Document):
+			rest = doc.as_rest
+			parts.append(doc._get_encoder()(doc.__data__) if rest is doc else dumps(rest))  # pylint:disable=W0212
+		
+		else:
+			parts.append(encode(doc))
+		
+		if len(parts) >= chunk:
+			yield prefix + ', '.join(parts)
+			prefix, parts = ', ', []
+	
+	if parts or prefix == '[':
+		yield prefix + ', '.join(parts) + ']'
+	else:
+		yield ']'
@@ -0,0 +1,121 @@
+"""Lazily decoded, copy-on-write document storage backed by raw BSON or other, shared, mappings."""
+
+from collections import OrderedDict as odict
+from collections.abc import Mapping, MutableMapping  # Not the typing aliases; these are far cheaper to test against.
+from datetime import datetime
+
+from bson import ObjectId
+
+
+__all__ = ['LazyStore', 'adopt']
+
+
+ATOMIC = {str, int, float, bool, bytes, type(None), datetime, ObjectId}  # Common values needing no consideration.
+
+
+def adopt(value, store=odict):
+	"""Wrap raw BSON documents or other mappings, including those nested within lists, for use as mutable storage.
+	
+	Lists are copied; Document instances are cloned. Other values are returned as-is.
+	"""
+	
+	if value.__class__ in ATOMIC:
+		return value
+	
+	if isinstance(value, Mapping):
+		if hasattr(value, 'clone') and hasattr(value, '__data__'):  # A Document instance.
+			return value.clone()
+		
+		return LazyStore(value, store)
+	
+	if isinstance(value, list):
+		return [adopt(i, store) for i in value]
+	
+	return value
+
+
+class LazyStore(MutableMapping):
+	"""A mutable mapping over raw BSON, or any other mapping, which is never itself modified.
+	
+	Embedded documents remain encoded until read, and are themselves wrapped lazily. Embedded documents and arrays,
+	once read, are retained so that in-place modification is reflected here. The first assignment or deletion
+	promotes the mapping to a mutable store constructed using the given `store` callable, discarding the raw data.
+	
+	Used as the `__data__` backing store for Document instances loaded from collections declaring `__lazy__`, and to
+	share data copy-on-write between Document instances; see `Document.clone`.
+	"""
+	
+	__slots__ = ('_raw', '_values', '_store')
+	
+	def __init__(self, raw, store=odict):
+		self._raw = raw  # The RawBSONDocument, or other source mapping, until promoted.
+		self._values = {}  # Adopted nested values, or, once promoted, the complete mutable store.
+		self._store = store
+	
+	def __repr__(self):
+		return "{}({!r})".format(self.__class__.__name__, self._raw if self._raw is not None else self._values)
+	
+	@property
+	def promoted(self):
+		"""Has this mapping been promoted to a mutable store?"""
+		return self._raw is None
+	
+	@property
+	def pristine(self):
+		"""Is this mapping an unaltered view of the original data, retaining no values which may have been altered?"""
+		return self._raw is not None and not self._values
+	
+	def promote(self):
+		"""Decode all remaining values, transitioning to a mutable store. Returns the store."""
+		
+		raw = self._raw
+		
+		if raw is not None:
+			values, store = self._values, self._store
+			self._values = store([(name, values[name] if name in values else adopt(value, store))
+					for name, value in raw.items()])
+			self._raw = None
+		
+		return self._values
+	
+	def retain(self, name, value):
+		"""Replace the value of a field with a converted form of it, to be modified in place, without promotion."""
+		
+		if name not in self:
+			raise KeyError(name)
+		
+		self._values[name] = value
+	
+	# Mapping Protocol
+	
+	def __getitem__(self, name):
+		values = self._values
+		
+		if self._raw is None or name in values:
+			return values[name]
+		
+		value = self._raw[name]
+		
+		if value.__class__ not in ATOMIC and isinstance(value, (Mapping, list)):  # Retain these, to allow modification.
+			value = values[name] = adopt(value, self._store)
+		
+		return value
+	
+	def __setitem__(self, name, value):
+		self.promote()[name] = value
+	
+	def __delitem__(self, name):
+		del self.promote()[name]
+	
+	def __iter__(self):
+		return iter(self._values if self._raw is None else self._raw)
+	
+	def __len__(self):
+		return len(self._values if self._raw is None else self._raw)
+	
+	def __contains__(self, name):
+		return name in (self._values if self._raw is None else self._raw)
+	
+	def copy(self):
+		"""Return a shallow copy as an instance of the mutable store type."""
+		return self._store((name, self[name]) for name in self)
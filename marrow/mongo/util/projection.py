@@ -0,0 +1,147 @@
+"""Tracking of fields omitted by projection, and batched loading of them as accessed.
+
+Documents retrieved using a projection lack the omitted fields; without further record, such a field is
+indistinguishable from one never assigned. Documents loaded together, e.g. from the same cursor, may be adopted by a
+`Siblings` group recording the projection used. Access to an omitted (not loaded) field of any member of the group
+retrieves that field, and only that field, for every member still lacking it, using a single query per batch of
+members, rather than one per document.
+
+	people = Person.find(projection=('name', ))  # A list view requiring only the name.
+	
+	for person in people:
+		print(person.name, person.email)  # The e-mail addresses of all are fetched on first access to one.
+
+Only top-level fields are tracked. Those partially projected, e.g. `address.city`, are considered not loaded; those
+projected using operators such as `$slice` or `$elemMatch` are considered loaded, as the subset was asked for.
+Documents lacking their primary key can not have omitted fields loaded, and are not tracked.
+"""
+
+from threading import Lock
+from typing import Mapping
+from weakref import ref
+
+from .lazy import adopt
+
+
+__all__ = ['omitted', 'Siblings']
+
+
+CHUNK = 1000  # The maximum number of identifiers to look up per query.
+
+
+def omitted(Document, projection):
+	"""Determine the stored top-level field names not loaded, and those only partially loaded, under a projection.
+	
+	The projection may be any mapping as accepted by MongoDB, or an iterable of stored field names to include. Returns
+	a tuple of two sets; the partially loaded fields are also included in the first.
+	"""
+	
+	if projection is None:
+		return set(), set()
+	
+	if not isinstance(projection, Mapping):
+		projection = {name: True for name in projection}
+	
+	included, excluded, kept, dropped = set(), set(), set(), set()  # Whole fields, then nested paths, by top level.
+	
+	for name, value in projection.items():
+		top = name.partition('.')[0]
+		
+		if isinstance(value, Mapping):  # An operator, e.g. `$slice`; the subset requested is what is loaded.
+			included.add(top)
+		elif top != name:
+			(kept if value else dropped).add(top)
+		else:
+			(included if value else excluded).add(top)
+	
+	if excluded - {'_id'} or dropped or not (included or kept):  # Exclusion mode.
+		return excluded | dropped, dropped
+	
+	if '_id' not in excluded:
+		included.add('_id')
+	
+	names = {field.__name__ for field in Document.__fields__.values()}
+	
+	return (names | kept) - included, kept
+
+
+class Siblings(object):
+	"""A group of Document instances loaded together under the same projection, sharing the loading of omitted fields.
+	
+	Members are held weakly; the group does not keep them alive. Each member records the stored names of the fields it
+	is yet to load as the `__unloaded__` set within its instance dictionary, and the group as `__siblings__`.
+	"""
+	
+	__slots__ = ('document', 'collection', 'omitted', 'partial', 'members', 'lock', '__weakref__')
+	
+	def __init__(self, document, collection, projection):
+		self.document = document  # The Document subclass whose primary key identifies members.
+		self.collection = collection  # The PyMongo collection to load omitted fields from.
+		self.omitted, self.partial = omitted(document, projection)  # The fields not loaded, and loaded only in part.
+		self.members = []  # Weak references to adopted instances.
+		self.lock = Lock()
+	
+	def __repr__(self):
+		return "Siblings({}, {} members, omitted={})".format(self.document.__name__, len(self.members),
+				", ".join(sorted(self.omitted)))
+	
+	def __bool__(self):
+		return bool(self.omitted)
+	
+	def adopt(self, instance):
+		"""Record the fields not loaded for the given instance, and join it to this group. Returns the instance."""
+		
+		if not self.omitted or instance is None:
+			return instance
+		
+		data = instance.__data__
+		
+		if '_id' not in data:
+			return instance
+		
+		# Values already assigned, e.g. defaults during construction, are considered loaded. Partial ones are not.
+		unloaded = {name for name in self.omitted if name in self.partial or name not in data}
+		
+		instance.__dict__['__unloaded__'] = unloaded
+		instance.__dict__['__siblings__'] = self
+		self.members.append(ref(instance))
+		
+		return instance
+	
+	def load(self, name):
+		"""Retrieve the field of the given stored name for every member not yet having loaded it."""
+		
+		with self.lock:
+			pending = {}  # Members requiring the field, by identifier.
+			members = []
+			
+			for reference in self.members:
+				instance = reference()
+				
+				if instance is None:  # Discard references to members no longer in use.
+					continue
+				
+				members.append(reference)
+				unloaded = instance.__dict__.get('__unloaded__')
+				
+				if unloaded and name in unloaded:
+					pending.setdefault(instance.__data__['_id'], []).append(instance)
+			
+			self.members = members
+			identifiers = list(pending)
+			store = self.document.__store__
+			
+			for i in range(0, len(identifiers), CHUNK):
+				query = {'_id': {'$in': identifiers[i:i + CHUNK]}}
+				
+				for result in self.collection.find(query, {'_id': 1, name: 1}):
+					if name not in result:
+						continue
+					
+					for instance in pending.get(result['_id'], ()):
+						instance.__data__[name] = adopt(result[name], store)
+			
+			for instances in pending.values():
+				for instance in instances:  # Now loaded, even if absent; it is simply not set.
+					instance.__dict__['__unloaded__'].discard(name)
+					instance._invalidate(name)  # pylint:disable=protected-access
@@ -0,0 +1,247 @@
+"""Query shape fingerprinting and per-shape query statistics.
+
+The "shape" of a query is its operator and field structure with all values removed; queries differing only in the
+values compared against share a shape, and are typically satisfied using the same plan. Statistics (the number of
+executions, time spent retrieving results, documents returned, and their size) are recorded per shape in a
+`Registry`, such as the module-level `registry`, which may be inspected or dumped to identify the most costly.
+Recording is opt-in, per Queryable class, by assigning the registry to record in as its `__statistics__`.
+
+	from marrow.mongo.util.shape import registry
+	
+	Person.__statistics__ = registry
+	...
+	
+	for entry in registry.dump()[:10]:
+		print(entry['duration'], entry['count'], entry['shape'])
+
+Time is measured client-side, spanning only the retrieval of results, not processing of them by the application.
+Sizes are those of the BSON returned, and are only available for documents retrieved as raw BSON (see the
+`__lazy__` Collection option); decoded documents are not re-encoded to measure them, and are recorded as zero bytes.
+"""
+
+from hashlib import blake2b
+from json import dumps
+from threading import RLock
+from time import perf_counter
+from typing import Mapping
+
+
+__all__ = ['shape', 'fingerprint', 'Statistics', 'Registry', 'Recorder', 'registry']
+
+
+COMPOUND = {'$and', '$or', '$nor'}  # Operators whose lists are of clauses, not values.
+PLACEHOLDER = '?'  # The stand-in for a removed value.
+
+
+def _shape(value):
+	if isinstance(value, Mapping):
+		return {str(k): (_clauses(v) if k in COMPOUND else _shape(v)) for k, v in value.items()}
+	
+	if isinstance(value, (list, tuple)) and value and all(isinstance(i, Mapping) for i in value):
+		return _clauses(value)  # E.g. aggregate pipeline stages, $elemMatch within $all.
+	
+	return PLACEHOLDER
+
+
+def _clauses(value):
+	if not isinstance(value, (list, tuple)):
+		return PLACEHOLDER
+	
+	return [_shape(i) for i in value]
+
+
+def shape(query=None, sort=None, projection=None):
+	"""Return the shape of a query, its sort order, and projection, as a JSON-serializable value.
+	
+	Values within the query are replaced with a placeholder, excepting the clauses of compound operators. Sort order
+	directions, and projection inclusion or exclusion, are retained, as they also determine the plan used.
+	"""
+	
+	if sort is not None and not isinstance(sort, Mapping):
+		sort = [[str(i[0]), i[1]] if isinstance(i, (list, tuple)) else [str(i), 1] for i in sort]
+	
+	if projection is not None and not isinstance(projection, Mapping):
+		projection = {str(i): 1 for i in projection}
+	
+	elif projection is not None:
+		projection = {str(k): (int(v) if v in (0, 1) else _shape(v)) for k, v in projection.items()}
+	
+	return {
+			'query': _shape(query) if query is not None else None,
+			'sort': sort if sort is None or not isinstance(sort, Mapping) else {str(k): v for k, v in sort.items()},
+			'projection': projection,
+		}
+
+
+def fingerprint(*parts):
+	"""Return a stable (between processes and runs) fingerprint of the given JSON-serializable values, and their text.
+	
+	Typically used with the result of `shape` to produce a short identifier for a query shape.
+	"""
+	
+	text = dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+	
+	return blake2b(text.encode('utf-8'), digest_size=8).hexdigest(), text
+
+
+class Statistics(object):
+	"""Accumulated statistics for a single query shape."""
+	
+	__slots__ = ('fingerprint', 'shape', 'count', 'duration', 'slowest', 'documents', 'bytes')
+	
+	def __init__(self, fingerprint, shape):
+		self.fingerprint = fingerprint
+		self.shape = shape  # The textual (JSON) representation of the shape.
+		self.count = 0  # The number of executions.
+		self.duration = 0.0  # The total time spent retrieving results, in seconds.
+		self.slowest = 0.0  # The longest time spent retrieving the results of a single execution, in seconds.
+		self.documents = 0  # The total number of documents returned.
+		self.bytes = 0  # The total size of the raw BSON documents returned.
+	
+	def __repr__(self):
+		return "Statistics({}, count={}, duration={:.6f})".format(self.fingerprint, self.count, self.duration)
+	
+	@property
+	def mean(self):
+		"""The average time spent retrieving the results of a single execution, in seconds."""
+		return self.duration / self.count if self.count else 0.0
+	
+	def as_dict(self):
+		return {name: getattr(self, name) for name in self.__slots__ + ('mean', )}
+
+
+class Registry(object):
+	"""A thread-safe, in-process registry of statistics, accumulated per query shape fingerprint."""
+	
+	def __init__(self):
+		self._statistics = {}
+		self._lock = RLock()  # Reentrant; garbage collection may record abandoned cursors while it is held.
+	
+	def __repr__(self):
+		return "Registry({} shapes)".format(len(self._statistics))
+	
+	def __len__(self):
+		return len(self._statistics)
+	
+	def __iter__(self):
+		return iter(list(self._statistics.values()))
+	
+	def __contains__(self, fingerprint):
+		return fingerprint in self._statistics
+	
+	def __getitem__(self, fingerprint):
+		return self._statistics[fingerprint]
+	
+	def record(self, fingerprint, shape, duration, documents=0, size=0):
+		"""Record the execution of a query of the given shape."""
+		
+		with self._lock:
+			try:
+				statistics = self._statistics[fingerprint]
+			except KeyError:
+				statistics = self._statistics[fingerprint] = Statistics(fingerprint, shape)
+			
+			statistics.count += 1
+			statistics.duration += duration
+			statistics.documents += documents
+			statistics.bytes += size
+			
+			if duration > statistics.slowest:
+				statistics.slowest = duration
+	
+	def dump(self, order='duration'):
+		"""Return the statistics for every recorded shape as a list of dictionaries, most costly first.
+		
+		The `order` may name any statistic, e.g. `count`, `mean`, `slowest`, `documents`, or `bytes`.
+		"""
+		
+		with self._lock:
+			entries = [statistics.as_dict() for statistics in self._statistics.values()]
+		
+		return sorted(entries, key=lambda entry: entry[order], reverse=True)
+	
+	def reset(self):
+		"""Discard all recorded statistics."""
+		
+		with self._lock:
+			self._statistics.clear()
+
+
+def _size(document):
+	raw = getattr(document, 'raw', None)
+	return len(raw) if raw is not None else 0
+
+
+class Recorder(object):
+	"""Wrap a cursor, recording the statistics of its shape in a registry once exhausted or closed.
+	
+	Other attributes are retrieved from the wrapped cursor. Only time spent waiting for results is measured.
+	"""
+	
+	__slots__ = ('cursor', 'registry', 'fingerprint', 'shape', 'duration', 'documents', 'bytes', 'recorded')
+	
+	def __init__(self, cursor, registry, fingerprint, shape):
+		self.cursor = cursor
+		self.registry = registry
+		self.fingerprint = fingerprint
+		self.shape = shape
+		self.duration = 0.0
+		self.documents = 0
+		self.bytes = 0
+		self.recorded = False
+	
+	def __repr__(self):
+		return "Recorder({!r}, {})".format(self.cursor, self.fingerprint)
+	
+	def __getattr__(self, name):
+		if name in Recorder.__slots__:  # Not yet assigned; avoid infinite recursion.
+			raise AttributeError(name)
+		
+		return getattr(self.cursor, name)
+	
+	def __iter__(self):
+		return self
+	
+	def __next__(self):
+		start = perf_counter()
+		
+		try:
+			document = next(self.cursor)
+		except StopIteration:
+			self.duration += perf_counter() - start
+			self.record()
+			raise
+		
+		self.duration += perf_counter() - start
+		self.documents += 1
+		self.bytes += _size(document)
+		
+		return document
+	
+	next = __next__
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, kind, value, traceback):
+		self.close()
+	
+	def __del__(self):
+		if hasattr(self, 'recorded'):  # Construction may have failed.
+			self.record()
+	
+	def record(self):
+		"""Record the statistics gathered so far, if not already recorded. Called automatically."""
+		
+		if self.recorded:
+			return
+		
+		self.recorded = True
+		self.registry.record(self.fingerprint, self.shape, self.duration, self.documents, self.bytes)
+	
+	def close(self):
+		self.record()
+		self.cursor.close()
+
+
+registry = Registry()  # A shared registry, for use as Queryable.__statistics__.
@@ -0,0 +1,173 @@
+"""Whole-document validation, compiled once per Document subclass from its field declarations."""
+
+from datetime import datetime
+from inspect import isclass
+from numbers import Number
+from re import Pattern
+from typing import Mapping
+
+from bson import Decimal128, DBRef, ObjectId, Regex, Timestamp
+
+from ...schema.exc import Concern
+from ...schema.validate import Validator
+from . import SENTINEL
+from .lazy import LazyStore
+
+
+__all__ = ['FOREIGN_TYPES', 'compile_validator']
+
+
+FOREIGN_TYPES = {  # The Python types acceptable as the stored value for each field `__foreign__` type name.
+		'array': (list, ),
+		'binData': (bytes, ),
+		'bool': (bool, ),
+		'date': (datetime, ),
+		'dbPointer': (DBRef, ),
+		'decimal': (Decimal128, Number),
+		'double': (float, ),
+		'integer': (int, ),
+		'long': (int, ),
+		'number': (Number, Decimal128),
+		'object': (Mapping, ),
+		'objectId': (ObjectId, ),
+		'regex': (str, Regex, Pattern),
+		'string': (str, ),
+		'timestamp': (Timestamp, ),
+	}
+
+
+def _types(field):
+	"""Determine the acceptable stored value types for the given field, or None if unconstrained."""
+	
+	foreign = field.__foreign__
+	
+	if isinstance(foreign, str):
+		foreign = (foreign, )
+	
+	if not foreign or any(i not in FOREIGN_TYPES for i in foreign):
+		return None
+	
+	return tuple(kind for i in foreign for kind in FOREIGN_TYPES[i])
+
+
+def _embedded(field, document):
+	"""Determine the Document subclass of values embedded within the given field, if any."""
+	
+	from marrow.mongo import Document
+	
+	if not hasattr(field, '_kind'):
+		return None
+	
+	try:
+		kind = field._kind(document)  # pylint:disable=protected-access
+	except (LookupError, ImportError):  # Unresolvable plugin references are not validated.
+		return None
+	
+	if isclass(kind) and issubclass(kind, Document):
+		return kind
+	
+	if kind is not None and not isclass(kind):  # A field instance, e.g. Array(Embed(...)).
+		return _embedded(kind, document)
+	
+	return None
+
+
+def compile_validator(document):
+	"""Prepare a function to validate stored data against the field declarations of the given Document subclass.
+	
+	Field options are read once, here, rather than on every check. The resulting function accepts a mapping of
+	stored (foreign) values, such as the `__data__` of an instance, and returns a list of `Concern` instances, one per
+	failure, empty if valid. An optional `path` prefix qualifies the field names reported. Dynamic (callable) `choices`
+	are called with the data being validated.
+	
+	Checked are: `required` presence, `nullable` use of `None`, membership within `choices`, mutual `exclusive`ity,
+	the stored value type as determined by the field's `__foreign__` type, custom field `validator`s, and documents
+	embedded directly or within arrays, recursively.
+	
+	Custom validators are given the native value, as on assignment, whether or not `__check_assignment__` is enabled.
+	Conversion requires an instance: the one the data belongs to may be given as `instance`; otherwise one is
+	constructed over a copy-on-write view of the data, when first needed.
+	"""
+	
+	from marrow.mongo.core.field.base import FieldContext
+	
+	fields = document.__fields__
+	plan = []
+	
+	for field in fields.values():
+		exclusive = tuple(fields[i].__name__ if i in fields else i for i in (field.exclusive or ()))
+		kind = _embedded(field, document)
+		custom = field if field.validator.__class__.validate is not Validator.validate else None
+		plan.append((field.__name__, field.required, field.nullable, field.choices, exclusive, _types(field), kind,
+				custom))
+	
+	plan = tuple(plan)
+	
+	def validate(data, path='', instance=None):
+		failures = []
+		
+		for name, required, nullable, choices, exclusive, types, kind, custom in plan:
+			value = data.get(name, SENTINEL)
+			label = path + name
+			
+			if value is SENTINEL:
+				if required:
+					failures.append(Concern("{0}: value is required.", label))
+				
+				continue
+			
+			if value is None:
+				if not nullable:
+					failures.append(Concern("{0}: value must not be None.", label))
+				
+				continue
+			
+			if types and (not isinstance(value, types) or (value.__class__ is bool and bool not in types)):
+				expected = " or ".join(i.__name__ for i in types)
+				failures.append(Concern("{0}: expected {1}, not {2}.", label, expected, value.__class__.__name__))
+				continue
+			
+			if choices is not None:
+				permitted = choices(data) if callable(choices) else choices
+				
+				if value not in permitted:
+					failures.append(Concern("{0}: value not among permitted choices.", label))
+			
+			for other in exclusive:
+				if data.get(other) is not None:
+					failures.append(Concern("{0}: may not have a value if {1} has a value.", label, other))
+			
+			if custom is not None:
+				if instance is None:  # Wrapped, so that defaults assigned are not written to the data given.
+					instance = document._hydrate(LazyStore(data, document.__store__))  # pylint:disable=protected-access
+				
+				context = FieldContext(custom, instance)
+				
+				try:
+					custom.validator.validate(custom.transformer.native(value, context), context)
+				except Concern as e:
+					failures.append(Concern("{0}: {1}", label, e))
+			
+			if kind is None:
+				continue
+			
+			if isinstance(value, Mapping):
+				failures.extend(_nested(kind, value, label + '.'))
+			
+			elif isinstance(value, list):
+				for i, item in enumerate(value):
+					if isinstance(item, Mapping):
+						failures.extend(_nested(kind, item, label + '.' + str(i) + '.'))
+		
+		return failures
+	
+	return validate
+
+
+def _nested(kind, value, path):
+	"""Validate an embedded document, using the validator of its own class if it is a Document instance."""
+	
+	if isinstance(value, kind):
+		return value.__class__._get_validator()(value.__data__, path, value)  # pylint:disable=protected-access
+	
+	return kind._get_validator()(value, path)  # pylint:disable=protected-access
@@ -89,6 +89,7 @@ setup(
 		],
 	
 	extras_require = dict(
+			columnar = ['numpy'],  # Vectorized evaluation of filters against columnar result sets.
 			decimal = ['pymongo>=3.4'],  # More modern version required for Decimal128 support.
 			development = tests_require + ['pre-commit', 'bandit'],  # Development-time dependencies.
 			logger = ['tzlocal>=1.4'],  # Timezone support to store log times in UTC like a sane person.
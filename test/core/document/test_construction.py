@@ -0,0 +1,90 @@
+# encoding: utf-8
+
+import pytest
+
+from marrow.mongo import Document, Field, Index
+from marrow.mongo.field import String
+from marrow.mongo.trait import Derived, Identified
+
+
+class Sample(Document):
+	first = Field()
+	second = Field(default=27, assign=True)
+	third = Field(positional=False)
+	
+	_first = Index('first')
+
+
+class Specialized(Document):
+	field = Field()
+	
+	def __init__(self, *args, **kw):
+		kw.setdefault('field', "special")
+		super(Specialized, self).__init__(*args, **kw)
+
+
+class Mixed(Sample, Specialized):
+	pass
+
+
+class Reversed(Specialized, Sample):
+	fourth = Field()
+
+
+class TestGeneratedConstructor(object):
+	def test_generated(self):
+		assert Sample.__init__.__generated__
+		assert Sample.__init__.__qualname__ == 'Sample.__init__'
+		assert not hasattr(Document.__init__, '__generated__')
+	
+	def test_positional(self):
+		inst = Sample(1, 2)
+		assert inst.__data__ == {'first': 1, 'second': 2}
+	
+	def test_keyword(self):
+		inst = Sample(third=3, first=1)
+		assert list(inst.__data__.items()) == [('first', 1), ('third', 3), ('second', 27)]
+	
+	def test_none_assignment(self):
+		inst = Sample(None)
+		assert inst.__data__ == {'first': None, 'second': 27}
+	
+	def test_deferred_defaults(self):
+		inst = Sample(_prepare_defaults=False)
+		assert inst.__data__ == {}
+	
+	def test_non_positional(self):
+		with pytest.raises(TypeError):
+			Sample(1, 2, 3)
+	
+	def test_duplicate(self):
+		with pytest.raises(TypeError):
+			Sample(1, first=2)
+	
+	def test_unknown(self):
+		with pytest.raises(TypeError):
+			Sample(fourth=4)
+	
+	def test_specialized(self):
+		assert not getattr(Specialized.__init__, '__generated__', False)
+		assert not Specialized.__hydrate__
+		assert Specialized().field == "special"
+	
+	def test_specialized_mixin(self):
+		assert Mixed.__init__ is Specialized.__init__
+		assert Mixed().field == "special"
+	
+	def test_specialized_super(self):
+		inst = Reversed(first=1, fourth=4)
+		assert inst.__data__ == {'field': "special", 'first': 1, 'second': 27, 'fourth': 4}
+	
+	def test_traits(self):
+		assert Identified.__init__.__generated__
+		assert not getattr(Derived.__init__, '__generated__', False)
+		
+		class Other(Identified):
+			name = String()
+		
+		inst = Other(None, "Alice")
+		assert inst.id is None
+		assert inst.name == "Alice"
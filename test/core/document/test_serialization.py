@@ -1,9 +1,13 @@
 # encoding: utf-8
 
+from datetime import datetime
+
 import pytest
+from bson import ObjectId
+from bson.json_util import dumps
 
-from marrow.mongo import Document
-from marrow.mongo.field import Number, String
+from marrow.mongo import Document, Field
+from marrow.mongo.field import Array, Boolean, Date, Double, Embed, Integer, Number, String
 from marrow.mongo.trait import Derived, Identified
 
 
@@ -16,6 +20,18 @@ class Other(Identified, Document):
 	field = String()
 
 
+class Rich(Document):
+	name = String()
+	age = Integer()
+	score = Double()
+	active = Boolean()
+	when = Date()
+	tags = Array(String())
+	address = Embed(Sample)
+	history = Array(Embed(Sample))
+	other = Field()
+
+
 class StringPk(Document):
 	__pk__ = 'tag'
 	
@@ -91,6 +107,67 @@ class TestMongoSerialization(object):
 		assert record['foo'] == 'bar'
 
 
+class TestHydrationPlan(object):
+	def test_assigned_fields(self):
+		assert Sample.__assigned__ == ()
+		assert [name for name, field in Other.__assigned__] == ['id']
+	
+	def test_constructor_bypass(self):
+		assert Sample.__hydrate__
+		assert not Derived.__hydrate__  # Specialized constructor.
+	
+	def test_assignment_on_load(self):
+		record = Other.from_mongo({'field': 'foo'})
+		assert record.__data__['_id']
+		assert record.field == 'foo'
+	
+	def test_existing_values_preserved(self):
+		record = Other.from_mongo({'_id': '58a8e86f0aa7399e8d735310'})
+		assert record.__data__['_id'] == '58a8e86f0aa7399e8d735310'
+	
+	def test_data_adopted(self):
+		data = {'string': 'foo'}
+		record = Sample.from_mongo(data)
+		record.number = 27
+		assert data['number'] == 27
+
+
+class TestBatchSerialization(object):
+	def test_conversion(self):
+		records = list(Sample.from_mongo_many([{'string': 'foo'}, None, {'number': 27}], batch_size=2))
+		assert len(records) == 3
+		assert records[0].string == 'foo'
+		assert records[1] is None
+		assert records[2].number == 27
+	
+	def test_laziness(self):
+		def source():
+			yield {'string': 'foo'}
+			raise AssertionError("Consumed beyond the first batch.")
+		
+		records = Sample.from_mongo_many(source(), batch_size=1)
+		assert next(records).string == 'foo'
+	
+	def test_existing_instances(self):
+		record = Sample("a", 1)
+		assert list(Sample.from_mongo_many([record])) == [record]
+	
+	def test_explicit_class(self):
+		records = list(Derived.from_mongo_many([{'_cls': 'Document', 'foo': 'bar'}, {'_cls': 'Document'}]))
+		assert [record.__class__.__name__ for record in records] == ['Document', 'Document']
+		assert records[0]['foo'] == 'bar'
+	
+	def test_override_preserved(self):
+		class Filtered(Document):
+			@classmethod
+			def from_mongo(cls, doc):
+				return None if doc.get('hidden') else super(Filtered, cls).from_mongo(doc)
+		
+		records = list(Filtered.from_mongo_many([{'hidden': True}, {'hidden': False}]))
+		assert records[0] is None
+		assert records[1]['hidden'] is False
+
+
 class TestJsonSerialization(object):
 	def test_json_deserialization(self):
 		record = Sample.from_json('{"string": "bar"}')
@@ -99,3 +176,38 @@ class TestJsonSerialization(object):
 	def test_json_serialization(self):
 		result = Sample("foo", 27).to_json(sort_keys=True)
 		assert result == '{"number": 27, "string": "foo"}'
+	
+	def test_json_encoder(self):
+		record = Rich(name="Alice \"Al\" Émile", age=27, score=float('nan'), active=True, when=datetime(2017, 1, 1),
+				tags=['a', 'b'], address=Sample("foo", 2.5), history=[{'string': "bar"}], other={'q': [1, b'\0']})
+		record['extra'] = ObjectId()
+		
+		assert record.to_json() == dumps(record)
+	
+	def test_json_encoder_mismatched_types(self):
+		record = Rich.from_mongo({'name': 27, 'age': "27", 'active': 1, 'tags': 'single', 'address': None})
+		assert record.to_json() == dumps(record)
+	
+	def test_json_encoder_recompiled(self):
+		encoder = Sample._get_encoder()
+		assert Sample._get_encoder() is encoder
+		assert Rich._get_encoder() is not encoder
+	
+	def test_json_stream(self):
+		records = [Sample("foo", 1), {'string': "bar"}, None, Sample("baz")]
+		chunks = list(Sample.to_json_many(records, chunk=2))
+		
+		assert len(chunks) == 3
+		assert ''.join(chunks) == dumps(records)
+	
+	def test_json_stream_empty(self):
+		assert ''.join(Sample.to_json_many([])) == '[]'
+		assert ''.join(Sample.to_json_many([{}, {}], chunk=1)) == '[{}, {}]'
+	
+	def test_json_stream_as_rest(self):
+		class Restricted(Sample):
+			@property
+			def as_rest(self):
+				return {'string': self.string}
+		
+		assert ''.join(Sample.to_json_many([Restricted("foo", 27)])) == '[{"string": "foo"}]'
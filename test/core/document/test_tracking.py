@@ -0,0 +1,129 @@
+# encoding: utf-8
+
+from bson import ObjectId
+
+from marrow.mongo import Document
+from marrow.mongo.field import Array, Embed, Integer, String
+from marrow.mongo.trait import Identified
+
+
+class Address(Document):
+	city = String()
+	tags = Array(String(), assign=True)
+
+
+class Person(Identified, Document):
+	__track__ = True
+	
+	name = String()
+	age = Integer()
+	tags = Array(String(), assign=True)
+	address = Embed(Address)
+	addresses = Array(Embed(Address), assign=True)
+
+
+def load():
+	return Person.from_mongo({
+			'_id': ObjectId(),
+			'name': "Alice",
+			'age': 27,
+			'address': {'city': "Montréal"},
+			'addresses': [{'city': "Toronto"}],
+		})
+
+
+class TestChangeTracking(object):
+	def test_untracked(self):
+		class Untracked(Document):
+			name = String()
+		
+		inst = Untracked.from_mongo({'name': "Alice"})
+		inst.name = "Bob"
+		
+		assert not inst.as_update
+		assert not inst._tracking
+	
+	def test_constructed_not_tracked(self):
+		inst = Person(name="Alice")
+		inst.age = 27
+		
+		assert not inst.as_update
+	
+	def test_clean(self):
+		inst = load()
+		
+		assert inst.tags == []  # Assigned default values are not changes.
+		assert not inst.as_update
+	
+	def test_set_and_unset(self):
+		inst = load()
+		inst.name = "Bob"
+		del inst.age
+		
+		assert inst.as_update == {'$set': {'name': "Bob"}, '$unset': {'age': ''}}
+	
+	def test_mapping_protocol(self):
+		inst = load()
+		inst['extra'] = 42
+		inst.update(name="Bob")
+		inst.pop('age')
+		
+		assert inst.as_update == {'$set': {'extra': 42, 'name': "Bob"}, '$unset': {'age': ''}}
+	
+	def test_push(self):
+		inst = load()
+		inst.tags.append('red')
+		assert inst.as_update == {'$push': {'tags': 'red'}}
+		
+		inst.tags.extend(['green', 'blue'])
+		assert inst.as_update == {'$push': {'tags': {'$each': ['red', 'green', 'blue']}}}
+	
+	def test_push_then_modify(self):
+		inst = load()
+		inst.tags.append('red')
+		inst.tags.append('green')
+		inst.tags.remove('red')
+		
+		assert inst.as_update == {'$set': {'tags': ['green']}}
+	
+	def test_push_after_set(self):
+		inst = load()
+		inst.tags = ['red']
+		inst.tags.append('green')
+		
+		assert inst.as_update == {'$set': {'tags': ['red', 'green']}}
+	
+	def test_embedded(self):
+		inst = load()
+		inst.address.city = "Québec"
+		inst.address.tags.append('home')
+		
+		assert inst.as_update == {'$set': {'address.city': "Québec"}, '$push': {'address.tags': 'home'}}
+	
+	def test_embedded_superseded(self):
+		inst = load()
+		inst.address.city = "Québec"
+		inst.address = Address("Ottawa")
+		inst.address.city = "Gatineau"
+		
+		update = inst.as_update
+		assert list(update) == ['$set']
+		assert dict(update['$set']) == {'address': {'city': "Gatineau", 'tags': []}}
+	
+	def test_embedded_within_array(self):
+		inst = load()
+		inst.addresses[0].city = "Vancouver"
+		
+		update = inst.as_update
+		assert list(update['$set']) == ['addresses']
+		assert update['$set']['addresses'][0]['city'] == "Vancouver"
+	
+	def test_begin_tracking(self):
+		inst = Person(name="Alice")
+		inst.tags.append('red')
+		inst._begin_tracking()
+		
+		assert not inst.as_update
+		
+		inst.tags.append('green')
+		assert inst.as_update == {'$push': {'tags': 'green'}}
@@ -2,8 +2,13 @@
 
 from __future__ import unicode_literals
 
-from marrow.mongo.field import Array, String
+import pytest
+
+from marrow.mongo import Document
+from marrow.mongo.field import Array, Embed, Integer, String
 from marrow.mongo.trait import Collection
+from marrow.schema.exc import Concern
+from marrow.schema.validate import Never
 
 
 class StringDocument(Collection):
@@ -21,3 +26,81 @@ def test_string_document():
 				'nonoptional': {'$type': 'string'},
 				'choose':  {'$or': [{'$exists': 0}, {'$type': 'string', '$in': ['Hello', 'World']}]}
 			}
+
+
+class Address(Document):
+	city = String(required=True)
+
+
+class Person(Document):
+	name = String(required=True)
+	kind = String(choices=['admin', 'user'])
+	age = Integer()
+	nickname = String(nullable=True)
+	email = String(exclusive={'phone'})
+	phone = String()
+	address = Embed(Address)
+	previous = Array(Embed(Address), assign=True)
+
+
+class TestCompiledValidation(object):
+	def test_valid(self):
+		inst = Person(name="Alice", kind='user', age=27, nickname=None, address=Address("Montréal"))
+		assert inst.validate() is inst
+	
+	def test_required(self):
+		with pytest.raises(Concern) as exc:
+			Person().validate()
+		
+		assert [str(i) for i in exc.value.concerns] == ["name: value is required."]
+	
+	def test_invalid_values(self):
+		failures = Person._get_validator()({
+				'name': None,
+				'kind': 'guest',
+				'age': "27",
+				'nickname': None,
+				'email': "alice@example.com",
+				'phone': "555-1234",
+				'address': {},
+				'previous': [{'city': "Toronto"}, {'city': 42}],
+			})
+		
+		assert [str(i) for i in failures] == [
+				"name: value must not be None.",
+				"kind: value not among permitted choices.",
+				"age: expected int, not str.",
+				"email: may not have a value if phone has a value.",
+				"address.city: value is required.",
+				"previous.1.city: expected str, not int.",
+			]
+	
+	def test_boolean_is_not_integer(self):
+		assert len(Person._get_validator()({'name': "Alice", 'age': True})) == 1
+	
+	def test_validate_many(self):
+		docs = [Person(name="Alice"), {'name': "Bob"}, {'age': 27}, Person(name="Eve", kind='other')]
+		invalid = Person.validate_many(docs)
+		
+		assert [i for i, failures in invalid] == [2, 3]
+		assert len(invalid[0][1]) == 1
+	
+	def test_assignment_checking(self):
+		class Checked(Document):
+			age = Integer(validator=Never())
+		
+		class Unchecked(Checked):
+			__check_assignment__ = False
+		
+		with pytest.raises(Concern):
+			Checked().age = 27
+		
+		inst = Unchecked()
+		inst.age = 27
+		assert inst.age == 27
+		
+		with pytest.raises(Concern) as exc:
+			inst.validate()
+		
+		assert [str(i) for i in exc.value.concerns] == ["age: Set to always fail."]
+		assert [i for i, failures in Unchecked.validate_many([inst, {'age': 42}, {}])] == [0, 1]
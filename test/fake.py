@@ -0,0 +1,163 @@
+"""Stand-ins for PyMongo collections and cursors, evaluating filters client-side and recording their use."""
+
+from bson.codec_options import DEFAULT_CODEC_OPTIONS
+from bson.raw_bson import RawBSONDocument
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult
+
+from marrow.mongo import Index
+from marrow.mongo.field import Integer, String
+from marrow.mongo.query.match import compile_filter
+from marrow.mongo.trait import Queryable
+
+
+class Person(Queryable):
+	__collection__ = 'people'
+	__advise__ = False
+	
+	name = String()
+	age = Integer(default=None)
+	
+	_age = Index('age')
+
+
+class Cursor(object):
+	def __init__(self, documents):
+		self.documents = iter(documents)
+		self.closed = False
+	
+	def __iter__(self):
+		return self
+	
+	def __next__(self):
+		return next(self.documents)
+	
+	def close(self):
+		self.closed = True
+
+
+class Admin(object):
+	def __init__(self, reply):
+		self.reply = reply
+		self.commands = []
+	
+	def command(self, name):
+		self.commands.append(name)
+		return self.reply
+
+
+class Collection(object):
+	"""A minimal collection-like object evaluating filters client-side, recording the calls made to it.
+	
+	Reads record their name, filter, and options as `calls`, and the cursors they return as `cursors`. Writes are not
+	applied; insertions and bulk writes are recorded as `batches`, failing for documents with a name in `failing`.
+	"""
+	
+	full_name = 'test.people'
+	codec_options = DEFAULT_CODEC_OPTIONS
+	
+	def __init__(self, *documents, failing=()):
+		self.documents = list(documents)
+		self.calls = []
+		self.cursors = []
+		self.batches = []
+		self.failing = set(failing)
+		self.admin = Admin({'maxWriteBatchSize': 100000, 'maxMessageSizeBytes': 48000000})
+		self.database = self  # Standing in for the database, and client, too.
+		self.client = self
+	
+	@property
+	def queries(self):
+		"""The filters of the reads made, in order."""
+		return [query for name, query, options in self.calls]
+	
+	def _record(self, name, query, projection, options):
+		if projection is not None:
+			options = dict(options, projection=projection)
+		
+		self.calls.append((name, dict(query), options))
+	
+	def _matching(self, query, projection=None, sort=None, skip=0, limit=0, **options):
+		match = compile_filter(getattr(query, 'as_query', query))
+		documents = [document for document in self.documents if match(document)]
+		
+		for name, direction in reversed(sort or ()):  # Stable, so the first key sorted by last takes precedence.
+			documents.sort(key=lambda document: document.get(name), reverse=direction == -1)
+		
+		documents = documents[skip:skip + limit] if limit else documents[skip:]
+		
+		if projection:
+			keep = {name for name, value in dict.fromkeys(projection, True).items() if value} | {'_id'}
+			documents = [{k: v for k, v in document.items() if k in keep} for document in documents]
+		
+		return documents
+	
+	def find(self, query, projection=None, **options):
+		self._record('find', query, projection, options)
+		self.cursors.append(Cursor(self._matching(query, projection, **options)))
+		return self.cursors[-1]
+	
+	def find_one(self, query, projection=None, **options):
+		self._record('find_one', query, projection, options)
+		documents = self._matching(query, projection, limit=1, **options)
+		return documents[0] if documents else None
+	
+	def count_documents(self, query, **options):
+		self._record('count_documents', query, None, options)
+		return len(self._matching(query, **options))
+	
+	def aggregate(self, pipeline):
+		query = pipeline[0]['$match'] if '$match' in pipeline[0] else {}
+		self._record('aggregate', query, None, {'pipeline': pipeline})
+		return [{'_id': document['_id']} for document in self._matching(query)]
+	
+	def delete_one(self, query, **options):
+		self._record('delete_one', query, None, options)
+		return DeleteResult({'n': min(len(self._matching(query)), 1)}, True)
+	
+	def insert_one(self, document, bypass_document_validation=False):
+		self.batches.append(([document], True, bypass_document_validation))
+		return InsertOneResult(document['_id'], True)
+	
+	def insert_many(self, documents, ordered=True, bypass_document_validation=False):
+		self.batches.append((documents, ordered, bypass_document_validation))
+		failed = [i for i, document in enumerate(documents) if document['name'] in self.failing]
+		
+		if failed:
+			failed = failed[:1] if ordered else failed
+			inserted = failed[0] if ordered else len(documents) - len(failed)
+			raise BulkWriteError({'nInserted': inserted, 'writeErrors': [
+					{'index': i, 'code': 11000, 'errmsg': "duplicate key"} for i in failed]})
+		
+		# As PyMongo, identifiers are only reported for documents it encodes itself, not raw BSON.
+		return InsertManyResult([i['_id'] for i in documents if not isinstance(i, RawBSONDocument)], True)
+	
+	def bulk_write(self, requests, ordered=True, bypass_document_validation=False):
+		self.batches.append((requests, ordered, bypass_document_validation))
+		details = {'nInserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'nUpserted': 0, 'upserted': [],
+				'writeErrors': [], 'writeConcernErrors': []}
+		
+		for index, request in enumerate(requests):
+			if isinstance(request, InsertOne):
+				if request._doc['name'] in self.failing:
+					details['writeErrors'].append({'index': index, 'code': 11000, 'errmsg': "duplicate key"})
+					
+					if ordered:
+						break
+					
+					continue
+				
+				details['nInserted'] += 1
+			
+			elif isinstance(request, UpdateOne):
+				details['nMatched'] += 1
+				details['nModified'] += 1
+			
+			elif isinstance(request, DeleteOne):
+				details['nRemoved'] += 1
+		
+		if details['writeErrors']:
+			raise BulkWriteError(details)
+		
+		return BulkWriteResult(details, True)
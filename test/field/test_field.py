@@ -126,6 +126,68 @@ class TestField(object):
 		assert Updated.field.default == 27
 
 
+class CountingField(Field):
+	def to_native(self, document, field, value):
+		document.conversions = getattr(document, 'conversions', 0) + 1
+		return [value]
+
+
+class Memoized(Document):
+	__memoize__ = True
+	
+	field = CountingField()
+	other = CountingField(default=27)
+
+
+class TestFieldMemoization(object):
+	def test_disabled_by_default(self):
+		inst = Sample.from_mongo({'integer': '42'})
+		assert inst.integer == 42
+		assert '__native__' not in inst.__dict__
+	
+	def test_repeated_access(self):
+		inst = Memoized.from_mongo({'field': 42})
+		assert inst.field == [42]
+		assert inst.field is inst.field
+		assert inst.conversions == 1
+	
+	def test_unstored_default(self):
+		inst = Memoized()
+		assert inst.other == [27]
+		assert inst.other is not inst.other
+	
+	def test_assignment_invalidates(self):
+		inst = Memoized.from_mongo({'field': 42})
+		assert inst.field == [42]
+		inst.field = 27
+		assert inst.field == [27]
+	
+	def test_deletion_invalidates(self):
+		inst = Memoized.from_mongo({'field': 42})
+		assert inst.field == [42]
+		del inst.field
+		
+		with pytest.raises(AttributeError):
+			inst.field
+	
+	def test_mapping_invalidates(self):
+		inst = Memoized.from_mongo({'field': 42})
+		assert inst.field == [42]
+		
+		inst['field'] = 27
+		assert inst.field == [27]
+		
+		inst.update(field=42)
+		assert inst.field == [42]
+		assert inst.conversions == 3
+	
+	def test_replaced_warehouse(self):
+		inst = Memoized.from_mongo({'field': 42})
+		assert inst.field == [42]
+		inst.__data__ = {'field': 27}
+		assert inst.field == [27]
+
+
 class TestFieldSecurity(object):
 	def test_writeable_predicate_simple(self):
 		f = Field(write=None)
@@ -4,8 +4,9 @@ from __future__ import unicode_literals
 
 import pytest
 
-from marrow.mongo import Document, F, Field, Filter
+from marrow.mongo import Document, F, Field, Filter, P, S, U
 from marrow.mongo.field import Array, Number
+from marrow.mongo.param import common
 
 
 class TestParametricFilterConstructor(object):
@@ -47,3 +48,74 @@ class TestParametricFilterConstructor(object):
 		q = F(D, field__exists=True)
 		assert isinstance(q, Filter)
 		assert q == {'field': {'$exists': True}}
+
+
+class TestResolutionCache(object):
+	@pytest.fixture()
+	def D(self):
+		class Sample(Document):
+			field = Field()
+			number = Number()
+		
+		return Sample
+	
+	def test_cached(self, D):
+		assert D.__resolved__ is None
+		
+		assert F(D, not__number__gt=42) == {'$not': {'number': {'$gt': 42}}}
+		assert len(D.__resolved__) == 1
+		
+		assert F(D, not__number__gt=27) == {'$not': {'number': {'$gt': 27}}}
+		assert len(D.__resolved__) == 1
+	
+	def test_distinct_uses(self, D):
+		assert F(D, number=27) == {'number': 27}
+		assert U(D, number=27) == {'$set': {'number': 27}}
+		assert P(D, 'number') == {'number': True}
+		assert S(D, '-number') == [('number', -1)]
+		assert S(D, '-number') == [('number', -1)]
+		
+		assert len(D.__resolved__) == 4
+	
+	def test_equivalent_maps(self, D):
+		first, second = {'not': '$not'}, {'not': '$not'}  # Equal, yet distinct.
+		
+		list(common._process_arguments(D, first, {}, {'number': 27}))
+		list(common._process_arguments(D, second, {}, {'number': 27}))
+		assert len(D.__resolved__) == 1
+		
+		list(common._process_arguments(D, {'not': '$not', 'nor': '$nor'}, {}, {'number': 27}))
+		assert len(D.__resolved__) == 2
+	
+	def test_per_class(self, D):
+		F(D, number=27)
+		
+		class Derived(D):
+			pass
+		
+		assert Derived.__resolved__ is None
+		assert F(Derived, number=27) == {'number': 27}
+		assert len(D.__resolved__) == 1
+	
+	def test_redefinition(self, D):
+		F(D, number=27)
+		
+		class Sample(Document):
+			number = Field('other')
+		
+		assert F(Sample, number=27) == {'other': 27}
+	
+	def test_failure_not_cached(self, D):
+		with pytest.raises(LookupError):
+			F(D, missing=27)
+		
+		assert not D.__resolved__
+	
+	def test_bounded(self, D, monkeypatch):
+		monkeypatch.setattr(common, 'RESOLUTION_LIMIT', 2)
+		
+		F(D, number=1)
+		F(D, field=2)
+		F(D, number__gt=3)
+		
+		assert [key[-1] for key in D.__resolved__] == ['field', 'number__gt']  # The oldest was discarded.
@@ -0,0 +1,121 @@
+import pytest
+from bson import ObjectId
+
+from marrow.mongo import Document
+from marrow.mongo.field import Integer, String
+from marrow.mongo.query.keyset import Page, decode, encode, position, seek, tiebreak
+from marrow.mongo.query.match import compile_filter
+
+
+IDENTIFIERS = [ObjectId() for i in range(6)]
+RECORDS = [
+		{'_id': IDENTIFIERS[0], 'age': 27, 'name': "Alice"},
+		{'_id': IDENTIFIERS[1], 'age': 27, 'name': "Bob"},
+		{'_id': IDENTIFIERS[2], 'age': 42, 'name': "Carol"},
+		{'_id': IDENTIFIERS[3], 'age': None, 'name': "Dave"},
+		{'_id': IDENTIFIERS[4], 'name': "Eve"},
+		{'_id': IDENTIFIERS[5], 'age': 18, 'name': "Frank"},
+	]
+
+
+def ordered(sort):
+	"""Sort the records as MongoDB would, nulls and absent values first."""
+	
+	result = RECORDS
+	
+	for name, direction in reversed(sort):
+		result = sorted(result, key=lambda r: (r.get(name) is not None, r.get(name) or 0), reverse=direction == -1)
+	
+	return result
+
+
+def walk(sort, size):
+	"""Page through the records using seek predicates, returning the names seen."""
+	
+	sort = tiebreak(sort)
+	records = ordered(sort)
+	seen = []
+	values = None
+	
+	while True:
+		match = compile_filter(seek(sort, values)) if values else (lambda record: True)
+		page = [record for record in records if match(record)][:size]
+		
+		if not page:
+			return seen
+		
+		seen.extend(record['name'] for record in page)
+		values = decode(sort, encode(sort, position(page[-1], sort)))
+
+
+class TestTiebreak(object):
+	def test_appended(self):
+		assert tiebreak([('age', -1)]) == [('age', -1), ('_id', -1)]
+		assert tiebreak([]) == [('_id', 1)]
+	
+	def test_present(self):
+		assert tiebreak([('_id', -1)]) == [('_id', -1)]
+
+
+class TestSeek(object):
+	def test_single(self):
+		assert seek([('_id', 1)], [5]) == {'_id': {'$gt': 5}}
+	
+	def test_compound(self):
+		assert seek([('age', -1), ('_id', 1)], [27, 5]) == {'$or': [
+				{'age': {'$lt': 27}},
+				{'age': None},
+				{'age': 27, '_id': {'$gt': 5}},
+			]}
+	
+	def test_null(self):
+		assert seek([('age', 1), ('_id', 1)], [None, 5]) == {'$or': [
+				{'age': {'$ne': None}},
+				{'age': None, '_id': {'$gt': 5}},
+			]}
+		
+		assert seek([('age', -1), ('_id', 1)], [None, 5]) == {'age': None, '_id': {'$gt': 5}}
+	
+	@pytest.mark.parametrize('sort', [[('age', 1)], [('age', -1)], [('name', -1)], [('age', 1), ('name', -1)]])
+	@pytest.mark.parametrize('size', [1, 2, 4])
+	def test_walk(self, sort, size):
+		expected = [record['name'] for record in ordered(tiebreak(sort))]
+		assert walk(sort, size) == expected
+
+
+class TestToken(object):
+	def test_round_trip(self):
+		sort = [('age', 1), ('_id', 1)]
+		token = encode(sort, [27, IDENTIFIERS[0]])
+		
+		assert isinstance(token, str)
+		assert '=' not in token
+		assert decode(sort, token) == [27, IDENTIFIERS[0]]
+	
+	def test_different_sort(self):
+		token = encode([('age', 1), ('_id', 1)], [27, IDENTIFIERS[0]])
+		
+		with pytest.raises(ValueError):
+			decode([('age', -1), ('_id', -1)], token)
+	
+	def test_invalid(self):
+		with pytest.raises(ValueError):
+			decode([('_id', 1)], "not a token!")
+	
+	def test_position(self):
+		class Person(Document):
+			name = String()
+			age = Integer()
+		
+		assert position(Person(name="Alice"), [('age', 1), ('name', 1)]) == [None, "Alice"]
+
+
+class TestPage(object):
+	def test_page(self):
+		page = Page([1, 2], "token")
+		assert len(page) == 2
+		assert list(page) == [1, 2]
+		assert page[0] == 1
+		assert page.more
+		assert not Page([]).more
+		assert repr(page) == "Page(2 documents, after='token')"
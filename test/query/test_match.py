@@ -0,0 +1,239 @@
+import re
+from datetime import datetime
+
+import pytest
+from bson import Decimal128, ObjectId, Regex
+from bson.tz_util import utc
+
+from marrow.mongo import Document, F, Filter
+from marrow.mongo.field import Array, Embed, Integer, String
+from marrow.mongo.query.match import compile_filter
+
+
+class Address(Document):
+	city = String()
+
+
+class Person(Document):
+	name = String()
+	age = Integer()
+	tags = Array(String())
+	address = Embed(Address)
+
+
+def match(query, document):
+	return compile_filter(query)(document)
+
+
+ALICE = {
+		'_id': ObjectId('5978c7b8fb2ad90fdbbd4ac6'),
+		'name': "Alice",
+		'age': 27,
+		'tags': ['admin', 'staff'],
+		'address': {'city': "Montréal", 'floor': 2},
+		'scores': [{'kind': 'exam', 'score': 90}, {'kind': 'quiz', 'score': 40}],
+		'grid': [[1, 2], [3, 4]],
+		'joined': datetime(2017, 7, 1, tzinfo=utc),
+		'nothing': None,
+		'flag': True,
+		'location': {'type': 'Point', 'coordinates': [-73.56, 45.50]},
+		'legacy': [-73.56, 45.50],
+	}
+
+
+class TestComparison(object):
+	@pytest.mark.parametrize('query,expected', [
+			({}, True),
+			({'name': "Alice"}, True),
+			({'name': "Bob"}, False),
+			({'age': 27.0}, True),
+			({'age': Decimal128('27')}, True),
+			({'age': "27"}, False),
+			({'flag': 1}, False),
+			({'flag': True}, True),
+			({'age': {'$eq': 27}}, True),
+			({'age': {'$ne': 27}}, False),
+			({'age': {'$ne': 42}}, True),
+			({'age': {'$gt': 26}}, True),
+			({'age': {'$gt': 27}}, False),
+			({'age': {'$gte': 27}}, True),
+			({'age': {'$lt': 27}}, False),
+			({'age': {'$lte': 27}}, True),
+			({'age': {'$gt': "1"}}, False),
+			({'age': {'$gt': 18, '$lt': 65}}, True),
+			({'name': {'$gt': "Al"}}, True),
+			({'joined': {'$gte': datetime(2017, 1, 1)}}, True),
+			({'joined': {'$lt': datetime(2017, 1, 1, tzinfo=utc)}}, False),
+			({'_id': ObjectId('5978c7b8fb2ad90fdbbd4ac6')}, True),
+			({'age': {'$in': [1, 27]}}, True),
+			({'age': {'$in': [1, 2]}}, False),
+			({'age': {'$nin': [1, 2]}}, True),
+			({'name': {'$in': [re.compile('^A')]}}, True),
+			({'address': {'city': "Montréal", 'floor': 2}}, True),
+			({'address': {'floor': 2, 'city': "Montréal"}}, False),  # Embedded document equality is ordered.
+		])
+	def test_comparison(self, query, expected):
+		assert match(query, ALICE) is expected
+
+
+class TestMissing(object):
+	@pytest.mark.parametrize('query,expected', [
+			({'missing': None}, True),
+			({'nothing': None}, True),
+			({'age': None}, False),
+			({'missing': {'$ne': None}}, False),
+			({'missing': {'$exists': False}}, True),
+			({'nothing': {'$exists': True}}, True),
+			({'missing': {'$gte': None}}, True),
+			({'missing': {'$gt': None}}, False),
+			({'missing': {'$in': [None, 1]}}, True),
+			({'missing': {'$nin': [1]}}, True),
+			({'missing': {'$gt': 1}}, False),
+		])
+	def test_missing(self, query, expected):
+		assert match(query, ALICE) is expected
+
+
+class TestPaths(object):
+	@pytest.mark.parametrize('query,expected', [
+			({'address.city': "Montréal"}, True),
+			({'address.city.missing': None}, True),
+			({'tags': "admin"}, True),
+			({'tags': ['admin', 'staff']}, True),
+			({'tags': ['staff', 'admin']}, False),
+			({'tags.1': "staff"}, True),
+			({'tags.2': {'$exists': True}}, False),
+			({'scores.score': 40}, True),
+			({'scores.score': {'$gt': 95}}, False),
+			({'scores.1.kind': "quiz"}, True),
+			({'scores.kind': {'$exists': True}}, True),
+			({'scores.missing': {'$exists': True}}, False),
+			({'scores.missing': None}, True),
+			({'scores.score': None}, False),
+			({'grid': [3, 4]}, True),
+			({'grid.0': [1, 2]}, True),
+			({'grid.1.0': 3}, True),
+		])
+	def test_paths(self, query, expected):
+		assert match(query, ALICE) is expected
+	
+	def test_element_lacking_path(self):
+		document = {'scores': [{'score': 90}, {'kind': 'quiz'}]}
+		
+		assert match({'scores.score': None}, document)
+		assert match({'scores.score': {'$in': [None]}}, document)
+		assert not match({'scores.score': {'$ne': None}}, document)
+		assert match({'scores.score': {'$exists': True}}, document)
+		assert not match({'scores.kind.name': {'$exists': True}}, document)
+		assert match({'scores.kind.name': None}, document)
+
+
+class TestLogical(object):
+	@pytest.mark.parametrize('query,expected', [
+			({'$and': [{'name': "Alice"}, {'age': 27}]}, True),
+			({'$and': [{'name': "Alice"}, {'age': 42}]}, False),
+			({'$or': [{'name': "Bob"}, {'age': 27}]}, True),
+			({'$or': [{'name': "Bob"}, {'age': 42}]}, False),
+			({'$nor': [{'name': "Bob"}, {'age': 42}]}, True),
+			({'age': {'$not': {'$gt': 30}}}, True),
+			({'name': {'$not': re.compile('^B')}}, True),
+			({'missing': {'$not': {'$gt': 30}}}, True),
+			({'$comment': "Ignored.", 'age': 27}, True),
+		])
+	def test_logical(self, query, expected):
+		assert match(query, ALICE) is expected
+
+
+class TestElementAndEvaluation(object):
+	@pytest.mark.parametrize('query,expected', [
+			({'age': {'$type': 'int'}}, True),
+			({'age': {'$type': 16}}, True),
+			({'age': {'$type': 'number'}}, True),
+			({'age': {'$type': ['string', 'double']}}, False),
+			({'tags': {'$type': 'array'}}, True),
+			({'tags': {'$type': 'string'}}, True),
+			({'nothing': {'$type': 'null'}}, True),
+			({'flag': {'$type': 'bool'}}, True),
+			({'name': {'$regex': '^al', '$options': 'i'}}, True),
+			({'name': {'$regex': '^al'}}, False),
+			({'name': re.compile('ice$')}, True),
+			({'name': Regex('^ALI', 'i')}, True),
+			({'tags': {'$regex': '^sta'}}, True),
+			({'age': {'$mod': [4, 3]}}, True),
+			({'age': {'$mod': [4, 0]}}, False),
+		])
+	def test_element(self, query, expected):
+		assert match(query, ALICE) is expected
+
+
+class TestArray(object):
+	@pytest.mark.parametrize('query,expected', [
+			({'tags': {'$all': ['staff', 'admin']}}, True),
+			({'tags': {'$all': ['staff', 'owner']}}, False),
+			({'tags': {'$all': []}}, False),
+			({'tags': {'$size': 2}}, True),
+			({'tags': {'$size': 1}}, False),
+			({'scores': {'$elemMatch': {'kind': 'quiz', 'score': {'$gt': 30}}}}, True),
+			({'scores': {'$elemMatch': {'kind': 'quiz', 'score': {'$gt': 50}}}}, False),
+			({'scores.score': {'$gt': 50, '$lt': 60}}, True),  # Different elements may satisfy each.
+			({'scores': {'$elemMatch': {'score': {'$gt': 50, '$lt': 60}}}}, False),
+			({'grid': {'$elemMatch': {'$size': 2}}}, True),
+			({'scores': {'$all': [{'$elemMatch': {'kind': 'exam'}}, {'$elemMatch': {'score': 40}}]}}, True),
+			({'scores': {'$elemMatch': {'$or': [{'kind': 'exam'}, {'kind': 'test'}]}}}, True),
+		])
+	def test_array(self, query, expected):
+		assert match(query, ALICE) is expected
+
+
+class TestGeo(object):
+	@pytest.mark.parametrize('query,expected', [
+			({'legacy': {'$geoWithin': {'$box': [[-74, 45], [-73, 46]]}}}, True),
+			({'legacy': {'$geoWithin': {'$box': [[-75, 45], [-74, 46]]}}}, False),
+			({'location': {'$geoWithin': {'$polygon': [[-74, 45], [-73, 45], [-73, 46], [-74, 46]]}}}, True),
+			({'legacy': {'$geoWithin': {'$center': [[-73.5, 45.5], 0.1]}}}, True),
+			({'legacy': {'$geoWithin': {'$center': [[-73, 45.5], 0.1]}}}, False),
+			({'location': {'$geoWithin': {'$centerSphere': [[-73.57, 45.50], 10 / 6378.1]}}}, True),
+			({'location': {'$geoWithin': {'$centerSphere': [[-79.38, 43.65], 10 / 6378.1]}}}, False),
+			({'location': {'$geoWithin': {'$geometry': {'type': 'Polygon', 'coordinates': [
+					[[-74, 45], [-73, 45], [-73, 46], [-74, 46], [-74, 45]],
+					[[-73.6, 45.4], [-73.5, 45.4], [-73.5, 45.6], [-73.6, 45.6], [-73.6, 45.4]],  # A hole.
+				]}}}}, False),
+			({'location': {'$geoIntersects': {'$geometry': {'type': 'Point', 'coordinates': [-73.56, 45.50]}}}}, True),
+			({'location': {'$near': {'$geometry': {'type': 'Point', 'coordinates': [-73.57, 45.50]},
+					'$maxDistance': 1000}}}, True),
+			({'location': {'$nearSphere': {'$geometry': {'type': 'Point', 'coordinates': [-73.57, 45.50]},
+					'$minDistance': 1000}}}, False),
+			({'legacy': {'$near': [-73.5, 45.5], '$maxDistance': 0.1}}, True),
+		])
+	def test_geo(self, query, expected):
+		assert match(query, ALICE) is expected
+
+
+class TestCompilation(object):
+	def test_unsupported(self):
+		with pytest.raises(ValueError):
+			compile_filter({'$where': "this.age > 1"})
+		
+		with pytest.raises(ValueError):
+			compile_filter({'age': {'$bogus': 1}})
+	
+	def test_filter(self):
+		matcher = ((Person.age > 18) & Person.name.any("Alice", "Bob")).matcher()
+		
+		assert matcher(ALICE)
+		assert not matcher({'age': 12, 'name': "Alice"})
+	
+	def test_parametric(self):
+		assert F(Person, name__ne="Bob", age__range=(18, 65)).matcher()(ALICE)
+	
+	def test_document(self):
+		alice = Person(name="Alice", age=27, tags=['admin'], address=Address(city="Montréal"))
+		
+		assert (Person.address.city == "Montréal").matcher()(alice)
+		assert not (Person.name == "Bob").matcher()(alice)
+	
+	def test_filtering(self):
+		people = [{'age': i} for i in range(100)]
+		matcher = Filter({'age': {'$gte': 90}}).matcher()
+		
+		assert len(list(filter(matcher, people))) == 10
@@ -4,7 +4,7 @@ from collections import OrderedDict as odict
 
 import pytest
 
-from marrow.mongo import Filter
+from marrow.mongo import Filter, Update
 
 
 @pytest.fixture
@@ -158,3 +158,216 @@ class TestOperationsCombination(object):
 	def test_operations_soft_and(self):
 		comb = Filter({'$and': [{'a': 1}, {'b': 2}]}) & Filter({'c': 3})
 		assert comb.as_query == {'$and': [{'a': 1}, {'b': 2}], 'c': 3}
+	
+	def test_operations_and_preserves_operands(self):
+		left = Filter({'roll': {'$gte': 27}, '$and': [{'a': 1}], '$or': [{'b': 2}]})
+		right = Filter({'roll': {'$lte': 42}, '$and': [{'c': 3}], '$or': [{'d': 4}]})
+		
+		comb = left & right
+		
+		assert left.as_query == {'roll': {'$gte': 27}, '$and': [{'a': 1}], '$or': [{'b': 2}]}
+		assert right.as_query == {'roll': {'$lte': 42}, '$and': [{'c': 3}], '$or': [{'d': 4}]}
+		assert comb.as_query == {
+				'roll': {'$gte': 27, '$lte': 42},
+				'$and': [{'a': 1}, {'c': 3}, {'$or': [{'d': 4}]}, {'$or': [{'b': 2}]}],
+			}
+	
+	def test_operations_and_shares_structure(self):
+		left = Filter({'roll': {'$gte': 27}})
+		right = Filter({'foo': {'$in': [1, 2]}})
+		comb = left & right
+		
+		assert comb.as_query['roll'] is left.as_query['roll']
+		assert comb.as_query['foo'] is right.as_query['foo']
+	
+	def test_operations_or_preserves_operands(self):
+		left = Filter({'roll': 27}) | Filter({'foo': 42})
+		comb = left | Filter({'bar': 'baz'})
+		
+		assert len(left.as_query['$or']) == 2
+		assert len(comb.as_query['$or']) == 3
+		
+		inverted = ~left
+		left['extra'] = True
+		assert 'extra' not in inverted.as_query['$not']
+	
+	def test_operations_combine(self):
+		fragments = [Filter({'roll': {'$gte': i}}) for i in range(5)] + [{'foo': 42}]
+		comb = Filter({'roll': {'$lt': 27}}).combine(*fragments)
+		
+		assert comb.as_query == {'roll': {'$lt': 27, '$gte': 4}, 'foo': 42}
+		assert [i.as_query for i in fragments[:5]] == [{'roll': {'$gte': i}} for i in range(5)]
+
+
+
+def combine(*updates):
+	result = Update()
+	
+	for update in updates:
+		result &= update
+	
+	return result
+
+
+class TestUpdateCombination(object):
+	def test_distinct(self):
+		result = Update({'$set': {'name': "Alice"}}) & Update({'$inc': {'age': 1}, '$set': {'rank': 2}})
+		assert result == {'$set': {'name': "Alice", 'rank': 2}, '$inc': {'age': 1}}
+	
+	def test_not_modified(self):
+		first = Update({'$push': {'tags': 'a'}})
+		second = {'$push': {'tags': {'$each': ['b', 'c']}}}
+		
+		assert first & second == {'$push': {'tags': {'$each': ['a', 'b', 'c']}}}
+		assert first == {'$push': {'tags': 'a'}}
+		assert second == {'$push': {'tags': {'$each': ['b', 'c']}}}
+	
+	def test_binding(self):
+		result = Update({}, collection='collection', document='document') & Update()
+		assert result.collection == 'collection'
+		assert result.document == 'document'
+	
+	def test_push(self):
+		result = combine(Update({'$push': {'tags': 'a'}}), Update({'$push': {'tags': 'b'}}))
+		assert result == {'$push': {'tags': {'$each': ['a', 'b']}}}
+	
+	def test_push_many(self):
+		result = combine(*(Update({'$push': {'tags': i}}) for i in 'abcd'))
+		assert result == {'$push': {'tags': {'$each': ['a', 'b', 'c', 'd']}}}
+	
+	def test_push_trailing_modifiers(self):
+		result = Update({'$push': {'scores': 1}}) & Update({'$push': {'scores': {'$each': [2], '$slice': -5}}})
+		assert result == {'$push': {'scores': {'$each': [1, 2], '$slice': -5}}}
+	
+	def test_push_leading_modifiers(self):
+		with pytest.raises(ValueError):
+			Update({'$push': {'scores': {'$each': [2], '$slice': -5}}}) & Update({'$push': {'scores': 1}})
+	
+	def test_push_position(self):
+		with pytest.raises(ValueError):
+			Update({'$push': {'scores': 1}}) & Update({'$push': {'scores': {'$each': [2], '$position': 0}}})
+	
+	def test_add_to_set(self):
+		result = Update({'$addToSet': {'tags': 'a'}}) & Update({'$addToSet': {'tags': {'$each': ['b', 'a']}}})
+		assert result == {'$addToSet': {'tags': {'$each': ['a', 'b', 'a']}}}
+	
+	def test_inc(self):
+		result = combine(Update({'$inc': {'age': 1}}), Update({'$inc': {'age': 2.5}}), Update({'$inc': {'age': -1}}))
+		assert result == {'$inc': {'age': 2.5}}
+	
+	def test_inc_invalid(self):
+		with pytest.raises(ValueError):
+			Update({'$inc': {'age': 1}}) & Update({'$inc': {'age': "1"}})
+	
+	def test_mul(self):
+		assert Update({'$mul': {'price': 2}}) & Update({'$mul': {'price': 3}}) == {'$mul': {'price': 6}}
+	
+	def test_min_max(self):
+		assert Update({'$min': {'low': 5}}) & Update({'$min': {'low': 3}}) == {'$min': {'low': 3}}
+		assert Update({'$max': {'high': 5}}) & Update({'$max': {'high': 3}}) == {'$max': {'high': 5}}
+	
+	def test_min_incomparable(self):
+		with pytest.raises(ValueError):
+			Update({'$min': {'low': 5}}) & Update({'$min': {'low': "3"}})
+	
+	def test_pull_all(self):
+		result = Update({'$pullAll': {'tags': ['a', 'b']}}) & Update({'$pullAll': {'tags': ['b', 'c']}})
+		assert result == {'$pullAll': {'tags': ['a', 'b', 'c']}}
+	
+	def test_pull(self):
+		result = Update({'$pull': {'tags': 'a'}}) & Update({'$pull': {'tags': {'$in': ['b', 'c']}}})
+		assert result == {'$pull': {'tags': {'$in': ['a', 'b', 'c']}}}
+	
+	def test_pull_conditions(self):
+		with pytest.raises(ValueError):
+			Update({'$pull': {'scores': {'$gte': 6}}}) & Update({'$pull': {'scores': 1}})
+	
+	def test_repeated_rename(self):
+		with pytest.raises(ValueError):
+			Update({'$rename': {'name': 'title'}}) & Update({'$rename': {'name': 'label'}})
+	
+	def test_rename_conflict(self):
+		with pytest.raises(ValueError):
+			Update({'$rename': {'name': 'title'}}) & Update({'$set': {'title': "Hello"}})
+	
+	def test_push_pull_conflict(self):
+		with pytest.raises(ValueError):
+			Update({'$push': {'tags': 'a'}}) & Update({'$pull': {'tags': 'b'}})
+	
+	def test_nested_conflict(self):
+		with pytest.raises(ValueError):
+			Update({'$inc': {'address.floor': 1}}) & Update({'$inc': {'address': 1}})
+	
+	def test_set_supersedes_set(self):
+		assert Update({'$set': {'name': "Alice"}}) & Update({'$set': {'name': "Bob"}}) == {'$set': {'name': "Bob"}}
+	
+	def test_set_supersedes_unset(self):
+		result = Update({'$unset': {'name': ''}}) & Update({'$set': {'name': "Bob"}})
+		assert result == {'$set': {'name': "Bob"}}
+	
+	def test_unset_supersedes_set(self):
+		result = Update({'$set': {'name': "Bob", 'age': 27}}) & Update({'$unset': {'name': ''}})
+		assert result == {'$set': {'age': 27}, '$unset': {'name': ''}}
+	
+	def test_set_supersedes_nested(self):
+		result = Update({'$set': {'address.city': "Montréal"}, '$inc': {'address.floor': 1}}) & \
+				Update({'$set': {'address': {'city': "Toronto"}}})
+		assert result == {'$set': {'address': {'city': "Toronto"}}}
+	
+	def test_set_supersedes_inc(self):
+		assert Update({'$inc': {'age': 1}}) & Update({'$set': {'age': 27}}) == {'$set': {'age': 27}}
+	
+	def test_set_nested_within_set(self):
+		result = Update({'$set': {'address': {'city': "Montréal"}}}) & Update({'$set': {'address.floor': 2}})
+		assert result == {'$set': {'address': {'city': "Montréal", 'floor': 2}}}
+	
+	def test_set_nested_within_scalar(self):
+		with pytest.raises(ValueError):
+			Update({'$set': {'address': None}}) & Update({'$set': {'address.floor': 2}})
+	
+	def test_set_nested_within_unset(self):
+		result = Update({'$unset': {'address': ''}}) & Update({'$set': {'address.floor': 2}})
+		assert result == {'$set': {'address': {'floor': 2}}}
+	
+	def test_unset_nested_within_set(self):
+		result = Update({'$set': {'address': {'city': "Montréal", 'floor': 2}}}) & \
+				Update({'$unset': {'address.floor': ''}})
+		assert result == {'$set': {'address': {'city': "Montréal"}}}
+	
+	def test_unset_nested_within_unset(self):
+		result = Update({'$unset': {'address': ''}}) & Update({'$unset': {'address.floor': ''}})
+		assert result == {'$unset': {'address': ''}}
+	
+	def test_inc_nested_within_set(self):
+		result = Update({'$set': {'address': {'floor': 1}}}) & Update({'$inc': {'address.floor': 2, 'address.unit': 5}})
+		assert result == {'$set': {'address': {'floor': 3, 'unit': 5}}}
+	
+	def test_push_nested_within_unset(self):
+		result = Update({'$unset': {'profile': ''}}) & Update({'$push': {'profile.tags': 'a'}})
+		assert result == {'$set': {'profile': {'tags': ['a']}}}
+	
+	def test_inc_nested_within_scalar(self):
+		with pytest.raises(ValueError):
+			Update({'$set': {'address': {'floor': "first"}}}) & Update({'$inc': {'address.floor': 1}})
+	
+	def test_current_date_nested_within_set(self):
+		with pytest.raises(ValueError):
+			Update({'$set': {'meta': {}}}) & Update({'$currentDate': {'meta.modified': True}})
+	
+	def test_inc_after_set(self):
+		assert Update({'$set': {'age': 26}}) & Update({'$inc': {'age': 1}}) == {'$set': {'age': 27}}
+	
+	def test_inc_after_unset(self):
+		assert Update({'$unset': {'age': ''}}) & Update({'$inc': {'age': 2}}) == {'$set': {'age': 2}}
+	
+	def test_push_after_set(self):
+		result = Update({'$set': {'tags': ['a']}}) & Update({'$push': {'tags': {'$each': ['b', 'c']}}})
+		assert result == {'$set': {'tags': ['a', 'b', 'c']}}
+	
+	def test_add_to_set_after_set(self):
+		result = Update({'$set': {'tags': ['a']}}) & Update({'$addToSet': {'tags': {'$each': ['a', 'b']}}})
+		assert result == {'$set': {'tags': ['a', 'b']}}
+	
+	def test_push_after_scalar_set(self):
+		with pytest.raises(ValueError):
+			Update({'$set': {'tags': 'a'}}) & Update({'$push': {'tags': 'b'}})
\ No newline at end of file
@@ -0,0 +1,130 @@
+import re
+from collections import OrderedDict as odict
+
+from marrow.mongo import Document, Filter
+from marrow.mongo.field import Integer, String
+from marrow.mongo.query.optimize import optimize
+from marrow.mongo.query.template import Param
+
+
+class Sample(Document):
+	name = String()
+	age = Integer()
+	rank = Integer()
+
+
+class TestConjunction(object):
+	def test_canonical_unchanged(self):
+		query = {'name': "Alice", 'age': {'$gt': 27}}
+		assert optimize(query) == query
+	
+	def test_not_modified(self):
+		clause = {'age': {'$gt': 27}}
+		query = {'age': {'$gt': 18}, '$and': [clause]}
+		
+		assert optimize(query) == {'age': {'$gt': 27}}
+		assert query == {'age': {'$gt': 18}, '$and': [{'age': {'$gt': 27}}]}
+	
+	def test_flatten_and(self):
+		query = {'$and': [{'$and': [{'name': "Alice"}]}, {'age': 27}]}
+		assert optimize(query) == {'name': "Alice", 'age': 27}
+	
+	def test_conflict_retained(self):
+		query = {'name': "Alice", '$and': [{'name': "Bob"}, {'age': 27}]}
+		assert optimize(query) == {'name': "Alice", 'age': 27, '$and': [{'name': "Bob"}]}
+	
+	def test_duplicates(self):
+		query = {'name': "Alice", '$and': [{'name': "Alice"}, {'name': "Bob"}, {'name': "Bob"}]}
+		assert optimize(query) == {'name': "Alice", '$and': [{'name': "Bob"}]}
+	
+	def test_unwrap_eq(self):
+		assert optimize({'age': {'$eq': 27}}) == {'age': 27}
+	
+	def test_unwrap_eq_regex(self):
+		pattern = re.compile('^A')
+		assert optimize({'name': {'$eq': pattern}}) == {'name': {'$eq': pattern}}
+	
+	def test_range_merge(self):
+		query = {'$and': [{'age': {'$gt': 18}}, {'age': {'$gte': 21, '$lt': 65}}, {'age': {'$lte': 30}}]}
+		assert optimize(query) == {'age': {'$gte': 21, '$lte': 30}}
+	
+	def test_range_tighten(self):
+		assert optimize({'age': {'$gt': 27, '$gte': 27}}) == {'age': {'$gt': 27}}
+		assert optimize({'age': {'$lt': 27, '$lte': 20}}) == {'age': {'$lte': 20}}
+	
+	def test_range_incomparable(self):
+		query = {'age': {'$gt': 18}, '$and': [{'age': {'$gt': "18"}}]}
+		assert optimize(query) == query
+	
+	def test_range_boolean(self):
+		query = {'age': {'$gt': 0}, '$and': [{'age': {'$gt': True}}]}
+		assert optimize(query) == query
+	
+	def test_regex_opaque(self):
+		query = {'name': {'$regex': '^A'}, '$and': [{'name': {'$options': 'i'}}]}
+		assert optimize(query) == query
+
+
+class TestDisjunction(object):
+	def test_flatten_or(self):
+		query = {'$or': [{'name': "Alice"}, {'$or': [{'age': 27}, {'rank': 1}]}]}
+		assert optimize(query) == {'$or': [{'name': "Alice"}, {'age': 27}, {'rank': 1}]}
+	
+	def test_single_branch(self):
+		assert optimize({'age': 27, '$or': [{'name': "Alice"}]}) == {'age': 27, 'name': "Alice"}
+	
+	def test_equality_in(self):
+		query = {'$or': [{'name': "Alice"}, {'age': 27}, {'name': "Bob"}, {'name': {'$in': ["Eve", "Alice"]}}]}
+		assert optimize(query) == {'$or': [{'name': {'$in': ["Alice", "Bob", "Eve"]}}, {'age': 27}]}
+	
+	def test_equality_collapse(self):
+		assert optimize({'$or': [{'name': "Alice"}, {'name': "Bob"}]}) == {'name': {'$in': ["Alice", "Bob"]}}
+	
+	def test_duplicate_branches(self):
+		assert optimize({'$or': [{'age': {'$gt': 27}}, {'age': {'$gt': 27}}]}) == {'age': {'$gt': 27}}
+	
+	def test_match_all(self):
+		assert optimize({'age': 27, '$or': [{'name': "Alice"}, {}]}) == {'age': 27}
+	
+	def test_compound_branches(self):
+		query = {'$or': [{'name': "Alice", 'age': 27}, {'name': "Bob"}]}
+		assert optimize(query) == query
+	
+	def test_repeated_or(self):
+		query = {'$or': [{'name': "Alice"}, {'age': 27}], '$and': [{'$or': [{'rank': 1}, {'age': 42}]}]}
+		assert optimize(query) == query
+	
+	def test_nor(self):
+		query = {'$nor': [{'$and': [{'age': 27}]}]}
+		assert optimize(query) == {'$nor': [{'age': 27}]}
+
+
+class TestFilterOptimize(object):
+	def test_combined(self):
+		query = ((Sample.age > 18) & (Sample.age > 21)) | (Sample.name == "Alice") | (Sample.name == "Bob")
+		result = query.optimize()
+		
+		assert isinstance(result, Filter)
+		assert result == {'$or': [{'age': {'$gt': 21}}, {'name': {'$in': ["Alice", "Bob"]}}]}
+	
+	def test_eq_wrapper(self):
+		query = (Sample.age == 27) & (Sample.age == 27)
+		assert query == {'age': {'$eq': 27}}
+		assert query.optimize() == {'age': 27}
+	
+	def test_nested_and(self):
+		clauses = [(Sample.age > 18).as_query, ((Sample.rank == 1) & (Sample.age < 65)).as_query]
+		query = Filter(odict((('$and', clauses), )))
+		assert query.optimize() == {'age': {'$gt': 18, '$lt': 65}, 'rank': 1}
+	
+	def test_preserves_binding(self):
+		query = Filter({'age': {'$eq': 27}}, collection=None, document=Sample).optimize()
+		assert query.document is Sample
+	
+	def test_placeholders(self):
+		query = ((Sample.age >= Param('minimum')) & (Sample.age > Param('floor'))).optimize()
+		assert query.prepare()(minimum=18, floor=21) == {'age': {'$gte': 18, '$gt': 21}}
+		
+		clauses = [(Sample.age > Param('minimum')).as_query, (Sample.age > Param('floor')).as_query]
+		query = Filter(odict((('$and', clauses), ))).optimize()
+		assert query.prepare()(minimum=18, floor=21) == {'age': {'$gt': 18}, '$and': [{'age': {'$gt': 21}}]}
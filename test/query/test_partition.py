@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta, timezone
+from threading import Event
+from time import monotonic
+
+import pytest
+from bson import ObjectId
+
+from fake import Collection, Person
+from marrow.mongo import Filter
+from marrow.mongo.query import QuerySet
+from marrow.mongo.query.match import compile_filter
+from marrow.mongo.query.partition import chronological, ranges, sampled, scan
+from marrow.mongo.util.identity import IdentityMap
+
+
+def partitions(collection, points):
+	people = QuerySet(Person, collection, Filter(document=Person, collection=collection))
+	return [people.filter(bound) if bound else people for bound in ranges(points)]
+
+
+@pytest.fixture
+def collection():
+	return Collection(*({'_id': i, 'name': "Person {}".format(i), 'age': i % 50} for i in range(100)))
+
+
+class TestRanges(object):
+	def test_unbounded(self):
+		assert ranges([]) == [{}]
+	
+	def test_bounds(self):
+		assert ranges([10, 20]) == [
+				{'_id': {'$not': {'$gte': 10}}},
+				{'_id': {'$gte': 10, '$lt': 20}},
+				{'_id': {'$gte': 20}},
+			]
+	
+	def test_exhaustive(self):
+		identifiers = [-5, 0, 10, 15, 20, 99, "string", None]
+		matches = [compile_filter(bound) for bound in ranges([10, 20])]
+		
+		for identifier in identifiers:
+			assert sum(match({'_id': identifier}) for match in matches) == 1
+
+
+class TestSplitting(object):
+	def test_sampled(self, collection):
+		assert sampled(collection, {}, 4) == [25, 50, 75]
+	
+	def test_sampled_query(self, collection):
+		assert sampled(collection, {'age': {'$lt': 10}}, 2) == [50]
+	
+	def test_sampled_single(self, collection):
+		assert sampled(collection, {}, 1) == []
+		assert sampled(collection, {'age': 1337}, 4) == []
+	
+	def test_sampled_sparse(self, collection):
+		assert sampled(collection, {'_id': {'$lt': 2}}, 8) == [1]
+	
+	def test_chronological(self):
+		start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+		identifiers = [ObjectId.from_datetime(start + timedelta(hours=i)) for i in range(101)]
+		points = chronological(Collection(*({'_id': i} for i in identifiers)), {}, 4)
+		
+		assert [point.generation_time for point in points] == [start + timedelta(hours=i) for i in (25, 50, 75)]
+	
+	def test_chronological_empty(self):
+		assert chronological(Collection(), {}, 4) == []
+	
+	def test_chronological_type(self, collection):
+		with pytest.raises(TypeError):
+			chronological(collection, {}, 4)
+
+
+class TestScan(object):
+	def test_documents(self, collection):
+		results = list(scan(partitions(collection, [25, 50, 75])))
+		
+		assert len(collection.cursors) == 4
+		assert all(isinstance(person, Person) for person in results)
+		assert sorted(person.id for person in results) == list(range(100))
+	
+	def test_process(self, collection):
+		results = list(scan(partitions(collection, [25, 50, 75]), lambda partition: sum(1 for i in partition)))
+		assert sorted(results) == [25, 25, 25, 25]
+	
+	def test_empty(self):
+		assert list(scan([])) == []
+	
+	def test_process_abandoned(self, collection):
+		release = Event()
+		
+		def process(partition):
+			if '$gte' in partition.query.as_query['_id']:  # The second partition blocks until released.
+				release.wait(5)
+			
+			return 1
+		
+		results = scan(partitions(collection, [50]), process)
+		start = monotonic()
+		
+		assert next(results) == 1
+		results.close()  # Returns without awaiting the blocked call.
+		
+		assert monotonic() - start < 1
+		release.set()
+	
+	def test_context(self, collection):
+		with IdentityMap() as identity:
+			list(scan(partitions(collection, [25, 50, 75])))
+			assert len(identity) == 100
+		
+		with IdentityMap() as identity:
+			list(scan(partitions(collection, [50]), lambda partition: list(partition)))
+			assert len(identity) == 100
+	
+	def test_abandoned(self, collection):
+		results = scan(partitions(collection, [25, 50, 75]), workers=2, buffer=1)
+		
+		assert isinstance(next(results), Person)
+		results.close()
+		
+		assert all(cursor.closed for cursor in collection.cursors)
+	
+	def test_process_failure(self, collection):
+		def explode(partition):
+			raise ValueError("Broken.")
+		
+		with pytest.raises(ValueError):
+			list(scan(partitions(collection, [25]), explode))
+	
+	def test_failure(self, collection):
+		def explode(query, **options):
+			raise ValueError("Broken.")
+		
+		collection.find = explode
+		
+		with pytest.raises(ValueError):
+			list(scan(partitions(collection, [25])))
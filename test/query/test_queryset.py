@@ -0,0 +1,131 @@
+import pytest
+
+from fake import Collection, Person
+from marrow.mongo import Filter
+from marrow.mongo.query import QuerySet
+
+
+@pytest.fixture
+def collection():
+	return Collection({'_id': 1, 'name': "Alice", 'age': 27}, {'_id': 2, 'name': "Bob", 'age': 42})
+
+
+@pytest.fixture
+def people(collection):
+	return QuerySet(Person, collection, Filter(document=Person, collection=collection))
+
+
+class TestRefinement(object):
+	def test_lazy(self, people, collection):
+		people.filter(age=27).sort('-age').limit(5)
+		assert not collection.calls
+	
+	def test_immutable(self, people):
+		adults = people.filter(Person.age >= 18)
+		assert adults is not people
+		assert not people.query
+		assert adults.query.as_query == {'age': {'$gte': 18}}
+	
+	def test_parametric_filter(self, people):
+		assert people.filter(name="Alice").query.as_query == {'name': "Alice"}
+	
+	def test_options(self, people):
+		refined = people.sort('-age').project('name').skip(1).limit(2).batch_size(50).hint(Person._age)
+		assert refined.options == {
+				'sort': [('age', -1)],
+				'projection': {'name': True},
+				'skip': 1,
+				'limit': 2,
+				'batch_size': 50,
+				'hint': [('age', 1)],
+			}
+	
+	def test_repr(self, people):
+		assert repr(people.limit(1)) == "QuerySet(Person, {}, limit=1)"
+
+
+class TestSlicing(object):
+	def test_slice(self, people):
+		assert people[5:15].options == {'skip': 5, 'limit': 10}
+		assert people[5:].options == {'skip': 5}
+	
+	def test_nested(self, people):
+		assert people[10:20][2:5].options == {'skip': 12, 'limit': 3}
+		assert people[10:20][5:].options == {'skip': 15, 'limit': 5}
+		assert people[10:20][5:50].options == {'skip': 15, 'limit': 5}
+	
+	def test_empty(self, people, collection):
+		empty = people[10:20][15:]
+		assert empty.empty
+		assert list(empty) == []
+		assert empty.count() == 0
+		assert not empty.exists()
+		assert empty.first() is None
+		assert not collection.calls
+	
+	def test_invalid(self, people):
+		with pytest.raises(ValueError):
+			people[::2]
+		
+		with pytest.raises(ValueError):
+			people[-1:]
+		
+		with pytest.raises(IndexError):
+			people[-1]
+	
+	def test_index(self, people, collection):
+		assert people[1].name == "Bob"
+		assert collection.calls[0][2] == {'skip': 1}
+		
+		with pytest.raises(IndexError):
+			people[2]
+
+
+class TestExecution(object):
+	def test_iteration(self, people, collection):
+		results = list(people)
+		assert [i.name for i in results] == ["Alice", "Bob"]
+		assert isinstance(results[0], Person)
+		assert len(collection.calls) == 1
+	
+	def test_once(self, people, collection):
+		assert next(people).name == "Alice"
+		assert [i.name for i in people] == ["Bob"]
+		assert len(collection.calls) == 1
+	
+	def test_projected(self, people):
+		alice, bob = people.project('name')
+		assert alice.__dict__['__unloaded__'] == {'age'}
+	
+	def test_close(self, people, collection):
+		with people as results:
+			next(results)
+		
+		assert collection.cursors[-1].closed
+
+
+class TestShortcuts(object):
+	def test_count(self, people, collection):
+		assert people[1:].count() == 1
+		assert collection.calls == [('count_documents', {}, {'skip': 1})]
+	
+	def test_count_unbounded(self, people, collection):
+		assert people.skip(0).limit(0).count() == 2
+		assert collection.calls == [('count_documents', {}, {})]
+	
+	def test_exists(self, people, collection):
+		assert people.exists()
+		assert collection.calls[0] == ('find_one', {}, {'projection': {'_id': 1}})
+	
+	def test_first(self, people, collection):
+		assert people.sort('-age').first().name == "Bob"
+		assert collection.calls[0][2] == {'sort': [('age', -1)]}
+	
+	def test_values_list(self, people, collection):
+		assert list(people.values_list('name')) == ["Alice", "Bob"]
+		assert list(people.values_list('name', 'age')) == [("Alice", 27), ("Bob", 42)]
+		assert collection.calls[0][2]['projection'] == {'name': True}
+	
+	def test_values_list_required(self, people):
+		with pytest.raises(TypeError):
+			list(people.values_list())
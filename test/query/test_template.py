@@ -0,0 +1,114 @@
+from bson import ObjectId
+
+import pytest
+
+from marrow.mongo import Document, Filter, Param
+from marrow.mongo.field import Array, Integer, ObjectId as ObjectIdField, String
+from marrow.mongo.query import Template
+
+
+class Post(Document):
+	author = ObjectIdField()
+	title = String()
+	views = Integer()
+	tags = Array(String())
+
+
+@pytest.fixture
+def oid():
+	return ObjectId('5978c7b8fb2ad90fdbbd4ac6')
+
+
+class TestParam(object):
+	def test_repr(self):
+		assert repr(Param('name')) == "Param('name')"
+		assert repr(Param('name', many=True)) == "Param('name', many=True)"
+	
+	def test_association(self):
+		query = Post.author == Param('author')
+		param = query['author']
+		
+		assert isinstance(param, Param)
+		assert param.field is Post.__fields__['author']
+		assert param.document is Post
+
+
+class TestTemplate(object):
+	def test_prepare(self):
+		template = (Post.author == Param('author')).prepare()
+		
+		assert isinstance(template, Template)
+		assert template.names == {'author'}
+		assert 'Param' in repr(template)
+	
+	def test_bind_casts(self, oid):
+		template = (Post.author == Param('author')).prepare()
+		result = template(author=str(oid))
+		
+		assert isinstance(result, Filter)
+		assert result.as_query == {'author': oid}
+	
+	def test_bind_operator(self):
+		template = (Post.views > Param('minimum')).prepare()
+		assert template(minimum='27').as_query == {'views': {'$gt': 27}}
+	
+	def test_bind_none(self):
+		template = (Post.title == Param('title')).prepare()
+		assert template(title=None).as_query == {'title': None}
+	
+	def test_bind_many(self, oid):
+		template = Post.author.any(Param('authors')).prepare()
+		assert template(authors=[str(oid), None]).as_query == {'author': {'$in': [oid, None]}}
+	
+	def test_bind_mixed_many(self, oid):
+		template = Post.author.any(oid, Param('author')).prepare()
+		assert template(author=str(oid)).as_query == {'author': {'$in': [oid, oid]}}
+	
+	def test_bind_combined(self, oid):
+		query = (Post.author == Param('author')) & (Post.title == "Hello") & (Post.views >= Param('views'))
+		template = query.prepare()
+		result = template(author=oid, views=2)
+		
+		assert result.as_query == {'author': oid, 'title': "Hello", 'views': {'$gte': 2}}
+	
+	def test_bind_repeated(self):
+		template = ((Post.views > Param('views')) | (Post.title == Param('views'))).prepare()
+		assert template(views=2).as_query == {'$or': [{'views': {'$gt': 2}}, {'title': '2'}]}
+	
+	def test_static_shared(self, oid):
+		template = ((Post.author == Param('author')) & Post.tags.any("a", "b")).prepare()
+		first = template(author=oid)
+		second = template(author=oid)
+		
+		assert first.as_query == second.as_query
+		assert first.operations is not second.operations
+		assert first['tags'] is second['tags']
+	
+	def test_bindings_independent(self, oid):
+		template = (Post.author == Param('author')).prepare()
+		other = ObjectId()
+		
+		assert template(author=oid)['author'] == oid
+		assert template(author=other)['author'] == other
+	
+	def test_no_placeholders(self):
+		template = (Post.title == "Hello").prepare()
+		
+		assert template.names == set()
+		assert template().as_query == {'title': "Hello"}
+	
+	def test_unknown_placeholder(self):
+		template = (Post.title == Param('title')).prepare()
+		
+		with pytest.raises(TypeError) as excinfo:
+			template(title="Hi", name="Bob")
+		
+		assert 'name' in str(excinfo.value)
+	
+	def test_missing_placeholder(self):
+		template = ((Post.title == Param('title')) & (Post.views == Param('views'))).prepare()
+		
+		with pytest.raises(TypeError) as excinfo:
+			template(title="Hi")
+		
+		assert 'views' in str(excinfo.value)
@@ -3,10 +3,14 @@
 from __future__ import unicode_literals
 
 import pytest
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
 from pymongo.errors import WriteError
 
 from marrow.mongo import Field, Index
 from marrow.mongo.trait import Collection
+from marrow.mongo.util.bulk import BulkFailure
+from marrow.mongo.util.projection import Siblings
 
 
 @pytest.fixture
@@ -90,6 +94,12 @@ class TestDocumentBinding(object):
 		with pytest.raises(TypeError):
 			Sample.get_collection("Hoi.")
 	
+	def test_lazy_document_class(self, Sample):
+		assert Sample._collection_configuration()['codec_options'].document_class is Sample.__store__
+		
+		Sample.__lazy__ = True
+		assert Sample._collection_configuration()['codec_options'].document_class is RawBSONDocument
+	
 	def test_validation(self, db, Sample):
 		if tuple((int(i) for i in db.client.server_info()['version'].split('.')[:3])) < (3, 2):
 			pytest.xfail("Test expected to fail on MongoDB versions prior to 3.2.")
@@ -122,3 +132,111 @@ class TestDocumentBinding(object):
 		
 		with pytest.raises(TypeError):
 			Sample().update_one()
+	
+	def test_save_untracked(self, db):
+		class Untracked(Collection):
+			__collection__ = 'collection'
+			field = Field()
+		
+		Untracked.bind(db).create_collection(drop=True)
+		
+		inst = Untracked(field=1)
+		inst.save()
+		inst.field = 2
+		inst.save()
+		
+		assert Untracked.get_collection().find_one()['field'] == 2
+	
+	def test_save_projected(self):
+		class Untracked(Collection):
+			__collection__ = 'collection'
+			field = Field()
+			other = Field()
+		
+		class Recorder(object):
+			def __init__(self):
+				self.calls = []
+			
+			def update_one(self, query, update, **kw):
+				self.calls.append(('update_one', dict(query), update, kw))
+			
+			def replace_one(self, query, document, **kw):
+				self.calls.append(('replace_one', dict(query), dict(document), kw))
+		
+		collection = Untracked.__bound__ = Recorder()
+		identifier = ObjectId()
+		siblings = Siblings(Untracked, collection, {'field': 1, 'third': 1})
+		
+		inst = Untracked.from_mongo({'_id': identifier, 'field': 1, 'third': 3}, siblings=siblings)
+		inst.field = 2
+		inst.save()
+		
+		del inst.field
+		inst.save()
+		
+		assert collection.calls == [
+				('update_one', {'_id': identifier}, {'$set': {'field': 2, 'third': 3}},
+						{'upsert': True, 'bypass_document_validation': False}),
+				('update_one', {'_id': identifier}, {'$set': {'third': 3}, '$unset': {'field': ''}},
+						{'upsert': True, 'bypass_document_validation': False}),
+			]
+	
+	def test_save_tracked(self, db):
+		class Tracked(Collection):
+			__collection__ = 'collection'
+			__track__ = True
+			field = Field()
+			other = Field()
+		
+		Tracked.bind(db).create_collection(drop=True)
+		collection = Tracked.get_collection()
+		
+		inst = Tracked(field=1)
+		assert inst.save().inserted_id == inst.id
+		assert inst.save() is None  # Unchanged since insertion.
+		
+		inst.other = 2
+		assert inst.save().modified_count == 1
+		
+		collection.update_one({'_id': inst.id}, {'$set': {'field': 27}})  # Concurrent, unrelated change.
+		
+		inst = Tracked.from_mongo(collection.find_one())
+		collection.update_one({'_id': inst.id}, {'$set': {'field': 42}})
+		inst.other = 3
+		inst.save()
+		
+		assert collection.find_one() == {'_id': inst.id, 'field': 42, 'other': 3}
+	
+	def test_bulk(self, db):
+		class Bulked(Collection):
+			__collection__ = 'collection'
+			field = Field()
+		
+		Bulked.bind(db).create_collection(drop=True)
+		existing = Bulked(field=0)
+		existing.insert_one()
+		
+		with pytest.raises(BulkFailure) as exc:
+			with Bulked.bulk(ordered=False, count=2) as bulk:
+				for i in range(1, 4):
+					Bulked(field=i).insert_one()
+				
+				existing.insert_one()  # Duplicate identifier.
+				existing.update_one(field=27)
+		
+		assert bulk.result.inserted == 3
+		assert bulk.result.modified == 1
+		assert exc.value.errors[0][0] is existing
+		assert Bulked.get_collection().count_documents({}) == 4
+	
+	def test_insert_many(self, db):
+		class Many(Collection):
+			__collection__ = 'collection'
+			field = Field()
+		
+		Many.bind(db).create_collection(drop=True)
+		
+		result = Many.insert_many((Many(field=i) for i in range(2500)), parallel=True)
+		
+		assert len(result.inserted_ids) == 2500
+		assert Many.get_collection().count_documents({}) == 2500
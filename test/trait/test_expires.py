@@ -5,9 +5,13 @@ from __future__ import unicode_literals
 from datetime import timedelta
 
 import pytest
+from bson import ObjectId
 
-from marrow.mongo.trait import Expires
+from fake import Collection
+from marrow.mongo.field import String
+from marrow.mongo.trait import Expires, Queryable
 from marrow.mongo.util import utcnow
+from marrow.mongo.util.projection import Siblings
 
 
 class TestExpires(object):
@@ -47,3 +51,25 @@ class TestExpires(object):
 		inst = self.Sample.from_mongo({'expires': now + timedelta(hours=1)})
 		assert isinstance(inst, self.Sample)
 		assert not inst.is_expired
+	
+	def test_projected_expired(self):
+		class Projected(Queryable, Expires):
+			__collection__ = 'projected'
+			__advise__ = False
+			
+			name = String(default="Unnamed", assign=True)
+		
+		stored = [
+				{'_id': ObjectId(), 'expires': utcnow() - timedelta(hours=1)},
+				{'_id': ObjectId(), 'expires': utcnow() + timedelta(hours=1)},
+			]
+		
+		Projected.__bound__ = Collection(stored[0])  # The expired document, as if found.
+		assert Projected.find_one(projection=('expires', )) is None
+		
+		siblings = Siblings(Projected, Projected.__bound__, {'expires': 1})
+		expired, current = Projected.from_mongo_many([dict(i) for i in stored], siblings=siblings)
+		
+		assert expired is None
+		assert current.__dict__['__unloaded__'] == {'name'}  # Not hidden by the default.
+		assert 'name' not in current.__data__
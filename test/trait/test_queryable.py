@@ -10,6 +10,9 @@ from pymongo.errors import WriteError
 from marrow.mongo import Index, U
 from marrow.mongo.field import Integer, String
 from marrow.mongo.trait import Queryable
+from marrow.mongo.util.coverage import CoverageWarning
+from marrow.mongo.util.identity import IdentityMap
+from marrow.mongo.util.shape import Registry
 
 
 @pytest.fixture
@@ -21,6 +24,7 @@ def db(request, connection):
 def Sample(request, db):
 	class Sample(Queryable):
 		__collection__ = 'queryable_collection'
+		__advise__ = False  # Enabled where tested.
 		
 		string = String()
 		integer = Integer()
@@ -72,6 +76,15 @@ class TestQueryableCore(object):
 		with pytest.raises(TypeError):
 			Sample._prepare_find(wait=False)
 	
+	def test_prepare_find_optimized(self, Sample):
+		cls, collection, query, options = Sample._prepare_find(Sample.integer == 7, integer=7)
+		assert query == {'integer': 7}
+	
+	def test_prepare_find_unoptimized(self, Sample):
+		Sample.__optimize__ = False
+		cls, collection, query, options = Sample._prepare_find(Sample.integer == 7, integer=7)
+		assert query == {'integer': {'$eq': 7}}
+	
 	def test_prepare_find_max_time_modifier(self, Sample):
 		cls, collection, query, options = Sample._prepare_find(max_time_ms=1000)
 		assert options['modifiers'] == {'$maxTimeMS': 1000}
@@ -106,6 +119,28 @@ class TestQueryableTrait(object):
 		assert doc.string == 'pre'
 		assert doc.integer is None
 	
+	def test_find_statistics(self, Sample):
+		Sample.__statistics__ = registry = Registry()
+		
+		list(Sample.find(Sample.integer > 7))
+		list(Sample.find(Sample.integer > 27))
+		
+		assert len(registry) == 1
+		entry, = registry.dump()
+		assert entry['count'] == 2
+		assert entry['documents'] == 3
+		assert '"$gt":"?"' in entry['shape']
+	
+	def test_find_one_statistics(self, Sample):
+		Sample.__statistics__ = registry = Registry()
+		
+		Sample.find_one(Sample.integer == 27)
+		Sample.find_one(Sample.integer == 1337)
+		
+		entry, = registry.dump()
+		assert entry['count'] == 2
+		assert entry['documents'] == 1
+	
 	def test_find_in_sequence(self, db, Sample):
 		if tuple((int(i) for i in db.client.server_info()['version'].split('.')[:3])) < (3, 4):
 			pytest.xfail("Test expected to fail on MongoDB versions prior to 3.4.")
@@ -133,6 +168,74 @@ class TestQueryableTrait(object):
 		assert doc.string == 'hoi'
 		assert doc.integer == 42
 	
+	def test_find_documents(self, Sample):
+		results = list(Sample.find(Sample.integer > 7, sort=('integer', )))
+		assert [i.string for i in results] == ['bar', 'baz']
+		assert isinstance(results[0], Sample)
+		assert '__unloaded__' not in results[0].__dict__
+	
+	def test_find_projected(self, Sample):
+		results = list(Sample.find(Sample.integer > 7, projection=('integer', ), sort=('integer', )))
+		assert 'string' not in results[0].__data__
+		assert results[0].__dict__['__unloaded__'] == {'string'}
+		
+		assert results[0].string == 'bar'  # Loads the field for both documents.
+		assert results[1].__data__['string'] == 'baz'
+		assert not results[1].__dict__['__unloaded__']
+	
+	def test_queryset_shortcuts(self, Sample):
+		rs = Sample.find(Sample.integer > 7).sort('integer')
+		assert rs.count() == 2
+		assert rs[1:].count() == 1
+		assert rs.exists()
+		assert not rs.filter(integer=1337).exists()
+		assert rs.first().string == 'bar'
+		assert rs[1].string == 'baz'
+		assert list(rs.values_list('string')) == ['bar', 'baz']
+	
+	def test_paginate(self, Sample):
+		page = Sample.paginate(sort=('-integer', ), size=2)
+		assert [doc.integer for doc in page] == [42, 27]
+		assert page.more
+		
+		page = Sample.paginate(sort=('-integer', ), size=2, after=page.after)
+		assert [doc.integer for doc in page] == [7, None]
+		assert not page.more
+		
+		with pytest.raises(ValueError):
+			Sample.paginate(sort=('integer', ), size=2, after=page.after)
+	
+	def test_scan_partitioned(self, Sample):
+		results = Sample.scan_partitioned(3, Sample.integer != None)
+		assert sorted(doc.integer for doc in results) == [7, 27, 42]
+		
+		counts = Sample.scan_partitioned(2, split=[ObjectId('59129d460aa7397ce3f9643f')], process=lambda qs: qs.count())
+		assert sorted(counts) == [1, 3]
+	
+	def test_identity_map(self, Sample):
+		with IdentityMap() as identity:
+			doc = Sample.find_one(integer=42)
+			
+			assert Sample[doc.id] is doc
+			assert Sample.lookup([doc.id])[doc.id] is doc
+			assert identity.hits == 2
+	
+	def test_find_one_projected(self, Sample):
+		doc = Sample.find_one(integer=42, projection=('integer', ))
+		assert 'string' not in doc.__data__
+		assert doc.string == 'baz'
+	
+	def test_advise(self, Sample):
+		advice = Sample.advise(Sample.integer > 7, sort=('-integer', ))
+		assert advice.indexes == ('_field', )
+		assert advice.sorted
+	
+	def test_advise_warning(self, Sample):
+		Sample.__advise__ = True
+		
+		with pytest.warns(CoverageWarning, match="collection scan"):
+			Sample.find_one(string='foo')
+	
 	def test_insert_one(self, Sample):
 		doc = Sample(string='diz', integer=2029)
 		assert doc.id
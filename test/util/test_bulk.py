@@ -0,0 +1,216 @@
+from time import sleep
+
+import pytest
+from bson.codec_options import DEFAULT_CODEC_OPTIONS
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from fake import Collection as FakeCollection, Person
+from marrow.mongo.field import String
+from marrow.mongo.trait import Collection
+from marrow.mongo.util.bulk import HEADROOM, Bulk, BulkFailure, active, batches
+
+
+@pytest.fixture
+def collection():
+	collection = FakeCollection()
+	collection.admin.reply.update(maxWriteBatchSize=3, maxMessageSizeBytes=HEADROOM + 200)
+	Person.__bound__ = collection
+	yield collection
+	Person.__bound__ = None
+
+
+class TestBulk(object):
+	def test_buffered(self, collection):
+		with Person.bulk() as bulk:
+			assert active(collection) is bulk
+			assert Person(name="Alice").insert_one() is None
+			Person(name="Bob").update_one(age=27)
+			Person(name="Carol").delete_one()
+			assert len(bulk) == 3
+			assert not collection.batches
+		
+		assert active(collection) is None
+		assert len(collection.batches) == 1
+		assert [request.__class__ for request in collection.batches[0][0]] == [InsertOne, UpdateOne, DeleteOne]
+		assert bulk.result.as_dict() == {'inserted': 1, 'matched': 1, 'modified': 1, 'deleted': 1, 'upserted': 0,
+				'batches': 1, 'errors': [], 'concerns': []}
+	
+	def test_count(self, collection):
+		with Person.bulk(count=2) as bulk:
+			for i in range(5):
+				Person(name=str(i)).insert_one()
+		
+		assert [len(batch[0]) for batch in collection.batches] == [2, 2, 1]
+		assert bulk.result.inserted == 5
+		assert bulk.result.batches == 3
+	
+	def test_size(self, collection):
+		with Person.bulk(size=100):
+			for i in range(5):
+				Person(name="x" * 40).insert_one()
+		
+		assert [len(batch[0]) for batch in collection.batches] == [1, 1, 1, 1, 1]
+	
+	def test_interval(self, collection):
+		with Person.bulk(interval=0.01):
+			Person(name="Alice").insert_one()
+			sleep(0.02)
+			Person(name="Bob").insert_one()
+			assert len(collection.batches) == 1
+		
+		assert [len(batch[0]) for batch in collection.batches] == [2]
+	
+	def test_validation(self, collection):
+		with Person.bulk():
+			Person(name="Alice").insert_one()
+			Person(name="Bob").insert_one(validate=False)
+		
+		assert [(len(requests), bypass) for requests, ordered, bypass in collection.batches] == [(1, False), (1, True)]
+	
+	def test_other_collection(self, collection):
+		other = FakeCollection()
+		other.admin.reply.update(maxWriteBatchSize=3, maxMessageSizeBytes=HEADROOM + 200)
+		
+		with Bulk(Person, other) as bulk:
+			bulk.insert_one(Person(name="Alice"))
+			Person(name="Bob").insert_one()  # Not buffered by a bulk operation upon another collection.
+			
+			assert len(collection.batches) == 1
+			assert not other.batches
+		
+		assert len(other.batches) == 1
+		assert len(collection.batches) == 1
+	
+	def test_exception_discards(self, collection):
+		with pytest.raises(ValueError):
+			with Person.bulk():
+				Person(name="Alice").insert_one()
+				raise ValueError()
+		
+		assert not collection.batches
+		assert active(collection) is None
+	
+	def test_unordered_errors(self, collection):
+		collection.failing.update({"1", "3"})
+		people = [Person(name=str(i)) for i in range(5)]
+		
+		with pytest.raises(BulkFailure) as exc:
+			with Person.bulk(ordered=False, count=2) as bulk:
+				for person in people:
+					person.insert_one()
+		
+		assert len(collection.batches) == 3
+		assert bulk.result.inserted == 3
+		assert [document for document, error in exc.value.errors] == [people[1], people[3]]
+		assert exc.value.details['nInserted'] == 3
+	
+	def test_ordered_errors(self, collection):
+		collection.failing.add("1")
+		people = [Person(name=str(i)) for i in range(5)]
+		
+		with pytest.raises(BulkFailure) as exc:
+			with Person.bulk(count=2):
+				for person in people:
+					person.insert_one()
+		
+		assert len(collection.batches) == 1
+		assert exc.value.result.inserted == 1
+		assert exc.value.errors[0][0] is people[1]
+		assert isinstance(exc.value, BulkWriteError)
+
+
+def people(count, size=10):
+	for i in range(count):
+		yield Person(name=str(i).zfill(size))
+
+
+class TestInsert(object):
+	def test_batches(self):
+		result = list(batches(people(7), DEFAULT_CODEC_OPTIONS, 3, 1000))
+		
+		assert [len(instances) for instances, encoded in result] == [3, 3, 1]
+		assert all(len(instances) == len(encoded) for instances, encoded in result)
+		assert result[0][1][0]['name'] == result[0][0][0].name
+	
+	def test_batch_size(self):
+		result = list(batches(people(4, 40), DEFAULT_CODEC_OPTIONS, 100, 150))
+		assert [len(instances) for instances, encoded in result] == [2, 2]
+	
+	def test_lazy(self, collection):
+		consumed = []
+		
+		def generate():
+			for person in people(7):
+				consumed.append(person)
+				yield person
+		
+		sizes = []
+		original = collection.insert_many
+		
+		def insert_many(documents, **kw):
+			sizes.append((len(documents), len(consumed)))
+			return original(documents, **kw)
+		
+		collection.insert_many = insert_many
+		result = Person.insert_many(generate())
+		
+		assert sizes == [(3, 4), (3, 7), (1, 7)]  # Each batch is sent once the next document is encountered.
+		assert collection.admin.commands == ['hello']
+		assert result.inserted_ids == [person.id for person in consumed]
+	
+	def test_limits_cached(self, collection):
+		Person.insert_many(people(2))
+		Person.insert_many(people(2))
+		
+		assert collection.admin.commands == ['hello']
+	
+	def test_message_size(self, collection):
+		Person.insert_many(people(4, 40))
+		assert [len(batch[0]) for batch in collection.batches] == [2, 2]
+	
+	def test_parallel(self, collection):
+		result = Person.insert_many(people(7), parallel=True)
+		
+		assert len(result.inserted_ids) == 7
+		assert [len(batch[0]) for batch in collection.batches] == [3, 3, 1]
+	
+	def test_identifier_assigned(self, collection):
+		class Anonymous(Collection):
+			__collection__ = 'people'
+			id = None
+			name = String()
+		
+		Anonymous.__bound__ = collection
+		document = Anonymous(name="Alice")
+		
+		assert Anonymous.insert_many([document]).inserted_ids == [document['_id']]
+	
+	def test_buffered(self, collection):
+		with Person.bulk() as bulk:
+			assert Person.insert_many(people(7)) is None
+		
+		assert len(collection.batches) == 1
+		assert bulk.result.inserted == 7
+	
+	def test_ordered_failure(self, collection):
+		collection.failing.add("0000000004")
+		documents = list(people(7))
+		
+		with pytest.raises(BulkFailure) as exc:
+			Person.insert_many(documents)
+		
+		assert len(collection.batches) == 2
+		assert exc.value.result.inserted == 4
+		assert exc.value.errors[0][0] is documents[4]
+	
+	def test_unordered_failure(self, collection):
+		collection.failing.update({"0000000001", "0000000004"})
+		documents = list(people(7))
+		
+		with pytest.raises(BulkFailure) as exc:
+			Person.insert_many(documents, ordered=False)
+		
+		assert len(collection.batches) == 3
+		assert exc.value.result.inserted == 5
+		assert [document for document, error in exc.value.errors] == [documents[1], documents[4]]
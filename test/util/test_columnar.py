@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from bson.tz_util import utc
+
+from marrow.mongo import Document, F
+from marrow.mongo.field import Array, Boolean, Date, Integer, Number, ObjectId as Identifier, String
+from marrow.mongo.query.match import compile_filter
+
+numpy = pytest.importorskip('numpy')
+
+from marrow.mongo.util.columnar import Columns, compile_columnar  # noqa
+
+
+class Person(Document):
+	id = Identifier('_id')
+	name = String()
+	age = Integer()
+	score = Number()
+	active = Boolean()
+	joined = Date()
+	tags = Array(String())
+
+
+EPOCH = datetime(2017, 1, 1, tzinfo=utc)
+IDENTIFIERS = [ObjectId() for i in range(5)]
+
+DOCUMENTS = [
+		{'_id': IDENTIFIERS[0], 'name': "Alice", 'age': 27, 'score': 1.5, 'active': True, 'joined': EPOCH},
+		{'_id': IDENTIFIERS[1], 'name': "Bob", 'age': 42, 'score': 7, 'active': False,
+				'joined': EPOCH + timedelta(days=30)},
+		{'_id': IDENTIFIERS[2], 'name': "Carol", 'age': None, 'score': 3.25, 'tags': ['admin']},
+		{'_id': IDENTIFIERS[3], 'name': "Dave", 'age': "old", 'active': 1},
+		{'_id': IDENTIFIERS[4], 'age': 18, 'score': True, 'joined': EPOCH - timedelta(days=1)},
+	]
+
+
+@pytest.fixture
+def people():
+	return Columns(Person, DOCUMENTS)
+
+
+def names(columns):
+	return list(columns['name'])
+
+
+class TestConstruction(object):
+	def test_columns(self, people):
+		assert len(people) == 5
+		assert 'age' in people
+		assert 'tags' not in people  # Arrays are not columnized.
+		assert people['age'].dtype == numpy.int64
+		assert people['score'].dtype == numpy.float64
+		assert people['active'].dtype == bool
+		assert people['joined'].dtype == numpy.dtype('datetime64[ms]')
+	
+	def test_attribute_name(self, people):
+		assert people['id'] is people['_id']
+	
+	def test_invalid(self, people):
+		column = people.column('age')
+		assert list(column.exists) == [True, True, True, True, True]
+		assert list(column.null) == [False, False, True, False, False]
+		assert list(column.valid) == [True, True, False, False, True]
+	
+	def test_documents(self):
+		columns = Columns(Person, [Person(name="Alice", age=27)], fields=('name', 'age'))
+		assert list(columns['age']) == [27]
+		assert set(columns.columns) == {'name', 'age'}
+	
+	def test_unsupported_field(self):
+		with pytest.raises(ValueError):
+			Columns(Person, [], fields=('tags', ))
+	
+	def test_unknown_column(self, people):
+		with pytest.raises(KeyError):
+			people['missing']
+	
+	def test_empty(self):
+		columns = Columns(Person, [])
+		assert len(columns) == 0
+		assert len(columns.filter(Person.age > 1)) == 0
+
+
+class TestSelection(object):
+	def test_slice(self, people):
+		assert names(people[1:3]) == ["Bob", "Carol"]
+	
+	def test_mask(self, people):
+		subset = people[numpy.array([True, False, True, False, False])]
+		assert len(subset) == 2
+		assert names(subset) == ["Alice", "Carol"]
+	
+	def test_filter(self, people):
+		assert names(people[Person.age > 20]) == ["Alice", "Bob"]
+		assert names(people.filter({'age': {'$lt': 30}})) == ["Alice", ""]
+
+
+class TestComparison(object):
+	def test_equality(self, people):
+		assert names(people.filter(Person.name == "Bob")) == ["Bob"]
+		assert list(people.mask(Person.age == 27)) == [True, False, False, False, False]
+	
+	def test_none(self, people):
+		assert list(people.mask(Person.age == None)) == [False, False, True, False, False]  # noqa
+		assert list(people.mask(Person.active == None)) == [False, False, True, False, True]  # noqa
+	
+	def test_not_equal(self, people):
+		assert list(people.mask(Person.age != 27)) == [False, True, True, True, True]
+	
+	def test_range(self, people):
+		assert list(people.mask((Person.age >= 18) & (Person.age < 42))) == [True, False, False, False, True]
+	
+	def test_bool_is_not_number(self, people):
+		assert list(people.mask(Person.score > 0)) == [True, True, True, False, False]
+		assert list(people.mask({'active': 1})) == [False, False, False, False, False]
+	
+	def test_numeric_operand(self, people):
+		assert list(people.mask({'age': 27.0})) == [True, False, False, False, False]
+		assert list(people.mask({'age': {'$gt': 26.5}})) == [True, True, False, False, False]
+		assert list(people.mask({'age': {'$in': [17.5, 27.0]}})) == [True, False, False, False, False]
+	
+	def test_stored_double(self):
+		columns = Columns(Person, [{'age': 27}, {'age': 27.5}])
+		assert columns['age'].dtype == numpy.float64
+		assert list(columns.mask({'age': 27.5})) == [False, True]
+		assert list(columns.mask({'age': {'$gt': 27}})) == [False, True]
+	
+	def test_mismatched_operand(self, people):
+		assert not people.mask({'age': {'$gt': "a"}}).any()
+	
+	def test_dates(self, people):
+		assert list(people.mask(Person.joined > EPOCH)) == [False, True, False, False, False]
+	
+	def test_identifier(self, people):
+		assert list(people.mask(Person.id == IDENTIFIERS[3])) == [False, False, False, True, False]
+	
+	def test_membership(self, people):
+		assert list(people.mask(Person.age.any(27, 18))) == [True, False, False, False, True]
+		assert list(people.mask({'age': {'$in': [27, None]}})) == [True, False, True, False, False]
+		assert list(people.mask({'age': {'$nin': [27, None]}})) == [False, True, False, True, True]
+	
+	def test_exists(self, people):
+		assert list(people.mask({'score': {'$exists': False}})) == [False, False, False, True, False]
+	
+	def test_mod(self, people):
+		assert list(people.mask({'age': {'$mod': [2, 0]}})) == [False, True, False, False, True]
+
+
+class TestLogical(object):
+	def test_or(self, people):
+		assert names(people.filter((Person.name == "Alice") | (Person.age == 42))) == ["Alice", "Bob"]
+	
+	def test_nor(self, people):
+		assert names(people.filter({'$nor': [{'name': "Alice"}, {'age': 42}]})) == ["Carol", "Dave", ""]
+	
+	def test_not(self, people):
+		assert list(people.mask({'age': {'$not': {'$gt': 20}}})) == [False, False, True, True, True]
+	
+	def test_unsupported(self, people):
+		with pytest.raises(ValueError):
+			compile_columnar({'name': {'$regex': '^A'}})
+		
+		with pytest.raises(ValueError):
+			compile_columnar({'$where': 'true'})
+	
+	def test_parametric(self, people):
+		assert names(people.filter(F(Person, age__gt=20, active=True))) == ["Alice"]
+
+
+@pytest.mark.parametrize('query', [
+		{'age': {'$gte': 18}},
+		{'age': {'$in': [27.0, 42.5]}},
+		{'score': 7.0},
+		{'age': None},
+		{'age': {'$ne': None}},
+		{'score': {'$lte': 3.25}},
+		{'active': False},
+		{'$or': [{'age': {'$lt': 20}}, {'name': {'$in': ["Carol", "Dave"]}}]},
+		{'joined': {'$lt': datetime(2017, 1, 2, tzinfo=utc)}},
+		{'name': {'$not': {'$in': ["Alice"]}}, 'age': {'$exists': True}},
+		{'name': {'$in': ["Carolyn", "Bob"]}},
+		{'name': {'$nin': ["Alices", None]}},
+	])
+def test_consistent_with_matcher(people, query):
+	match = compile_filter(query)
+	assert list(people.mask(query)) == [bool(match(document)) for document in DOCUMENTS]
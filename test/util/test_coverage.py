@@ -0,0 +1,135 @@
+from marrow.mongo import Document, Index
+from marrow.mongo.field import Array, Integer, String
+from marrow.mongo.util.coverage import Advice, advise
+
+
+class Person(Document):
+	name = String()
+	age = Integer()
+	city = String()
+	tags = Array(String())
+	
+	_age = Index('age')
+	_city_age = Index('city', '-age')
+	_tags = Index('tags')
+	_name = Index('#name')
+
+
+INDEXES = Person.__indexes__
+
+
+def check(*args, **kw):
+	return advise(INDEXES, *args, document=Person, **kw)
+
+
+class TestUsability(object):
+	def test_empty(self):
+		advice = check({})
+		assert advice.scan
+		assert not advice.problems
+	
+	def test_unindexed(self):
+		advice = check({'nickname': "Bob"})
+		assert advice.scan
+		assert advice.problems == ["collection scan: no declared index can be utilized"]
+	
+	def test_equality(self):
+		assert check({'age': 27}).indexes == ('_age', )
+	
+	def test_range(self):
+		assert check({'age': {'$gt': 27}}).indexes == ('_age', )
+	
+	def test_prefix(self):
+		assert check({'city': "Montreal", 'age': {'$gt': 27}}).indexes == ('_city_age', )
+		assert check({'age': 27, 'city': "Montreal"}).indexes == ('_city_age', )  # Bounds more keys.
+	
+	def test_not_prefix(self):
+		assert check({'name': {'$gt': "A"}}).scan  # Hashed indexes bound only equality.
+		assert check({'name': "Alice"}).indexes == ('_name', )
+	
+	def test_identifier(self):
+		assert check({'_id': 1}).indexes == ('_id_', )
+	
+	def test_unindexable(self):
+		assert check({'tags': {'$size': 2}}).scan
+	
+	def test_regex(self):
+		assert check({'city': {'$regex': '^Mont'}}).indexes == ('_city_age', )
+	
+	def test_or(self):
+		assert check({'$or': [{'age': 27}, {'city': "Montreal"}]}).indexes == ('_age', '_city_age')
+		
+		advice = check({'$or': [{'age': 27}, {'nickname': "Bob"}]})
+		assert advice.scan
+		assert advice.problems == ["collection scan: a branch of $or can not utilize an index"]
+	
+	def test_partial(self):
+		indexes = [Index('age', partial={'city': "Montreal"})]
+		indexes[0].__name__ = 'partial'
+		
+		assert advise(indexes, {'age': 27}).scan
+		assert advise(indexes, {'age': 27, 'city': "Montreal"}).indexes == ('partial', )
+
+
+class TestSort(object):
+	def test_sorted(self):
+		advice = check({'age': {'$gt': 27}}, [('age', -1)])
+		assert advice.sorted
+		assert not advice.problems
+	
+	def test_equality_prefix(self):
+		assert check({'city': "Montreal"}, [('age', -1)]).sorted
+		assert check({'city': "Montreal"}, [('age', 1)]).sorted  # Walked in reverse.
+		assert check({'city': "Montreal"}, [('city', 1), ('age', -1)]).sorted
+	
+	def test_mixed_directions(self):
+		assert not check({'city': {'$gt': "A"}}, [('city', 1), ('age', 1)]).sorted
+		assert check({'city': {'$gt': "A"}}, [('city', -1), ('age', 1)]).sorted
+	
+	def test_in_memory(self):
+		advice = check({'age': {'$gt': 27}}, [('city', 1)])
+		assert not advice.sorted
+		assert advice.problems == ["in-memory sort: no index utilized provides the requested order"]
+	
+	def test_membership(self):
+		assert not check({'city': {'$in': ["A", "B"]}}, [('age', -1)]).sorted
+	
+	def test_sort_only(self):
+		advice = check({}, ['age'])
+		assert advice.indexes == ('_age', )
+		assert advice.sorted
+		assert not advice.problems
+	
+	def test_sort_unbounded(self):
+		advice = check({'nickname': "Bob"}, ['age'])
+		assert advice.sorted
+		assert advice.problems == ["index scan: the filter does not bound the index walked to sort"]
+	
+	def test_or_sort(self):
+		assert not check({'$or': [{'age': 27}, {'city': "Montreal"}]}, ['age']).sorted
+
+
+class TestCovered(object):
+	def test_covered(self):
+		assert check({'city': "Montreal"}, projection={'city': 1, 'age': 1, '_id': 0}).covered
+	
+	def test_identifier(self):
+		assert not check({'city': "Montreal"}, projection={'city': 1, 'age': 1}).covered
+	
+	def test_unindexed_projection(self):
+		assert not check({'city': "Montreal"}, projection={'name': 1, '_id': 0}).covered
+	
+	def test_exclusion(self):
+		assert not check({'age': 27}, projection={'name': 0}).covered
+	
+	def test_array(self):
+		assert not check({'tags': "admin"}, projection={'tags': 1, '_id': 0}).covered
+	
+	def test_examined(self):
+		assert not check({'age': {'$type': 'int'}}, projection={'age': 1, '_id': 0}).covered
+
+
+def test_advice():
+	advice = Advice(['_age'], True, False)
+	assert repr(advice) == "Advice(indexes=('_age',), sorted=True, covered=False)"
+	assert advice.as_dict()['scan'] is False
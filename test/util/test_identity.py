@@ -0,0 +1,176 @@
+import pytest
+from bson import ObjectId
+
+from fake import Collection, Person
+from marrow.mongo.field import String
+from marrow.mongo.trait import Queryable
+from marrow.mongo.util.identity import IdentityMap, current
+
+
+ALICE, BOB, CAROL, NOBODY = (ObjectId() for i in range(4))
+
+
+@pytest.fixture
+def collection():
+	collection = Collection({'_id': ALICE, 'name': "Alice", 'age': 27}, {'_id': BOB, 'name': "Bob", 'age': 42},
+			{'_id': CAROL, 'name': "Carol", 'age': 18})
+	Person.__bound__ = collection
+	yield collection
+	Person.__bound__ = None
+
+
+class TestScope(object):
+	def test_inactive(self, collection):
+		assert current() is None
+		assert Person.find_one(ALICE) is not Person.find_one(ALICE)
+		assert len(collection.queries) == 2
+	
+	def test_nested(self):
+		with IdentityMap() as outer:
+			assert current() is outer
+			
+			with IdentityMap() as inner:
+				assert current() is inner
+			
+			assert current() is outer
+		
+		assert current() is None
+	
+	def test_reentrant(self):
+		identity = IdentityMap()
+		
+		with identity:
+			with identity:
+				assert current() is identity
+			
+			assert current() is identity
+		
+		assert current() is None
+
+
+class TestIdentity(object):
+	def test_primary_key(self, collection):
+		with IdentityMap() as identity:
+			alice = Person.find_one(ALICE)
+			
+			assert Person.find_one(ALICE) is alice
+			assert Person[ALICE] is alice
+			assert Person.find_one(id=ALICE) is alice
+			assert len(collection.queries) == 1
+			assert identity.hits == 3
+	
+	def test_other_queries(self, collection):
+		with IdentityMap():
+			alice = Person.find_one(name="Alice")
+			
+			assert Person.find_one(ALICE) is alice
+			assert Person.find_one(Person.age > 20) is alice  # Executed, but substituted.
+			assert len(collection.queries) == 2
+	
+	def test_find(self, collection):
+		with IdentityMap():
+			bob = Person[BOB]
+			people = list(Person.find())
+			
+			assert people[1] is bob
+			assert Person[ALICE] is people[0]
+			assert len(collection.queries) == 2
+	
+	def test_not_refreshed(self, collection):
+		with IdentityMap():
+			alice = Person[ALICE]
+			alice.age = 28
+			
+			assert Person.find_one(name="Alice").age == 28
+	
+	def test_missing(self, collection):
+		with IdentityMap() as identity:
+			assert Person.find_one(NOBODY) is None
+			assert Person.find_one(NOBODY) is None
+			assert len(identity) == 0
+			assert len(collection.queries) == 2
+	
+	def test_projected_not_remembered(self, collection):
+		with IdentityMap() as identity:
+			partial = Person.find_one(ALICE, projection=('name', ))
+			
+			assert partial.__dict__['__unloaded__'] == {'age'}
+			assert len(identity) == 0
+			
+			alice = Person.find_one(ALICE)
+			
+			assert alice is not partial
+			assert Person[ALICE] is alice
+			assert len(collection.queries) == 2
+	
+	def test_values_list_not_remembered(self, collection):
+		with IdentityMap() as identity:
+			assert list(Person.find().values_list('name')) == ["Alice", "Bob", "Carol"]
+			assert len(identity) == 0
+			
+			Person[ALICE]
+			assert len(collection.queries) == 2
+	
+	def test_projected_substituted(self, collection):
+		with IdentityMap():
+			alice = Person[ALICE]
+			
+			assert Person.find_one(ALICE, projection=('name', )) is alice
+			assert next(Person.find(projection=('name', ))) is alice
+	
+	def test_expired(self, collection):
+		with IdentityMap() as identity:
+			assert identity.add(collection, None) is None
+	
+	def test_delete(self, collection):
+		with IdentityMap() as identity:
+			alice = Person[ALICE]
+			alice.delete_one()
+			
+			assert len(identity) == 0
+	
+	def test_delete_buffered(self, collection):
+		with IdentityMap() as identity:
+			alice = Person[ALICE]
+			
+			with Person.bulk():
+				alice.delete_one()
+				assert len(identity) == 0
+			
+			assert collection.batches[-1][0][0]._filter == {'_id': ALICE}
+	
+	def test_other_class(self, collection):
+		class Other(Queryable):
+			__collection__ = 'people'
+			__advise__ = False
+			
+			name = String()
+		
+		Other.__bound__ = collection
+		
+		with IdentityMap():
+			Person[ALICE]
+			other = Other[ALICE]
+			
+			assert not isinstance(other, Person)
+			assert Other[ALICE] is other
+			assert len(collection.queries) == 2
+
+
+class TestLookup(object):
+	def test_inactive(self, collection):
+		people = Person.lookup([CAROL, ALICE, NOBODY, ALICE])
+		
+		assert list(people) == [CAROL, ALICE]
+		assert [person.name for person in people.values()] == ["Carol", "Alice"]
+	
+	def test_missing_only(self, collection):
+		with IdentityMap():
+			alice = Person[ALICE]
+			people = Person.lookup([ALICE, BOB, CAROL])
+			
+			assert people[ALICE] is alice
+			assert collection.queries[-1] == {'_id': {'$in': [BOB, CAROL]}}
+			
+			assert Person.lookup([CAROL, BOB, ALICE]) == {CAROL: people[CAROL], BOB: people[BOB], ALICE: alice}
+			assert len(collection.queries) == 2
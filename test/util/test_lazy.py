@@ -0,0 +1,169 @@
+# encoding: utf-8
+
+from collections import OrderedDict as odict
+
+import pytest
+from bson import encode
+from bson.raw_bson import RawBSONDocument
+
+from marrow.mongo import Document
+from marrow.mongo.field import Array, Embed, String
+from marrow.mongo.util.lazy import LazyStore, adopt
+
+
+class Inner(Document):
+	name = String()
+
+
+class Outer(Document):
+	title = String()
+	inner = Embed(Inner)
+	tags = Array(String())
+
+
+@pytest.fixture
+def raw(request):
+	return RawBSONDocument(encode(odict((
+			('title', "Hello"),
+			('inner', {'name': "Alice"}),
+			('tags', ["foo", "bar"]),
+		))))
+
+
+class TestLazyStore(object):
+	def test_adopt_passthrough(self):
+		assert adopt(27) == 27
+		assert adopt("27") == "27"
+	
+	def test_adopt_shared(self):
+		source = [{'a': 1}]
+		result = adopt(source)
+		result[0]['a'] = 2
+		result.append(3)
+		
+		assert isinstance(result[0], LazyStore)
+		assert source == [{'a': 1}]
+	
+	def test_mapping_protocol(self, raw):
+		store = LazyStore(raw)
+		assert not store.promoted
+		assert list(store) == ['title', 'inner', 'tags']
+		assert len(store) == 3
+		assert 'title' in store
+		assert store['title'] == "Hello"
+		assert store.get('missing', 27) == 27
+	
+	def test_nested_retention(self, raw):
+		store = LazyStore(raw)
+		assert isinstance(store['inner'], LazyStore)
+		assert store['inner'] is store['inner']
+		assert store['tags'] is store['tags']
+		assert not store.promoted
+	
+	def test_promotion(self, raw):
+		store = LazyStore(raw)
+		inner = store['inner']
+		store['title'] = "Bye"
+		
+		assert store.promoted
+		assert store['title'] == "Bye"
+		assert store['inner'] is inner
+		
+		del store['tags']
+		assert list(store) == ['title', 'inner']
+	
+	def test_copy(self, raw):
+		store = LazyStore(raw)
+		copy = store.copy()
+		assert isinstance(copy, odict)
+		assert copy['title'] == "Hello"
+		assert not store.promoted
+
+
+class TestLazyDocument(object):
+	def test_from_mongo(self, raw):
+		record = Outer.from_mongo(raw)
+		assert isinstance(record.__data__, LazyStore)
+		assert record.title == "Hello"
+		assert record.inner.name == "Alice"
+		assert list(record.tags) == ["foo", "bar"]
+	
+	def test_nested_write(self, raw):
+		record = Outer.from_mongo(raw)
+		record.inner.name = "Bob"
+		assert record.inner.name == "Bob"
+		assert record.__data__.promoted is False
+		assert record.__data__['inner'].promoted
+	
+	def test_write(self, raw):
+		record = Outer.from_mongo(raw)
+		record.title = "Bye"
+		assert record['title'] == "Bye"
+		assert record.__data__.promoted
+
+
+class TestClone(object):
+	def test_shares_until_written(self):
+		record = Outer.from_mongo({'title': "Hello", 'inner': {'name': "Alice"}, 'tags': ["foo"]})
+		source = record.__data__
+		clone = record.clone(title="Bye")
+		
+		assert clone.title == "Bye"
+		assert record.title == "Hello"
+		
+		clone.inner.name = "Bob"
+		clone.tags.append("bar")
+		
+		assert record.inner.name == "Alice"
+		assert list(record.tags) == ["foo"]
+		assert source == {'title': "Hello", 'inner': {'name': "Alice"}, 'tags': ["foo"]}
+	
+	def test_array_read_shares(self):
+		record = Outer.from_mongo({'title': "Hello", 'tags': ["foo"]})
+		clone = record.clone()
+		
+		assert list(clone.tags) == ["foo"]
+		assert not clone.__data__.promoted
+		
+		clone.tags.append("bar")
+		
+		assert list(clone.tags) == ["foo", "bar"]
+		assert not clone.__data__.promoted
+		assert list(record.tags) == ["foo"]
+	
+	def test_original_writes_isolated(self):
+		record = Outer.from_mongo({'title': "Hello", 'inner': {'name': "Alice"}})
+		clone = record.clone()
+		record.inner.name = "Bob"
+		
+		assert clone.inner.name == "Alice"
+	
+	def test_repeated_clones_share(self):
+		record = Outer.from_mongo({'title': "Hello", 'inner': {'name': "Alice"}})
+		first, second = record.clone(), record.clone()
+		
+		assert first.__data__._raw is second.__data__._raw
+		assert isinstance(first.__data__._raw, dict)  # No ever-deepening chain of wrappers.
+	
+	def test_lazy_source(self, raw):
+		record = Outer.from_mongo(raw)
+		clone = record.clone()
+		
+		assert clone.__data__._raw is raw
+		assert clone.inner.name == "Alice"
+	
+	def test_embedded_instance(self):
+		record = Outer(title="Hello", inner=Inner("Alice"))
+		clone = record.clone()
+		clone.inner.name = "Bob"
+		
+		assert record.inner.name == "Alice"
+		assert clone.inner.name == "Bob"
+	
+	def test_not_tracked(self):
+		class Tracked(Outer):
+			__track__ = True
+		
+		record = Tracked.from_mongo({'title': "Hello"})
+		assert '__changes__' in record.__dict__
+		assert '__changes__' not in record.clone().__dict__
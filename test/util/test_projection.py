@@ -0,0 +1,123 @@
+from bson import ObjectId
+
+from fake import Collection
+from marrow.mongo import Document
+from marrow.mongo.field import Array, Integer, ObjectId as Identifier, String
+from marrow.mongo.util.projection import Siblings, omitted
+
+
+class Person(Document):
+	id = Identifier('_id', assign=True)
+	name = String()
+	email = String(default=None)
+	age = Integer(default=0, assign=True)
+	tags = Array(String())
+
+
+IDENTIFIERS = [ObjectId() for i in range(3)]
+STORED = [
+		{'_id': IDENTIFIERS[0], 'name': "Alice", 'email': "alice@example.com", 'age': 27},
+		{'_id': IDENTIFIERS[1], 'name': "Bob", 'age': 42},
+		{'_id': IDENTIFIERS[2], 'name': "Carol", 'email': "carol@example.com"},
+	]
+
+
+def load(projection, collection=None):
+	collection = collection or Collection(*STORED)
+	siblings = Siblings(Person, collection, projection)
+	
+	stored = [{k: v for k, v in doc.items() if k not in siblings.omitted} for doc in STORED]
+	
+	return collection, list(Person.from_mongo_many(stored, siblings=siblings))
+
+
+class TestOmitted(object):
+	def test_none(self):
+		assert omitted(Person, None) == (set(), set())
+	
+	def test_inclusion(self):
+		assert omitted(Person, {'name': 1}) == ({'email', 'age', 'tags'}, set())
+		assert omitted(Person, ['name', 'email']) == ({'age', 'tags'}, set())
+	
+	def test_inclusion_without_identifier(self):
+		assert omitted(Person, {'name': 1, '_id': 0}) == ({'_id', 'email', 'age', 'tags'}, set())
+	
+	def test_exclusion(self):
+		assert omitted(Person, {'email': 0, 'tags': False}) == ({'email', 'tags'}, set())
+		assert omitted(Person, {'_id': 0}) == ({'_id'}, set())
+	
+	def test_partial(self):
+		assert omitted(Person, {'name': 1, 'tags.0': 1}) == ({'email', 'age', 'tags'}, {'tags'})
+		assert omitted(Person, {'tags.0': 0}) == ({'tags'}, {'tags'})
+	
+	def test_operator(self):
+		assert omitted(Person, {'name': 1, 'tags': {'$slice': 2}}) == ({'email', 'age'}, set())
+
+
+class TestSiblings(object):
+	def test_unprojected(self):
+		collection, people = load(None)
+		assert '__unloaded__' not in people[0].__dict__
+		assert people[1].email is None
+		assert not collection.queries
+	
+	def test_unloaded(self):
+		collection, people = load(('name', ))
+		assert people[0].__dict__['__unloaded__'] == {'email', 'age', 'tags'}
+		assert 'age' not in people[0].__data__  # The default was not assigned in place of the omitted value.
+	
+	def test_batched(self):
+		collection, people = load(('name', ))
+		
+		assert people[0].email == "alice@example.com"
+		assert len(collection.queries) == 1
+		assert collection.queries[0] == {'_id': {'$in': IDENTIFIERS}}
+		assert collection.calls[0][2]['projection'] == {'_id': 1, 'email': 1}
+		
+		assert people[1].email is None  # Loaded, and found absent; not loaded again.
+		assert people[2].email == "carol@example.com"
+		assert len(collection.queries) == 1
+	
+	def test_absent_default(self):
+		collection, people = load(('name', ))
+		assert people[0].age == 27
+		assert people[2].age == 0
+		assert len(collection.queries) == 1
+	
+	def test_assignment(self):
+		collection, people = load(('name', ))
+		people[0].email = "alice@example.org"
+		
+		assert people[1].email is None
+		assert people[0].email == "alice@example.org"
+		assert collection.queries[0] == {'_id': {'$in': IDENTIFIERS[1:]}}
+	
+	def test_mapping_access(self):
+		collection, people = load(('name', ))
+		
+		assert people[0]['email'] == "alice@example.com"
+		assert 'email' not in people[1]  # Loaded, and found absent.
+		assert people[2].get('email') == "carol@example.com"
+		assert 'age' in people[1]
+		assert len(collection.queries) == 2
+	
+	def test_mapping_assignment(self):
+		collection, people = load(('name', ))
+		people[0]['email'] = "alice@example.org"
+		
+		assert people[1].email is None
+		assert people[0]['email'] == "alice@example.org"
+		assert collection.queries[0] == {'_id': {'$in': IDENTIFIERS[1:]}}
+	
+	def test_released(self):
+		collection, people = load(('name', ))
+		del people[1]
+		
+		assert people[0].name == "Alice"
+		assert people[0].email == "alice@example.com"
+		assert collection.queries[0] == {'_id': {'$in': [IDENTIFIERS[0], IDENTIFIERS[2]]}}
+	
+	def test_unidentified(self):
+		siblings = Siblings(Person, Collection(), {'name': 1, '_id': 0})
+		person = Person.from_mongo({'name': "Alice"}, siblings)
+		assert '__unloaded__' not in person.__dict__
@@ -0,0 +1,167 @@
+from collections import OrderedDict as odict
+from threading import Thread
+
+import pytest
+
+from marrow.mongo.util.shape import Recorder, Registry, fingerprint, shape
+
+
+class Cursor(object):
+	"""A minimal cursor-like iterator."""
+	
+	def __init__(self, documents):
+		self.documents = iter(documents)
+		self.closed = False
+		self.alive = True
+	
+	def __next__(self):
+		return next(self.documents)
+	
+	def close(self):
+		self.closed = True
+
+
+class Raw(dict):
+	raw = b'\x00' * 27
+
+
+class TestShape(object):
+	def test_values_removed(self):
+		assert shape({'name': "Alice", 'age': {'$gt': 27}})['query'] == {'name': '?', 'age': {'$gt': '?'}}
+	
+	def test_compound(self):
+		result = shape({'$or': [{'name': "Alice"}, {'age': {'$in': [1, 2, 3]}}]})['query']
+		assert result == {'$or': [{'name': '?'}, {'age': {'$in': '?'}}]}
+	
+	def test_pipeline(self):
+		result = shape([{'$match': {'age': 27}}, {'$limit': 10}])['query']
+		assert result == [{'$match': {'age': '?'}}, {'$limit': '?'}]
+	
+	def test_sort(self):
+		assert shape(sort=[('age', -1), ('name', 1)])['sort'] == [['age', -1], ['name', 1]]
+		assert shape(sort=odict((('age', -1), )))['sort'] == {'age': -1}
+	
+	def test_projection(self):
+		assert shape(projection={'age': True, 'name': 0})['projection'] == {'age': 1, 'name': 0}
+		assert shape(projection=['age'])['projection'] == {'age': 1}
+
+
+class TestFingerprint(object):
+	def test_values_ignored(self):
+		assert fingerprint(shape({'age': 27})) == fingerprint(shape({'age': 42}))
+	
+	def test_key_order_ignored(self):
+		assert fingerprint(shape(odict((('a', 1), ('b', 2))))) == fingerprint(shape(odict((('b', 1), ('a', 2)))))
+	
+	def test_distinct(self):
+		assert fingerprint(shape({'age': 27}))[0] != fingerprint(shape({'age': {'$gt': 27}}))[0]
+		assert fingerprint(shape({'age': 27}, [('age', 1)]))[0] != fingerprint(shape({'age': 27}, [('age', -1)]))[0]
+	
+	def test_stable(self):
+		key, text = fingerprint('find', shape({'age': 27}))
+		
+		assert key == '1e5553e67fe49a96'
+		assert text == '["find",{"projection":null,"query":{"age":"?"},"sort":null}]'
+
+
+class TestRegistry(object):
+	def test_record(self):
+		registry = Registry()
+		registry.record('abc', 'shape', 0.5, 2, 100)
+		registry.record('abc', 'shape', 1.5, 1, 50)
+		registry.record('def', 'other', 0.25)
+		
+		assert len(registry) == 2
+		assert 'abc' in registry
+		
+		statistics = registry['abc']
+		assert statistics.count == 2
+		assert statistics.duration == 2.0
+		assert statistics.slowest == 1.5
+		assert statistics.mean == 1.0
+		assert statistics.documents == 3
+		assert statistics.bytes == 150
+		assert 'abc' in repr(statistics)
+	
+	def test_dump(self):
+		registry = Registry()
+		registry.record('abc', 'shape', 0.5)
+		registry.record('def', 'other', 0.25)
+		registry.record('def', 'other', 0.1)
+		
+		assert [i['fingerprint'] for i in registry.dump()] == ['abc', 'def']
+		assert [i['fingerprint'] for i in registry.dump('count')] == ['def', 'abc']
+		assert [i.fingerprint for i in registry] == ['abc', 'def']
+	
+	def test_reset(self):
+		registry = Registry()
+		registry.record('abc', 'shape', 0.5)
+		registry.reset()
+		
+		assert not len(registry)
+		assert registry.dump() == []
+
+
+class TestRecorder(object):
+	def test_exhausted(self):
+		registry = Registry()
+		recorder = Recorder(Cursor([Raw(), Raw(), {}]), registry, 'abc', 'shape')
+		
+		assert len(list(recorder)) == 3
+		
+		statistics = registry['abc']
+		assert statistics.count == 1
+		assert statistics.documents == 3
+		assert statistics.bytes == 54
+	
+	def test_recorded_once(self):
+		registry = Registry()
+		recorder = Recorder(Cursor([{}]), registry, 'abc', 'shape')
+		
+		list(recorder)
+		recorder.close()
+		del recorder
+		
+		assert registry['abc'].count == 1
+	
+	def test_closed(self):
+		registry = Registry()
+		cursor = Cursor([{}, {}])
+		
+		with Recorder(cursor, registry, 'abc', 'shape') as recorder:
+			assert next(recorder) == {}
+		
+		assert cursor.closed
+		assert registry['abc'].documents == 1
+	
+	def test_abandoned(self):
+		registry = Registry()
+		recorder = Recorder(Cursor([{}, {}]), registry, 'abc', 'shape')
+		next(recorder)
+		del recorder
+		
+		assert registry['abc'].count == 1
+	
+	def test_abandoned_reentrant(self):
+		registry = Registry()
+		recorders = [Recorder(Cursor([{}, {}]), registry, 'abc', 'shape')]
+		next(recorders[0])
+		
+		def collect():
+			with registry._lock:  # As if collected while the same thread records another query.
+				recorders.clear()
+		
+		thread = Thread(target=collect, daemon=True)
+		thread.start()
+		thread.join(5)
+		
+		assert not thread.is_alive()
+		assert registry['abc'].count == 1
+	
+	def test_proxy(self):
+		recorder = Recorder(Cursor([]), Registry(), 'abc', 'shape')
+		assert recorder.alive
+		assert 'abc' in repr(recorder)
+		
+		with pytest.raises(AttributeError):
+			recorder.missing